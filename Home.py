@@ -3,7 +3,9 @@ import datetime
 from auth import register_user, login_user
 import pandas as pd
 import plotly.express as px
-from db import get_connection, fetch_data, execute_query
+from db import insert_row
+from kpis import page_kpis
+import instrumentation
 
 
 if st.session_state.get("scroll_to_top", False):
@@ -19,6 +21,8 @@ if st.session_state.get("scroll_to_top", False):
     )
     st.session_state["scroll_to_top"] = False
 
+instrumentation.page("Home")
+
 # --- Branding with Logo (always visible) ---
 st.markdown("<div style='text-align:left;margin-top:-5rem;'><h1 style='font-size:3.0rem;color:#0F172A;font-weight:700;letter-spacing:1px;margin-bottom:0.4rem;position:relative;left:-130px;bottom:-30px;'>Welcome to Retail Pulse</h1><div style='font-size:1.15rem;color:#475569;margin-bottom:1.5rem;font-weight:400;position:relative;left:-130px;top:10px;'>Insightful Retail & Smarter Decisions.</div></div>", unsafe_allow_html=True)
 
@@ -142,18 +146,8 @@ def show_dashboard():
     today = datetime.datetime.now().strftime('%A, %d %B %Y')
     # --- Dashboard Cards (fetch real data) ---
     user_id = st.session_state["user_id"]
-    conn = get_connection()
-    total_products, total_sales, total_expenses = 0, 0, 0
-    if conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM Products WHERE user_id = %s", (user_id,))
-        total_products = cursor.fetchone()[0]
-        cursor.execute("SELECT SUM(quantity_sold * selling_price) FROM Sales WHERE user_id = %s", (user_id,))
-        total_sales = cursor.fetchone()[0] or 0
-        cursor.execute("SELECT SUM(amount) FROM Expenses WHERE user_id = %s", (user_id,))
-        total_expenses = cursor.fetchone()[0] or 0
-        cursor.close()
-        conn.close()
+    cards = page_kpis(user_id, "home")
+    total_products, total_sales, total_expenses = cards["total_products"], cards["total_sales"], cards["total_expenses"]
 
     # --- Render dashboard CSS ---
     st.markdown("""
@@ -286,11 +280,10 @@ def show_dashboard():
             stock = st.number_input("Stock", min_value=0)
             submit = st.form_submit_button("Submit Product")
             if submit:
-                query = """
-                    INSERT INTO Products (user_id, NAME, category, cost_price, selling_price, stock)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """
-                execute_query(query, (user_id, name, category, cost_price, selling_price, stock))
+                insert_row("Products", user_id, {
+                    "NAME": name, "category": category, "cost_price": cost_price,
+                    "selling_price": selling_price, "stock": stock,
+                })
                 st.success("Product added successfully!")
                 st.session_state["show_add_product"] = False
                 st.rerun()
@@ -308,11 +301,11 @@ def show_dashboard():
             payment_status = st.selectbox("Payment Status", ["Pending", "Completed", "Overdue"])
             submit = st.form_submit_button("Submit Purchase")
             if submit:
-                query = """
-                    INSERT INTO Purchases (user_id, product_id, vendor_name, quantity_purchased, cost_price, order_date, payment_due, payment_status)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                execute_query(query, (user_id, product_id, vendor_name, quantity_purchased, cost_price, order_date, payment_due, payment_status))
+                insert_row("Purchases", user_id, {
+                    "product_id": product_id, "vendor_name": vendor_name,
+                    "quantity_purchased": quantity_purchased, "cost_price": cost_price,
+                    "order_date": order_date, "payment_due": payment_due, "payment_status": payment_status,
+                })
                 st.success("Purchase added successfully!")
                 st.session_state["show_add_purchase"] = False
                 st.rerun()
@@ -331,11 +324,10 @@ def show_dashboard():
             if submit:
                 shipped_value = 1 if shipped == "Yes" else 0
                 payment_received_value = 1 if payment_received == "Yes" else 0
-                query = """
-                    INSERT INTO Sales (user_id, product_id, quantity_sold, selling_price, sale_date, shipped, payment_received)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """
-                execute_query(query, (user_id, product_id, quantity_sold, selling_price, sale_date, shipped_value, payment_received_value))
+                insert_row("Sales", user_id, {
+                    "product_id": product_id, "quantity_sold": quantity_sold, "selling_price": selling_price,
+                    "sale_date": sale_date, "shipped": shipped_value, "payment_received": payment_received_value,
+                })
                 st.success("Sale added successfully!")
                 st.session_state["show_add_sale"] = False
                 st.rerun()
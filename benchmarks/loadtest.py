@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import threading
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+from db import get_pool
+from instrumentation import QUERY_COUNT_KEY, query_total
+
+# Concurrent sessions against the real app, driven headless with
+# Streamlit's AppTest. Each virtual user logs in through Home.py with one
+# of the accounts generate_data.py --db creates, then walks the pages,
+# replaying the widget interactions in SCENARIOS with some think time
+# between them. All sessions share this process, as they would share a
+# Streamlit server: the connection pool and query cache are common, and
+# every script run is on its own thread. Reported per page and step: run
+# latency percentiles, queries per run and errors, plus peak RSS.
+#
+#   python generate_data.py --preset 1m --db           create loadtest users and data first
+#   python benchmarks/loadtest.py --users 50 --iterations 3
+#
+# The app's SQL is MySQL-specific (ON DUPLICATE KEY UPDATE, generated
+# columns), so this runs against a local MySQL configured in
+# .streamlit/secrets.toml.
+
+DEFAULT_USERS = 10
+DEFAULT_ITERATIONS = 2
+DEFAULT_THINK_SECONDS = 0.5   # mean pause between interactions
+DEFAULT_TIMEOUT = 120         # seconds one script run may take
+DEFAULT_OUTPUT = os.path.join(ROOT, "benchmarks", "loadtest.json")
+
+PAGES = {
+    "Home": "Home.py",
+    "Finance": "pages/0_Finance _Dashboard.py",
+    "Purchases": "pages/2_Purchases.py",
+    "Inventory": "pages/3_Inventory.py",
+    "Sales": "pages/4_Sales.py",
+    "Expenses": "pages/5_Expenses.py",
+}
+
+
+# First widget of `kind` (e.g. "slider") with this label, or None
+def _widget(at, kind, label):
+    return next((w for w in getattr(at, kind) if w.label == label), None)
+
+
+def _set(kind, label, choose):
+    def step(at, rng):
+        widget = _widget(at, kind, label)
+        if widget is None:
+            return False
+        widget.set_value(choose(widget, rng))
+        return True
+    return step
+
+
+def _some_options(widget, rng):
+    options = list(widget.options)
+    return rng.sample(options, max(1, len(options) // 2)) if options else []
+
+
+def _any_option(widget, rng):
+    return rng.choice(list(widget.options))
+
+
+# Interactions replayed on each page after its first render: (name, step).
+# A step sets a widget and returns False when the widget is not on the page.
+SCENARIOS = {
+    "Home": [],
+    "Finance": [
+        ("top_n", _set("slider", "Top N Products by Sales", lambda w, rng: rng.randint(w.min, w.max))),
+    ],
+    "Purchases": [
+        ("vendor_filter", _set("multiselect", "Vendor", _some_options)),
+        ("status_filter", _set("multiselect", "Payment Status", _some_options)),
+    ],
+    "Inventory": [
+        ("service_level", _set("slider", "Service level", lambda w, rng: rng.choice([0.9, 0.95, 0.98]))),
+        ("category_filter", _set("multiselect", "Category", _some_options)),
+    ],
+    "Sales": [
+        ("shipped_filter", _set("selectbox", "Shipped Status", lambda w, rng: rng.choice([0, 1]))),
+        ("forecast_product", _set("selectbox", "Select Product", _any_option)),
+        ("product_filter", _set("multiselect", "Product", _some_options)),
+    ],
+    "Expenses": [],
+}
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = defaultdict(list)     # (page, step) -> [(seconds, queries, ok)]
+
+    def add(self, page, step, seconds, queries, ok):
+        with self._lock:
+            self.runs[(page, step)].append((seconds, queries, ok))
+
+    def summary(self):
+        rows = []
+        for (page, step), runs in sorted(self.runs.items()):
+            seconds = np.array([run[0] for run in runs])
+            queries = np.array([run[1] for run in runs])
+            rows.append({
+                "page": page, "step": step, "runs": len(runs),
+                "errors": sum(1 for run in runs if not run[2]),
+                "p50_ms": float(np.percentile(seconds, 50) * 1000),
+                "p95_ms": float(np.percentile(seconds, 95) * 1000),
+                "max_ms": float(seconds.max() * 1000),
+                "queries_per_run": float(queries.mean()),
+            })
+        return rows
+
+
+def _queries(at):
+    return at.session_state[QUERY_COUNT_KEY] if QUERY_COUNT_KEY in at.session_state else 0
+
+
+# Run the script once and record it. Returns False when it raised or
+# showed an error.
+def _timed_run(at, recorder, page, step, timeout):
+    before = _queries(at)
+    start = time.perf_counter()
+    try:
+        at.run(timeout=timeout)
+        ok = not at.exception and not at.error
+    except Exception:
+        ok = False
+    recorder.add(page, step, time.perf_counter() - start, _queries(at) - before, ok)
+    return ok
+
+
+def _login(username, password, recorder, timeout):
+    at = AppTest.from_file(os.path.join(ROOT, PAGES["Home"]), default_timeout=timeout)
+    at.run()
+    _widget(at, "text_input", "Username or Email").input(username)
+    at.text_input(key="login_password").input(password)
+    next(b for b in at.button if b.label == "Login").click()
+    _timed_run(at, recorder, "Home", "login", timeout)
+    return at.session_state["user_id"] if "user_id" in at.session_state else None
+
+
+def virtual_user(index, args, recorder, failures):
+    rng = random.Random(args.seed * 1000 + index)
+    username = f"{args.username_prefix}{index % args.accounts + 1:04d}"
+    user_id = _login(username, args.password, recorder, args.timeout)
+    if user_id is None:
+        failures.append(f"{username}: login failed")
+        return
+    for _ in range(args.iterations):
+        for page in args.pages:
+            at = AppTest.from_file(os.path.join(ROOT, PAGES[page]), default_timeout=args.timeout)
+            at.session_state["user_id"] = user_id
+            at.session_state["is_logged_in"] = True
+            if not _timed_run(at, recorder, page, "render", args.timeout):
+                failures.append(f"{username}: {page} failed to render")
+                continue
+            for name, step in SCENARIOS[page]:
+                time.sleep(rng.expovariate(1 / args.think) if args.think else 0)
+                if step(at, rng):
+                    _timed_run(at, recorder, page, name, args.timeout)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Load test Retail Pulse with concurrent headless sessions")
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS, help="concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="passes over the pages per user")
+    parser.add_argument("--pages", nargs="+", choices=[page for page in PAGES if page != "Home"], default=[page for page in PAGES if page != "Home"])
+    parser.add_argument("--accounts", type=int, default=1, help="loadtest accounts to spread users over (generate_data --tenants)")
+    parser.add_argument("--seed", type=int, default=42, help="generate_data seed the accounts were created with")
+    parser.add_argument("--password", default="loadtest")
+    parser.add_argument("--think", type=float, default=DEFAULT_THINK_SECONDS, help="mean think time in seconds")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="seconds over which users start")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+    args.username_prefix = f"loadtest_{args.seed}_"
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.chdir(ROOT)  # secrets and pages resolve from the app directory
+    recorder, failures = Recorder(), []
+    rss_before = peak_rss_mb()
+    queries_before = query_total()
+    threads = [
+        threading.Thread(target=virtual_user, args=(i, args, recorder, failures), name=f"vu-{i}")
+        for i in range(args.users)
+    ]
+    started = time.monotonic()
+    for i, thread in enumerate(threads):
+        thread.start()
+        time.sleep(args.ramp_up / max(1, args.users))
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    rows = recorder.summary()
+    print(f"\n{'page':<10} {'step':<18} {'runs':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'queries':>8}")
+    for row in rows:
+        print(f"{row['page']:<10} {row['step']:<18} {row['runs']:>5} {row['errors']:>4} "
+              f"{row['p50_ms']:9.0f} {row['p95_ms']:9.0f} {row['max_ms']:9.0f} {row['queries_per_run']:8.1f}")
+    report = {
+        "users": args.users,
+        "iterations": args.iterations,
+        "elapsed_s": elapsed,
+        "queries": query_total() - queries_before,
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_before_mb": rss_before,
+        "pool": get_pool().status(),
+        "failures": failures,
+        "steps": rows,
+    }
+    print(f"\n{args.users} users in {elapsed:.1f}s, {report['queries']:,} queries, peak RSS {report['peak_rss_mb']:.0f} MB")
+    for failure in failures[:20]:
+        print(f"⚠️ {failure}")
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"✅ Report written to {args.output}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
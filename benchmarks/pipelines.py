@@ -0,0 +1,168 @@
+import argparse
+from datetime import date
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+import metrics
+import reports
+import fifo
+import forecast
+import replenishment
+from generate_data import tenant_frames
+from inventory import load_inventory, load_stock_levels
+from loaders import TABLE_SCHEMAS, apply_schema, load_table
+
+# The work behind each page, as functions that can be timed on their own.
+# PIPELINES call the app's own pandas/numpy code (metrics, replenishment,
+# forecast) on in-memory frames shaped like what the pages load, so only
+# that code is timed; DB_PIPELINES run the same pages' data access paths
+# (reports, fifo, rollups) against the configured database.
+
+# One tenant's history at each scale, roughly 10k, 100k and 1M Sales rows
+SCALES = {
+    "10k": {"skus": 50, "years": 1, "sales_per_day": 27},
+    "100k": {"skus": 500, "years": 2, "sales_per_day": 137},
+    "1m": {"skus": 2000, "years": 3, "sales_per_day": 900},
+}
+DATASET_END = date(2025, 12, 31)
+TOP_N = 10
+
+
+# Generated tenant data typed the way loaders.load_table returns it, plus
+# the rollup reads the pages make (stock_levels, sales_daily,
+# purchases_daily), derived once here so they are not timed
+def build_dataset(scale, seed):
+    args = argparse.Namespace(end=DATASET_END, **SCALES[scale])
+    frames = defaultdict(list)
+    for table, frame in tenant_frames(seed, args):
+        frames[table].append(frame)
+    tables = {table: pd.concat(parts, ignore_index=True) for table, parts in frames.items()}
+
+    products = tables["Products"].rename(columns={"NAME": "Name"})
+    products.insert(0, "product_id", np.arange(1, len(products) + 1))
+    purchases = tables["Purchases"].assign(product_id=tables["Purchases"]["product_id"] + 1)
+    purchases.insert(0, "purchase_id", np.arange(1, len(purchases) + 1))
+    sales = tables["Sales"].assign(product_id=tables["Sales"]["product_id"] + 1)
+    sales.insert(0, "sale_id", np.arange(1, len(sales) + 1))
+    expenses = tables["Expenses"].rename(columns={"date": "expense_date", "expense_type": "TYPE"})
+    expenses.insert(0, "expense_id", np.arange(1, len(expenses) + 1))
+    ds = {
+        "products": apply_schema(products, TABLE_SCHEMAS["Products"]),
+        "purchases": apply_schema(purchases, TABLE_SCHEMAS["Purchases"]),
+        "sales": apply_schema(sales, TABLE_SCHEMAS["Sales"]),
+        "expenses": apply_schema(expenses, TABLE_SCHEMAS["Expenses"]),
+        "today": pd.Timestamp(DATASET_END) + pd.Timedelta(days=1),
+    }
+    ds.update(_rollups(ds))
+    return ds
+
+
+def _rollups(ds):
+    sales, purchases = ds["sales"], ds["purchases"]
+    bought = purchases.groupby("product_id")["quantity_purchased"].sum()
+    sold = sales.groupby("product_id")["quantity_sold"].sum()
+    stock = pd.DataFrame({"quantity_purchased": bought, "quantity_sold": sold}).fillna(0)
+    stock["live_stock"] = stock["quantity_purchased"] - stock["quantity_sold"]
+    recent = sales[sales["sale_date"] > ds["today"] - pd.Timedelta(days=replenishment.DEFAULT_LOOKBACK_DAYS)]
+    month = sales["sale_date"].dt.to_period("M").dt.to_timestamp().rename("month")
+    spent = (purchases["quantity_purchased"] * purchases["cost_price"]).groupby(purchases["product_id"]).sum()
+    avg_cost = spent / bought
+    return {
+        "stock_levels": stock.rename_axis("product_id").reset_index(),
+        "daily_demand": recent.groupby(["product_id", recent["sale_date"].rename("day")])["quantity_sold"].sum().reset_index(name="units"),
+        "order_days": purchases[["product_id", "order_date"]].drop_duplicates().rename(columns={"order_date": "day"}).sort_values(["product_id", "day"]),
+        "monthly_demand": sales.groupby(["product_id", month])["quantity_sold"].sum().reset_index(),
+        # COGS is read from fifo_sale_costs on the page; any total will do here
+        "cogs": float((sales["quantity_sold"] * sales["product_id"].map(avg_cost).fillna(0)).sum()),
+    }
+
+
+def inventory_live_stock(ds):
+    position = metrics.stock_position(ds["products"], ds["stock_levels"])
+    plan = replenishment.build_plan(
+        ds["stock_levels"],
+        replenishment.daily_demand_stats(ds["daily_demand"]),
+        replenishment.order_gap_stats(ds["order_days"]),
+        replenishment.DEFAULT_SERVICE_LEVEL,
+    )
+    return metrics.low_stock(position, plan)
+
+
+def finance_cogs_dio(ds):
+    products, sales, purchases = ds["products"], ds["sales"], ds["purchases"]
+    position = metrics.stock_position(products, ds["stock_levels"])
+    detail = metrics.sales_detail(sales, products)
+    return {
+        "dio": metrics.days_inventory_outstanding(position, ds["cogs"]),
+        "receivables": metrics.receivables(sales),
+        "payables": metrics.payables(purchases),
+        "category_profit": metrics.category_profit(detail),
+        "category_sales": metrics.category_sales(detail),
+        "top_products": metrics.top_product_sales(detail, TOP_N),
+        "suppliers": metrics.supplier_outstanding(purchases),
+    }
+
+
+def sales_forecast(ds):
+    matrix = forecast.monthly_matrix(ds["monthly_demand"].copy())
+    return forecast.forecast_frame(matrix, *forecast.fit_all(matrix))
+
+
+PIPELINES = {
+    "inventory_live_stock": inventory_live_stock,
+    "finance_cogs_dio": finance_cogs_dio,
+    "sales_forecast": sales_forecast,
+}
+
+
+# --- Data access paths ---------------------------------------------------
+
+def db_inventory_live_stock(user_id):
+    inventory = load_inventory(user_id)
+    plan = replenishment._plan(user_id, replenishment.DEFAULT_SERVICE_LEVEL, replenishment.DEFAULT_LOOKBACK_DAYS)
+    return metrics.low_stock(inventory, plan)
+
+
+def db_finance_cogs_dio(user_id):
+    products = load_table("Products", user_id, ["product_id", "Name", "category", "cost_price", "selling_price"])
+    sales = load_table("Sales", user_id, ["product_id", "quantity_sold", "selling_price", "sale_date", "payment_received"])
+    position = metrics.stock_position(products, load_stock_levels(user_id))
+    fifo.refresh(user_id)
+    cogs = fifo.total_cogs(user_id)
+    detail = metrics.sales_detail(sales, products)
+    return {
+        "cogs": cogs,
+        "dio": metrics.days_inventory_outstanding(position, cogs),
+        "inventory_value": fifo.valuation(user_id)["value"].sum(),
+        "category_profit": metrics.category_profit(detail),
+    }
+
+
+def db_sales_monthly_trend(user_id):
+    return reports.product_costs(user_id), reports.monthly_sales(user_id)
+
+
+def db_sales_forecast(user_id):
+    matrix = forecast.demand_matrix(user_id)
+    return forecast.forecast_frame(matrix, *forecast.fit_all(matrix)) if not matrix.empty else matrix
+
+
+def db_purchases_payment_alerts(user_id):
+    unpaid = load_table("Purchases", user_id, ["vendor_name", "product_id", "payment_due"], filters=[("payment_status", "=", "pending")])
+    return unpaid, reports.vendor_share(user_id), reports.product_purchases(user_id), reports.monthly_purchases(user_id)
+
+
+def db_expense_rollups(user_id):
+    return reports.monthly_expenses(user_id), reports.category_expenses(user_id)
+
+
+DB_PIPELINES = {
+    "inventory_live_stock": db_inventory_live_stock,
+    "finance_cogs_dio": db_finance_cogs_dio,
+    "sales_monthly_trend": db_sales_monthly_trend,
+    "sales_forecast": db_sales_forecast,
+    "purchases_payment_alerts": db_purchases_payment_alerts,
+    "expense_rollups": db_expense_rollups,
+}
@@ -0,0 +1,150 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from pipelines import SCALES, PIPELINES, DB_PIPELINES, build_dataset
+
+# Times the page pipelines in pipelines.py and compares them with a stored
+# baseline. Each benchmark runs once to warm up, then --repeat times; the
+# median is what gets compared. A benchmark regresses when its median is
+# more than --tolerance slower than the baseline and by more than
+# --min-delta seconds (so millisecond noise is not reported).
+#
+#   python benchmarks/run.py                         in-memory pipelines at every scale
+#   python benchmarks/run.py --scales 10k 100k       selected scales only
+#   python benchmarks/run.py --db 12                 data access paths for user 12
+#   python benchmarks/run.py --save-baseline         store this run as the baseline
+#
+# Exits with 1 when any benchmark regressed against the baseline.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(HERE, "results.json")
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.2     # fraction slower than baseline that counts as a regression
+DEFAULT_MIN_DELTA = 0.005   # seconds
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark Retail Pulse page pipelines")
+    parser.add_argument("--scales", nargs="+", choices=SCALES, default=list(SCALES))
+    parser.add_argument("--only", nargs="+", choices=sorted(set(PIPELINES) | set(DB_PIPELINES)), help="benchmarks to run (default: all)")
+    parser.add_argument("--db", type=int, metavar="USER_ID", help="time the data access paths for this user instead")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline as well")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--min-delta", type=float, default=DEFAULT_MIN_DELTA)
+    return parser.parse_args(argv)
+
+
+# Warm-up run, then `repeat` timed runs; `before` runs untimed before each
+def measure(run, repeat, before=None):
+    if before:
+        before()
+    run()
+    times = []
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "max_s": max(times),
+        "repeat": repeat,
+    }
+
+
+def run_memory(args, names):
+    results, datasets = {}, {}
+    for scale in args.scales:
+        start = time.perf_counter()
+        ds = build_dataset(scale, args.seed)
+        datasets[scale] = {table: len(ds[table]) for table in ("products", "purchases", "sales", "expenses")}
+        print(f"[{scale}] dataset {datasets[scale]} built in {time.perf_counter() - start:.1f}s")
+        for name in names:
+            results[f"{scale}/{name}"] = measure(lambda: PIPELINES[name](ds), args.repeat)
+            print(f"  {name:<28} {results[f'{scale}/{name}']['median_s'] * 1000:10.1f} ms")
+    return results, {"datasets": datasets}
+
+
+# Each timed run starts from an empty query cache so the database is hit
+def run_db(args, names):
+    from db import get_query_cache
+    results = {}
+    for name in names:
+        results[f"db/{name}"] = measure(lambda: DB_PIPELINES[name](args.db), args.repeat, before=get_query_cache().clear)
+        print(f"  {name:<28} {results[f'db/{name}']['median_s'] * 1000:10.1f} ms")
+    return results, {"user_id": args.db}
+
+
+def compare(results, baseline, tolerance, min_delta):
+    regressions = []
+    print(f"\n{'benchmark':<40} {'baseline ms':>12} {'now ms':>10} {'change':>8}")
+    for key, now in results.items():
+        before = baseline.get(key)
+        if before is None:
+            print(f"{key:<40} {'-':>12} {now['median_s'] * 1000:10.1f} {'new':>8}")
+            continue
+        ratio = now["median_s"] / before["median_s"] if before["median_s"] else float("inf")
+        regressed = ratio > 1 + tolerance and now["median_s"] - before["median_s"] > min_delta
+        flag = "  ⚠️ regression" if regressed else ""
+        print(f"{key:<40} {before['median_s'] * 1000:12.1f} {now['median_s'] * 1000:10.1f} {ratio - 1:+8.0%}{flag}")
+        if regressed:
+            regressions.append(key)
+    return regressions
+
+
+def write_json(path, payload):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(payload, file, indent=2, sort_keys=True)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    suite = DB_PIPELINES if args.db is not None else PIPELINES
+    names = [name for name in args.only or suite if name in suite]
+    results, context = run_db(args, names) if args.db is not None else run_memory(args, names)
+    payload = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "seed": args.seed,
+            **context,
+        },
+        "results": results,
+    }
+    write_json(args.output, payload)
+    print(f"\n✅ Results written to {args.output}")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        print(f"\n❌ {len(regressions)} regression(s): {', '.join(regressions)}" if regressions else "\n✅ No regressions")
+    if args.save_baseline:
+        write_json(args.baseline, payload)
+        print(f"✅ Baseline written to {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
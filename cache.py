@@ -0,0 +1,123 @@
+import re
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+# Approximate resident size of a cached result in bytes
+def size_of(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(
+            sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row.values()) if isinstance(row, dict)
+            else sys.getsizeof(row)
+            for row in value
+        )
+    return sys.getsizeof(value)
+
+
+# Callers get their own copy so in-place edits never leak into the cache
+def _copy(value):
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    if isinstance(value, list):
+        return [dict(row) if isinstance(row, dict) else row for row in value]
+    return value
+
+
+# Process-wide cache of query results keyed by (user_id, query, params).
+# Entries expire after `ttl` seconds; once the total size passes `max_bytes`
+# the least recently used entries are evicted, whichever user they belong to.
+class QueryCache:
+    def __init__(self, ttl, max_bytes):
+        self.ttl = float(ttl)
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()   # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _copy(entry[2])
+
+    def put(self, key, value):
+        size = size_of(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.put(key, value)
+            value = _copy(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+# Tables referenced by a SELECT, lower-cased
+def tables_in(query):
+    return sorted({name.lower() for name in re.findall(r"\b(?:FROM|JOIN)\s+`?(\w+)", query, re.IGNORECASE)})
+
+
+# Per-(user_id, table) write counters. Every committed write bumps the
+# tables it touched; readers put the current versions in their cache key, so
+# a write makes older results unreachable without scanning the cache.
+class TableVersions:
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def bump(self, user_id, tables):
+        with self._lock:
+            for table in tables:
+                key = (user_id, table.lower())
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def snapshot(self, user_id, tables):
+        with self._lock:
+            return tuple(self._versions.get((user_id, table.lower()), 0) for table in tables)
@@ -1,46 +1,306 @@
+import time
+import logging
+from itertools import islice
+import threading
+import traceback
+from contextlib import contextmanager
+
 import streamlit as st
-import mysql.connector
+import pandas as pd
 from mysql.connector import Error
+from mysql.connector.errors import PoolError
+from mysql.connector.pooling import MySQLConnectionPool, CNX_POOL_MAXSIZE
 
-# Establish MySQL connection using Streamlit secrets
-def get_connection():
-    try:
-        conn = mysql.connector.connect(
-            host=st.secrets["host"],
-            user=st.secrets["user"],
-            password=st.secrets["password"],
-            database=st.secrets["database"]
+from cache import QueryCache, TableVersions, tables_in
+from ledger import apply_row_changes, tracks, affected_tables
+from instrumentation import instrument
+
+logger = logging.getLogger(__name__)
+
+# Pool defaults, each can be overridden in .streamlit/secrets.toml
+DEFAULT_POOL_SIZE = 5
+DEFAULT_POOL_TIMEOUT = 10   # seconds to wait for a free connection
+DEFAULT_LEAK_SECONDS = 60   # checkouts held longer than this are reported as leaks
+DEFAULT_CHUNK_SIZE = 5000   # rows per executemany batch in bulk_insert
+DEFAULT_CACHE_TTL = 3600    # seconds a cached query result stays fresh
+DEFAULT_CACHE_MB = 256      # memory budget shared by all users' cached results
+
+
+# Connection settings shared by the pool and the migration tooling
+def connection_config():
+    return {
+        "host": st.secrets["host"],
+        "user": st.secrets["user"],
+        "password": st.secrets["password"],
+        "database": st.secrets["database"],
+        "port": int(st.secrets.get("port", 3306)),
+    }
+
+
+# Process-wide pool with health-checked checkout and leak tracking
+class ConnectionPool:
+    def __init__(self, config, size, timeout, leak_seconds):
+        self.size = max(1, min(int(size), CNX_POOL_MAXSIZE))
+        self.timeout = float(timeout)
+        self.leak_seconds = float(leak_seconds)
+        self._pool = MySQLConnectionPool(
+            pool_name="retail_pulse",
+            pool_size=self.size,
+            pool_reset_session=True,
+            **config
         )
+        self._lock = threading.Lock()
+        self._checked_out = {}
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                conn = self._pool.get_connection()
+                break
+            except PoolError:
+                if time.monotonic() >= deadline:
+                    self.report_leaks()
+                    raise PoolError(
+                        f"No free connection after {self.timeout:.0f}s "
+                        f"({self.size} in use)"
+                    )
+                time.sleep(0.05)
+
+        # Health check: transparently reopen connections the server dropped
+        try:
+            conn.ping(reconnect=True, attempts=2, delay=0)
+        except Error:
+            conn.close()
+            raise
+
+        with self._lock:
+            self._checked_out[id(conn)] = (time.monotonic(), traceback.extract_stack(limit=8)[:-3])
         return conn
+
+    def release(self, conn):
+        with self._lock:
+            self._checked_out.pop(id(conn), None)
+        # Closing a pooled connection hands it back to the pool
+        conn.close()
+
+    def leaks(self):
+        now = time.monotonic()
+        with self._lock:
+            held = list(self._checked_out.values())
+        return [(now - since, stack) for since, stack in held if now - since > self.leak_seconds]
+
+    def report_leaks(self):
+        for age, stack in self.leaks():
+            logger.warning(
+                "MySQL connection held for %.0fs without being returned, checked out at:\n%s",
+                age, "".join(traceback.format_list(stack))
+            )
+
+    def status(self):
+        with self._lock:
+            in_use = len(self._checked_out)
+        return {"size": self.size, "in_use": in_use, "leaked": len(self.leaks())}
+
+
+@st.cache_resource
+def get_pool():
+    return ConnectionPool(
+        connection_config(),
+        size=st.secrets.get("pool_size", DEFAULT_POOL_SIZE),
+        timeout=st.secrets.get("pool_timeout", DEFAULT_POOL_TIMEOUT),
+        leak_seconds=st.secrets.get("pool_leak_seconds", DEFAULT_LEAK_SECONDS),
+    )
+
+
+# Check out a pooled connection for the duration of a with-block. The
+# connection is instrumented, so every statement on it is measured.
+@contextmanager
+def connection():
+    pool = get_pool()
+    conn = pool.acquire()
+    wrapped = instrument(conn)
+    try:
+        yield wrapped
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        wrapped.finish()
+        pool.release(conn)
+
+
+@st.cache_resource
+def get_query_cache():
+    return QueryCache(
+        ttl=st.secrets.get("cache_ttl_seconds", DEFAULT_CACHE_TTL),
+        max_bytes=int(float(st.secrets.get("cache_max_mb", DEFAULT_CACHE_MB)) * 1024 * 1024),
+    )
+
+
+@st.cache_resource
+def get_table_versions():
+    return TableVersions()
+
+
+# Serve a user's query result from the cache, loading it on a miss. The key
+# includes the user's write version of every table the query reads, so any
+# committed write to those tables makes older entries unreachable.
+# `namespace` separates results of the same query that were post-processed
+# differently. Queries made without a user_id (e.g. login) are never cached.
+def cached(user_id, query, params, load, tables=None, namespace="raw"):
+    if user_id is None:
+        return load()
+    tables = tables or tables_in(query)
+    versions = get_table_versions().snapshot(user_id, tables)
+    key = (user_id, namespace, " ".join(query.split()), tuple(params or ()), versions)
+    return get_query_cache().get_or_load(key, load)
+
+
+# Record a committed write so cached reads of these tables are refreshed
+def bump_versions(user_id, tables):
+    get_table_versions().bump(user_id, tables)
+
+
+def _fetch_rows(query, params):
+    with connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(query, params or ())
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+
+# Execute SELECT queries
+def fetch_data(query, params=None, user_id=None, tables=None):
+    try:
+        return cached(user_id, query, params, lambda: _fetch_rows(query, params), tables)
     except Error as e:
         st.error(f"Error connecting to MySQL: {e}")
-        return None
+        return []
+
+
+def _read_frame(query, params):
+    with connection() as conn:
+        return pd.read_sql(query, conn, params=params)
+
+
+# Execute SELECT queries into a DataFrame
+def read_sql(query, params=None, user_id=None, tables=None):
+    return cached(user_id, query, params, lambda: _read_frame(query, params), tables)
 
-# Execute SELECT queries
-def fetch_data(query, params=None):
-    conn = get_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(query, params or ())
-        result = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return result
-    return []
 
 # Execute INSERT, UPDATE, DELETE queries
 def execute_query(query, params=None):
-    conn = get_connection()
-    if conn:
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, params or ())
+                conn.commit()
+                return True
+            finally:
+                cursor.close()
+    except Error as e:
+        st.error(f"Query execution error: {e}")
+        return False
+
+
+# Insert many rows over one connection and one transaction. Rows are sent
+# in executemany batches of chunk_size; on_chunk(rows_done) is called after
+# each batch. Any failure rolls back the whole load.
+def bulk_insert(table, columns, rows, chunk_size=DEFAULT_CHUNK_SIZE, on_chunk=None):
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    rows = iter(rows)
+    done = 0
+    owners = set()
+    with connection() as conn:
         cursor = conn.cursor()
         try:
-            cursor.execute(query, params or ())
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                cursor.executemany(query, chunk)
+                if tracks(table):
+                    apply_row_changes(cursor, table, [dict(zip(columns, row)) for row in chunk], +1)
+                if "user_id" in columns:
+                    owners.update(row[columns.index("user_id")] for row in chunk)
+                done += len(chunk)
+                if on_chunk:
+                    on_chunk(done)
             conn.commit()
-            return True
-        except Error as e:
-            st.error(f"Query execution error: {e}")
-            return False
         finally:
             cursor.close()
-            conn.close()
-    return False
+    for user_id in owners:
+        bump_versions(user_id, affected_tables(table))
+    return done
+
+
+# --- Write API -----------------------------------------------------------
+# Inserts, updates and deletes on user data go through these helpers so the
+# summary tables in ledger.py change in the same transaction as the rows,
+# and the table versions used by the read cache are bumped after commit.
+
+def _where(user_id, where):
+    clause = " AND ".join(["user_id = %s"] + [f"{col} = %s" for col in where])
+    return clause, (user_id, *where.values())
+
+
+def _run_write(user_id, table, write):
+    try:
+        with connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                write(cursor)
+                conn.commit()
+            finally:
+                cursor.close()
+        bump_versions(user_id, affected_tables(table))
+        return True
+    except Error as e:
+        st.error(f"Query execution error: {e}")
+        return False
+
+
+# Insert one row owned by user_id; values maps column -> value
+def insert_row(table, user_id, values):
+    columns = ["user_id", *values]
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+    def write(cursor):
+        cursor.execute(query, (user_id, *values.values()))
+        apply_row_changes(cursor, table, [{"user_id": user_id, **values}], +1)
+    return _run_write(user_id, table, write)
+
+
+# Update the user's rows matching `where` (column -> value) with `values`
+def update_rows(table, user_id, where, values):
+    clause, params = _where(user_id, where)
+    assignments = ", ".join(f"{col} = %s" for col in values)
+
+    def write(cursor):
+        old_rows = []
+        if tracks(table):
+            cursor.execute(f"SELECT * FROM {table} WHERE {clause} FOR UPDATE", params)
+            old_rows = cursor.fetchall()
+        cursor.execute(f"UPDATE {table} SET {assignments} WHERE {clause}", (*values.values(), *params))
+        apply_row_changes(cursor, table, old_rows, -1)
+        apply_row_changes(cursor, table, [{**row, **values} for row in old_rows], +1)
+    return _run_write(user_id, table, write)
+
+
+# Delete the user's rows matching `where` (column -> value)
+def delete_rows(table, user_id, where):
+    clause, params = _where(user_id, where)
+
+    def write(cursor):
+        old_rows = []
+        if tracks(table):
+            cursor.execute(f"SELECT * FROM {table} WHERE {clause} FOR UPDATE", params)
+            old_rows = cursor.fetchall()
+        cursor.execute(f"DELETE FROM {table} WHERE {clause}", params)
+        apply_row_changes(cursor, table, old_rows, -1)
+    return _run_write(user_id, table, write)
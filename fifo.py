@@ -0,0 +1,280 @@
+import numpy as np
+import pandas as pd
+from db import connection, fetch_data, read_sql, bump_versions
+
+# FIFO cost layers. Every purchase becomes a layer and sales consume layers
+# oldest first. For each product the layers are stored with running totals
+# (cum_qty_end, cum_cost_end), so the cost of the first q units ever
+# bought is a piecewise-linear function of q. A sale covering units
+# (S - qty, S] then costs C(S) - C(S - qty), which np.interp evaluates for
+# all of a product's new sales at once (units sold beyond every layer are
+# costed at the last purchase price, or the product's list cost price if
+# it was never bought). Processing is incremental: id watermarks in
+# fifo_watermarks mark the rows already layered, and only newer rows are
+# read on the next refresh. Editing or deleting a row that
+# was already layered marks its product dirty (see ledger.py); a dirty
+# product is rebuilt from its full history. Layers follow purchase_id
+# order, i.e. the order purchases were recorded. A missing quantity or
+# cost counts as 0, as it does in the ledger's summaries.
+#
+# Auto-increment ids are handed out at insert time, not at commit, so a
+# long upload can commit rows below a watermark that a quicker insert
+# already moved past. refresh() compares the number of rows at or below
+# each watermark with the number layered; when they differ, the products
+# with unlayered rows are rebuilt like dirty ones.
+AGE_BUCKETS = [-np.inf, 30, 60, 90, 180, np.inf]
+AGE_LABELS = ["0-30 days", "31-60 days", "61-90 days", "91-180 days", "180+ days"]
+
+FIFO_TABLES = ["fifo_layers", "fifo_sale_costs", "fifo_products", "fifo_watermarks"]
+
+PENDING_QUERY = """
+    SELECT
+        (SELECT COALESCE(MAX(purchase_id), 0) FROM Purchases WHERE user_id = %s) AS max_purchase_id,
+        (SELECT COALESCE(MAX(sale_id), 0) FROM Sales WHERE user_id = %s) AS max_sale_id,
+        (SELECT COUNT(*) FROM fifo_products WHERE user_id = %s AND dirty = 1) AS dirty,
+        (SELECT last_purchase_id FROM fifo_watermarks WHERE user_id = %s) AS last_purchase_id,
+        (SELECT last_sale_id FROM fifo_watermarks WHERE user_id = %s) AS last_sale_id,
+        (SELECT COUNT(*) FROM Purchases p JOIN fifo_watermarks w ON w.user_id = p.user_id
+         WHERE p.user_id = %s AND p.product_id IS NOT NULL AND p.purchase_id <= w.last_purchase_id) AS purchases_below,
+        (SELECT COUNT(*) FROM fifo_layers WHERE user_id = %s) AS purchases_layered,
+        (SELECT COUNT(*) FROM Sales s JOIN fifo_watermarks w ON w.user_id = s.user_id
+         WHERE s.user_id = %s AND s.product_id IS NOT NULL AND s.sale_id <= w.last_sale_id) AS sales_below,
+        (SELECT COUNT(*) FROM fifo_sale_costs WHERE user_id = %s) AS sales_layered
+"""
+
+REMAINING_QUERY = """
+    SELECT
+        l.product_id, l.purchase_id, l.order_date, l.unit_cost,
+        l.cum_qty_end - GREATEST(fp.sold_qty, l.cum_qty_end - l.quantity) AS remaining
+    FROM fifo_layers l
+    JOIN fifo_products fp ON fp.user_id = l.user_id AND fp.product_id = l.product_id
+    WHERE l.user_id = %s AND l.cum_qty_end > fp.sold_qty
+"""
+
+STATE_COLUMNS = ["purchased_qty", "purchased_cost", "sold_qty", "last_unit_cost"]
+
+
+def _in_list(values):
+    return ", ".join(["%s"] * len(values))
+
+
+# Purchases or sales to layer: rows past the watermark, plus every row of
+# the dirty products, up to `top`
+def _new_rows(cursor, user_id, query, id_column, last, top, dirty):
+    clause, params = f"{id_column} > %s", [last]
+    if dirty:
+        clause = f"({id_column} > %s OR product_id IN ({_in_list(dirty)}))"
+        params += dirty
+    cursor.execute(
+        f"{query} WHERE user_id = %s AND product_id IS NOT NULL AND {id_column} <= %s AND {clause} ORDER BY product_id, {id_column}",
+        (user_id, top, *params),
+    )
+    return cursor.fetchall()
+
+
+# Layers of the given products that still hold unsold units
+def _open_layers(cursor, user_id, products):
+    if not products:
+        return pd.DataFrame(columns=["product_id", "quantity", "unit_cost", "cum_qty_end", "cum_cost_end"])
+    cursor.execute(f"""
+        SELECT l.product_id, l.quantity, l.unit_cost, l.cum_qty_end, l.cum_cost_end
+        FROM fifo_layers l
+        JOIN fifo_products fp ON fp.user_id = l.user_id AND fp.product_id = l.product_id
+        WHERE l.user_id = %s AND l.cum_qty_end > fp.sold_qty AND l.product_id IN ({_in_list(products)})
+    """, (user_id, *products))
+    return pd.DataFrame(cursor.fetchall(), columns=["product_id", "quantity", "unit_cost", "cum_qty_end", "cum_cost_end"])
+
+
+# COGS of each sale of one product given its open layers (sorted). Units
+# sold past the last layer are costed at the latest known unit cost.
+def _product_cogs(layers, sold_before, quantities, purchased_qty, purchased_cost, last_unit_cost):
+    if len(layers):
+        q = np.r_[layers["cum_qty_end"].iloc[0] - layers["quantity"].iloc[0], layers["cum_qty_end"].to_numpy()]
+        c = np.r_[layers["cum_cost_end"].iloc[0] - layers["quantity"].iloc[0] * layers["unit_cost"].iloc[0], layers["cum_cost_end"].to_numpy()]
+        last_unit_cost = layers["unit_cost"].iloc[-1]
+    else:
+        q, c = np.array([purchased_qty]), np.array([purchased_cost])
+
+    def cost_at(units):
+        return np.where(units <= q[-1], np.interp(units, q, c), c[-1] + (units - q[-1]) * last_unit_cost)
+
+    sold_end = sold_before + np.cumsum(quantities)
+    return cost_at(sold_end) - cost_at(sold_end - quantities)
+
+
+# Products with rows at or below the watermarks that were never layered:
+# rows that committed after a refresh had already moved past their ids
+def _late_products(cursor, user_id, watermark):
+    products = set()
+    for table, id_column, layered in (("Purchases", "purchase_id", "fifo_layers"), ("Sales", "sale_id", "fifo_sale_costs")):
+        cursor.execute(f"""
+            SELECT DISTINCT t.product_id
+            FROM {table} t
+            LEFT JOIN {layered} f ON f.user_id = t.user_id AND f.{id_column} = t.{id_column}
+            WHERE t.user_id = %s AND t.product_id IS NOT NULL AND t.{id_column} <= %s AND f.{id_column} IS NULL
+        """, (user_id, watermark[f"last_{id_column}"]))
+        products.update(int(row["product_id"]) for row in cursor.fetchall())
+    return products
+
+
+def _advance(cursor, user_id, recount=False):
+    cursor.execute("INSERT IGNORE INTO fifo_watermarks (user_id, last_purchase_id, last_sale_id) VALUES (%s, 0, 0)", (user_id,))
+    cursor.execute("SELECT last_purchase_id, last_sale_id FROM fifo_watermarks WHERE user_id = %s FOR UPDATE", (user_id,))
+    watermark = cursor.fetchone()
+    cursor.execute("SELECT COALESCE(MAX(purchase_id), 0) AS top FROM Purchases WHERE user_id = %s", (user_id,))
+    top_purchase = cursor.fetchone()["top"]
+    cursor.execute("SELECT COALESCE(MAX(sale_id), 0) AS top FROM Sales WHERE user_id = %s", (user_id,))
+    top_sale = cursor.fetchone()["top"]
+
+    cursor.execute(f"SELECT product_id, {', '.join(STATE_COLUMNS)}, dirty FROM fifo_products WHERE user_id = %s FOR UPDATE", (user_id,))
+    state = pd.DataFrame(cursor.fetchall(), columns=["product_id", *STATE_COLUMNS, "dirty"]).set_index("product_id")
+    state[STATE_COLUMNS] = state[STATE_COLUMNS].astype(float)
+    dirty = {int(product_id) for product_id in state.index[state["dirty"] == 1]}
+    if recount:
+        dirty |= _late_products(cursor, user_id, watermark)
+    dirty = sorted(dirty)
+    if dirty:
+        state = state.reindex(state.index.union(dirty))
+        for table in ("fifo_layers", "fifo_sale_costs"):
+            cursor.execute(f"DELETE FROM {table} WHERE user_id = %s AND product_id IN ({_in_list(dirty)})", (user_id, *dirty))
+        state.loc[dirty, STATE_COLUMNS] = 0.0
+
+    purchases = pd.DataFrame(_new_rows(
+        cursor, user_id, "SELECT purchase_id, product_id, order_date, COALESCE(quantity_purchased, 0) AS quantity, COALESCE(cost_price, 0) AS unit_cost FROM Purchases",
+        "purchase_id", watermark["last_purchase_id"], top_purchase, dirty,
+    ), columns=["purchase_id", "product_id", "order_date", "quantity", "unit_cost"])
+    sales = pd.DataFrame(_new_rows(
+        cursor, user_id, "SELECT sale_id, product_id, sale_date, COALESCE(quantity_sold, 0) AS quantity FROM Sales",
+        "sale_id", watermark["last_sale_id"], top_sale, dirty,
+    ), columns=["sale_id", "product_id", "sale_date", "quantity"])
+
+    touched = sorted(set(purchases["product_id"]) | set(sales["product_id"]) | set(dirty))
+    state = state.reindex(state.index.union(touched)).fillna({column: 0.0 for column in STATE_COLUMNS})
+
+    # New layers continue each product's running totals
+    purchases[["quantity", "unit_cost"]] = purchases[["quantity", "unit_cost"]].astype(float)
+    by_product = purchases.groupby("product_id", sort=False)
+    purchases["cum_qty_end"] = purchases["product_id"].map(state["purchased_qty"]) + by_product["quantity"].cumsum()
+    purchases["cum_cost_end"] = (
+        purchases["product_id"].map(state["purchased_cost"])
+        + (purchases["quantity"] * purchases["unit_cost"]).groupby(purchases["product_id"]).cumsum()
+    )
+
+    # Cost every new sale against the product's open and new layers
+    sales["quantity"] = sales["quantity"].astype(float)
+    sales["cogs"] = 0.0
+    if not sales.empty:
+        open_layers = _open_layers(cursor, user_id, [int(p) for p in sales["product_id"].unique() if p not in dirty])
+        layers = pd.concat([open_layers.astype(float), purchases[open_layers.columns].astype(float)], ignore_index=True)
+        layers = layers.sort_values(["product_id", "cum_qty_end"])
+        layer_groups = dict(tuple(layers.groupby("product_id")))
+        empty = layers.iloc[0:0]
+        cursor.execute("SELECT product_id, cost_price FROM Products WHERE user_id = %s", (user_id,))
+        list_cost = {row["product_id"]: float(row["cost_price"] or 0) for row in cursor.fetchall()}
+        for product_id, rows in sales.groupby("product_id", sort=False):
+            before = state.loc[product_id]
+            sales.loc[rows.index, "cogs"] = _product_cogs(
+                layer_groups.get(float(product_id), empty), before["sold_qty"], rows["quantity"].to_numpy(),
+                before["purchased_qty"], before["purchased_cost"],
+                before["last_unit_cost"] or list_cost.get(product_id, 0.0),
+            )
+
+    # Roll the per-product totals forward
+    bought = purchases.groupby("product_id").agg(qty=("quantity", "sum"), last_cost=("unit_cost", "last"))
+    bought["cost"] = (purchases["quantity"] * purchases["unit_cost"]).groupby(purchases["product_id"]).sum()
+    sold = sales.groupby("product_id")["quantity"].sum()
+    state.loc[bought.index, "purchased_qty"] += bought["qty"]
+    state.loc[bought.index, "purchased_cost"] += bought["cost"]
+    state.loc[bought.index, "last_unit_cost"] = bought["last_cost"]
+    state.loc[sold.index, "sold_qty"] += sold
+
+    if not purchases.empty:
+        cursor.executemany("""
+            INSERT INTO fifo_layers (user_id, product_id, purchase_id, order_date, quantity, unit_cost, cum_qty_end, cum_cost_end)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, [
+            (user_id, int(row.product_id), int(row.purchase_id), row.order_date,
+             float(row.quantity), float(row.unit_cost), float(row.cum_qty_end), float(row.cum_cost_end))
+            for row in purchases.itertuples(index=False)
+        ])
+    if not sales.empty:
+        cursor.executemany("""
+            INSERT INTO fifo_sale_costs (user_id, sale_id, product_id, sale_date, quantity, cogs)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, [
+            (user_id, int(row.sale_id), int(row.product_id), row.sale_date, float(row.quantity), float(row.cogs))
+            for row in sales.itertuples(index=False)
+        ])
+    if touched:
+        cursor.executemany(f"""
+            INSERT INTO fifo_products (user_id, product_id, {', '.join(STATE_COLUMNS)}, dirty)
+            VALUES (%s, %s, %s, %s, %s, %s, 0)
+            ON DUPLICATE KEY UPDATE
+                {', '.join(f"{column} = VALUES({column})" for column in STATE_COLUMNS)}, dirty = 0
+        """, [
+            (user_id, int(product_id), *(float(state.at[product_id, column]) for column in STATE_COLUMNS))
+            for product_id in touched
+        ])
+    cursor.execute(
+        "UPDATE fifo_watermarks SET last_purchase_id = %s, last_sale_id = %s WHERE user_id = %s",
+        (top_purchase, top_sale, user_id),
+    )
+
+
+# Layer any purchases and sales recorded since the last refresh and rebuild
+# dirty products. Cheap when nothing changed: one cached status query.
+def refresh(user_id):
+    rows = fetch_data(PENDING_QUERY, (user_id,) * 9, user_id=user_id)
+    if not rows:
+        return
+    status = rows[0]
+    recount = (status["purchases_below"] != status["purchases_layered"]
+               or status["sales_below"] != status["sales_layered"])
+    if (not status["dirty"] and not recount
+            and status["max_purchase_id"] == (status["last_purchase_id"] or 0)
+            and status["max_sale_id"] == (status["last_sale_id"] or 0)):
+        return
+    with connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            _advance(cursor, user_id, recount)
+            conn.commit()
+        finally:
+            cursor.close()
+    bump_versions(user_id, FIFO_TABLES)
+
+
+# FIFO cost of goods sold across all of the user's sales
+def total_cogs(user_id):
+    rows = fetch_data("SELECT COALESCE(SUM(cogs), 0) AS cogs FROM fifo_sale_costs WHERE user_id = %s", (user_id,), user_id=user_id)
+    return float(rows[0]["cogs"]) if rows else 0.0
+
+
+# Per-sale FIFO cost
+def sale_costs(user_id):
+    df = read_sql("SELECT sale_id, product_id, sale_date, quantity, cogs FROM fifo_sale_costs WHERE user_id = %s", (user_id,), user_id=user_id)
+    return df.astype({"quantity": float, "cogs": float})
+
+
+# Units still held in each layer, with their value and age in days
+def remaining_layers(user_id):
+    df = read_sql(REMAINING_QUERY, (user_id,), user_id=user_id).astype({"unit_cost": float, "remaining": float})
+    df["value"] = df["remaining"] * df["unit_cost"]
+    df["age_days"] = (pd.Timestamp.now().normalize() - pd.to_datetime(df["order_date"])).dt.days
+    return df
+
+
+# Remaining units and FIFO value per product
+def valuation(user_id):
+    layers = remaining_layers(user_id)
+    return layers.groupby("product_id")[["remaining", "value"]].sum().reset_index()
+
+
+# Remaining units per product in each age bucket, plus the oldest layer's age
+def ageing(user_id):
+    layers = remaining_layers(user_id)
+    layers["bucket"] = pd.cut(layers["age_days"], AGE_BUCKETS, labels=AGE_LABELS)
+    buckets = layers.pivot_table(index="product_id", columns="bucket", values="remaining", aggfunc="sum", fill_value=0, observed=False)
+    buckets = buckets.reindex(columns=AGE_LABELS, fill_value=0)
+    buckets["oldest_days"] = layers.groupby("product_id")["age_days"].max()
+    return buckets.reset_index()
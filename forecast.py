@@ -0,0 +1,283 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from db import connection, read_sql, fetch_data, bump_versions
+
+logger = logging.getLogger(__name__)
+
+# Demand forecasts for a user's whole catalog. Monthly units sold come from
+# the sales_daily rollup as a product x month matrix, every product is
+# fitted at once with exponential smoothing (additive seasonality when
+# there are two full seasons of history), and the results are stored in
+# sales_forecasts so any product's forecast is a single indexed read.
+# Stored forecasts and runs are kept per method ("smoothing" here,
+# "prophet" in prophet_backend), so the backends never replace each other's.
+# Refits run on a background thread; until one finishes the page keeps
+# showing the last stored (stale) forecast. A refit that fails is recorded
+# against its data version and not retried until the sales history changes.
+HORIZON = 3                  # months forecast past the last month of history
+SEASON_LENGTH = 12           # months per season
+SEASON_SMOOTHING = 0.3       # gamma for the seasonal component
+ALPHAS = np.linspace(0.1, 0.9, 9)   # level smoothing values tried per product
+
+MONTHLY_DEMAND_QUERY = """
+    SELECT
+        product_id,
+        DATE_SUB(day, INTERVAL DAY(day) - 1 DAY) AS month,
+        SUM(units) AS quantity_sold
+    FROM sales_daily
+    WHERE user_id = %s
+    GROUP BY product_id, month
+"""
+
+# Changes whenever a sale is added, edited or removed. The checksum is an
+# order-independent sum over (product, day, units), so moving units from
+# one product or day to another changes it even when the totals do not.
+FINGERPRINT_QUERY = """
+    SELECT COUNT(*) AS days, COALESCE(SUM(units), 0) AS units,
+           COALESCE(SUM(revenue), 0) AS revenue, MAX(day) AS last_day,
+           COALESCE(SUM(CRC32(CONCAT_WS(':', product_id, day, units))), 0) AS checksum
+    FROM sales_daily
+    WHERE user_id = %s
+"""
+
+FORECAST_QUERY = """
+    SELECT month, quantity_sold, forecast
+    FROM sales_forecasts
+    WHERE user_id = %s AND method = %s AND product_id = %s
+    ORDER BY month
+"""
+
+RUN_QUERY = "SELECT data_version, method, created_at FROM forecast_runs WHERE user_id = %s AND method = %s"
+FAILURE_QUERY = "SELECT data_version, error, failed_at FROM forecast_failures WHERE user_id = %s AND method = %s"
+
+
+# Product x month matrix of units sold from (product_id, month,
+# quantity_sold) rows (rows: product_id, columns: month start, every month
+# from the first sale to the last, zeros where no sales)
+def monthly_matrix(demand):
+    if demand.empty:
+        return pd.DataFrame(dtype=float)
+    demand['month'] = pd.to_datetime(demand['month'])
+    demand['quantity_sold'] = demand['quantity_sold'].astype(float)
+    matrix = demand.pivot_table(index='product_id', columns='month', values='quantity_sold', aggfunc='sum', fill_value=0.0)
+    months = pd.date_range(matrix.columns.min(), matrix.columns.max(), freq='MS')
+    return matrix.reindex(columns=months, fill_value=0.0)
+
+
+def demand_matrix(user_id):
+    return monthly_matrix(read_sql(MONTHLY_DEMAND_QUERY, (user_id,), user_id=user_id))
+
+
+# One-step-ahead fitted values and `horizon` forecasts for every row of y
+# (products x periods) and every alpha, in one pass over time. Each product
+# starts at its first non-zero period; before that its fit is NaN.
+def _smooth(y, alphas, season_length=None, gamma=SEASON_SMOOTHING, horizon=HORIZON):
+    n_alpha, (n_products, n_periods) = len(alphas), y.shape
+    alpha = alphas[:, None]
+    seasonal = bool(season_length) and n_periods >= 2 * season_length
+    m = season_length if seasonal else 1
+    season = np.zeros((n_alpha, n_products, m))
+    if seasonal:
+        first = y[:, :m]
+        season[:] = first - first.mean(axis=1, keepdims=True)
+
+    started = np.cumsum(y > 0, axis=1) > 0
+    level = np.zeros((n_alpha, n_products))
+    fitted = np.full((n_alpha, n_products, n_periods), np.nan)
+    for t in range(n_periods):
+        s = season[:, :, t % m]
+        active = started[:, t] & (t > 0) & started[:, t - 1] if t else np.zeros(n_products, bool)
+        fitted[:, :, t] = np.where(active, level + s, np.nan)
+        new_level = np.where(active, alpha * (y[:, t] - s) + (1 - alpha) * level, y[:, t] - s)
+        if seasonal:
+            season[:, :, t % m] = np.where(active, gamma * (y[:, t] - new_level) + (1 - gamma) * s, s)
+        level = new_level
+
+    steps = (n_periods + np.arange(horizon)) % m
+    ahead = level[:, :, None] + season[:, :, steps]
+    return fitted, np.clip(ahead, 0, None)
+
+
+# Fit every product in the matrix, picking the alpha with the lowest
+# squared one-step error per product. Returns (fitted, forecast) arrays of
+# shape products x periods and products x horizon.
+def fit_all(matrix, season_length=SEASON_LENGTH, horizon=HORIZON, alphas=ALPHAS):
+    y = matrix.to_numpy(dtype=float)
+    fitted, ahead = _smooth(y, np.asarray(alphas, dtype=float), season_length, horizon=horizon)
+    errors = np.nansum((fitted - y[None]) ** 2, axis=2)
+    best = errors.argmin(axis=0)
+    rows = np.arange(y.shape[0])
+    return fitted[best, rows], ahead[best, rows]
+
+
+# Long-format frame of actuals, fitted values and forecasts for storage
+def forecast_frame(matrix, fitted, ahead):
+    history = pd.DataFrame({
+        'product_id': np.repeat(matrix.index.to_numpy(), matrix.shape[1]),
+        'month': np.tile(matrix.columns.to_numpy(), matrix.shape[0]),
+        'quantity_sold': matrix.to_numpy().ravel(),
+        'forecast': fitted.ravel(),
+    })
+    future_months = pd.date_range(matrix.columns.max() + pd.offsets.MonthBegin(), periods=ahead.shape[1], freq='MS')
+    future = pd.DataFrame({
+        'product_id': np.repeat(matrix.index.to_numpy(), ahead.shape[1]),
+        'month': np.tile(future_months.to_numpy(), matrix.shape[0]),
+        'quantity_sold': np.nan,
+        'forecast': ahead.ravel(),
+    })
+    return pd.concat([history, future], ignore_index=True)
+
+
+# Identifies the sales history a stored forecast was computed from
+def data_version(user_id):
+    rows = fetch_data(FINGERPRINT_QUERY, (user_id,), user_id=user_id)
+    return hashlib.sha1(repr(rows[0] if rows else None).encode()).hexdigest()[:16]
+
+
+def last_run(user_id, method="smoothing"):
+    rows = fetch_data(RUN_QUERY, (user_id, method), user_id=user_id)
+    return rows[0] if rows else None
+
+
+def last_failure(user_id, method="smoothing"):
+    rows = fetch_data(FAILURE_QUERY, (user_id, method), user_id=user_id)
+    return rows[0] if rows else None
+
+
+# Remember that a refit of this data version failed, so it is not retried
+# until the sales history changes
+def record_failure(user_id, method, version, error):
+    with connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                REPLACE INTO forecast_failures (user_id, method, data_version, error, failed_at)
+                VALUES (%s, %s, %s, %s, NOW())
+            """, (user_id, method, version, str(error)[:1000]))
+            conn.commit()
+        finally:
+            cursor.close()
+    bump_versions(user_id, ["forecast_failures"])
+
+
+# Replace the user's stored forecasts of one method in one transaction
+def store_forecasts(user_id, frame, version, method):
+    def cell(value):
+        return None if pd.isna(value) else float(value)
+    rows = [
+        (user_id, method, int(product_id), month.date(), cell(actual), cell(predicted))
+        for product_id, month, actual, predicted in frame[['product_id', 'month', 'quantity_sold', 'forecast']].itertuples(index=False)
+    ]
+    with connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM sales_forecasts WHERE user_id = %s AND method = %s", (user_id, method))
+            if rows:
+                cursor.executemany("""
+                    INSERT INTO sales_forecasts (user_id, method, product_id, month, quantity_sold, forecast)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, rows)
+            cursor.execute("""
+                REPLACE INTO forecast_runs (user_id, data_version, method, created_at)
+                VALUES (%s, %s, %s, NOW())
+            """, (user_id, version, method))
+            cursor.execute("DELETE FROM forecast_failures WHERE user_id = %s AND method = %s", (user_id, method))
+            conn.commit()
+        finally:
+            cursor.close()
+    bump_versions(user_id, ["sales_forecasts", "forecast_runs", "forecast_failures"])
+
+
+# Fit the whole catalog and store the result
+def refresh_forecasts(user_id, season_length=SEASON_LENGTH):
+    version = data_version(user_id)
+    matrix = demand_matrix(user_id)
+    if matrix.empty:
+        frame = pd.DataFrame(columns=['product_id', 'month', 'quantity_sold', 'forecast'])
+    else:
+        frame = forecast_frame(matrix, *fit_all(matrix, season_length))
+    store_forecasts(user_id, frame, version, "smoothing")
+    return frame
+
+
+_refits_lock = threading.Lock()
+
+
+@st.cache_resource
+def get_refit_executor():
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="forecast")
+
+
+# Running smoothing refits by user_id: {"version", "future"}
+@st.cache_resource
+def get_refits():
+    return {}
+
+
+# Queue a refit of the catalog unless one for this data version is running
+def start_refit(user_id, version):
+    with _refits_lock:
+        job = get_refits().get(user_id)
+        if job is not None and job["version"] == version:
+            return job
+        job = {"version": version, "future": get_refit_executor().submit(refresh_forecasts, user_id)}
+        get_refits()[user_id] = job
+        return job
+
+
+# Forget the user's refit once it has finished, recording it if it failed.
+# Returns the job while it is still running, otherwise None.
+def collect(user_id):
+    with _refits_lock:
+        job = get_refits().get(user_id)
+        if job is None or not job["future"].done():
+            return job
+        del get_refits()[user_id]
+    error = job["future"].exception()
+    if error is not None:
+        logger.warning("Forecast refit failed for user %s: %s", user_id, error)
+        record_failure(user_id, "smoothing", job["version"], error)
+    return None
+
+
+# Make sure a forecast of the current sales history is stored or on its
+# way. Returns the running job (the stored forecast is stale until it
+# finishes), or None when the stored one is current or this history
+# already failed to fit.
+def ensure_forecasts(user_id):
+    job = collect(user_id)
+    if job is not None:
+        return job
+    version = data_version(user_id)
+    run = last_run(user_id)
+    if run is not None and run["data_version"] == version:
+        return None
+    failure = last_failure(user_id)
+    if failure is not None and failure["data_version"] == version:
+        return None
+    return start_refit(user_id, version)
+
+
+# Stored actuals, fitted values and forecasts for one product
+def load_forecast(user_id, product_id, method="smoothing"):
+    df = read_sql(FORECAST_QUERY, (user_id, method, int(product_id)), user_id=user_id)
+    df['month'] = pd.to_datetime(df['month'])
+    return df.astype({'quantity_sold': float, 'forecast': float})
+
+
+# Next-month forecast for every product, for the catalog download
+def catalog_forecast(user_id, method="smoothing"):
+    df = read_sql("""
+        SELECT f.product_id, p.Name, f.month, f.forecast
+        FROM sales_forecasts f
+        LEFT JOIN Products p ON p.user_id = f.user_id AND p.product_id = f.product_id
+        WHERE f.user_id = %s AND f.method = %s AND f.quantity_sold IS NULL
+        ORDER BY f.product_id, f.month
+    """, (user_id, method), user_id=user_id)
+    return df.astype({'forecast': float})
@@ -0,0 +1,276 @@
+import os
+import sys
+import time
+import argparse
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from ingest import UPLOAD_SCHEMAS, COLUMN_NAMES
+
+# Synthetic retail data for load testing. Every tenant gets a catalog of
+# SKUs, a sales history with yearly and weekly seasonality, growth and a
+# Zipf-skewed product mix (a few products sell most units), purchases that
+# replenish what was sold, and monthly fixed and variable expenses. Output
+# is the same for the same seed and arguments, --end included (it defaults
+# to today, and is printed so a run can be repeated). Each tenant draws from
+# its own seed stream, so adding tenants does not change existing ones.
+#
+#   python generate_data.py --preset 1m --out data/1m   CSV files per tenant
+#   python generate_data.py --preset 10k --db            insert through db.bulk_insert
+#
+# CSV files have the headers handle_csv_upload expects. Purchases and Sales
+# refer to products by id, assuming the tenant's Products.csv is uploaded
+# into an empty Products table in tenant order (ids --first-product-id,
+# --first-product-id + 1, ...). With --db a Users row is created per tenant
+# and real ids are used; rows go through the normal write path, so the
+# summary tables are kept in step.
+
+# Approximate Sales row counts: 10k, 1M and 50M
+PRESETS = {
+    "10k": {"tenants": 1, "skus": 50, "years": 1, "sales_per_day": 27},
+    "1m": {"tenants": 10, "skus": 500, "years": 2, "sales_per_day": 137},
+    "50m": {"tenants": 100, "skus": 2000, "years": 5, "sales_per_day": 274},
+}
+
+CATEGORIES = ["Electronics", "Grocery", "Apparel", "Home", "Beauty", "Toys", "Sports", "Stationery"]
+# Day of year each category peaks on (festive season, summer, school start, ...)
+CATEGORY_PEAKS = {
+    "Electronics": 300, "Grocery": 290, "Apparel": 280, "Home": 310,
+    "Beauty": 45, "Toys": 355, "Sports": 140, "Stationery": 170,
+}
+VENDORS = [
+    "Apex Traders", "Bharat Wholesale", "Crescent Supply", "Delta Distributors",
+    "Evergreen Imports", "Fortune Agencies", "Global Sourcing", "Horizon Mart",
+]
+FIXED_EXPENSES = {"Rent": 60_000, "Salaries": 150_000, "Insurance": 8_000}
+VARIABLE_EXPENSES = {"Marketing": 0.04, "Shipping": 0.03, "Utilities": 0.01, "Maintenance": 0.005}
+
+SEASON_AMPLITUDE = 0.35        # peak-to-mean lift of a category's yearly cycle
+WEEKDAY_FACTORS = np.array([0.9, 0.85, 0.9, 0.95, 1.1, 1.3, 1.2])   # Monday .. Sunday
+YEARLY_GROWTH = 0.15           # sales volume growth per year
+ZIPF_EXPONENT = 1.1            # product popularity ~ 1 / rank ** exponent
+COST_INFLATION = 0.05          # yearly drift in purchase cost
+PAYMENT_TERMS = [15, 30, 45]   # days from order to payment due
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Generate synthetic Retail Pulse data")
+    parser.add_argument("--preset", choices=PRESETS, default="10k", help="scale preset (individual options override it)")
+    parser.add_argument("--tenants", type=int, help="number of users")
+    parser.add_argument("--skus", type=int, help="products per user")
+    parser.add_argument("--years", type=float, help="years of history per user")
+    parser.add_argument("--sales-per-day", type=float, help="average sales rows per user per day")
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today(), help="last day of history (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=42)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--out", help="directory to write CSV files to")
+    target.add_argument("--db", action="store_true", help="insert into the database in .streamlit/secrets.toml")
+    parser.add_argument("--first-product-id", type=int, default=1, help="product id the first generated product will get (CSV)")
+    parser.add_argument("--password", default="loadtest", help="password of the generated users (--db)")
+    args = parser.parse_args(argv)
+    for key, value in PRESETS[args.preset].items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+    return args
+
+
+# Products of one tenant, with each product's popularity and usual vendor
+def make_catalog(rng, skus):
+    category = rng.choice(CATEGORIES, skus)
+    cost = np.round(rng.lognormal(np.log(250), 0.9, skus), 2)
+    price = np.round(cost * rng.uniform(1.15, 1.9, skus), 2)
+    popularity = 1.0 / np.arange(1, skus + 1) ** ZIPF_EXPONENT
+    return pd.DataFrame({
+        "NAME": [f"{c} Item {i + 1:05d}" for i, c in enumerate(category)],
+        "category": category,
+        "cost_price": cost,
+        "selling_price": price,
+        "popularity": rng.permutation(popularity / popularity.sum()),
+        "vendor": rng.choice(VENDORS, skus),
+        "peak": [CATEGORY_PEAKS[c] for c in category],
+    })
+
+
+def _season(day_of_year, peak):
+    return 1 + SEASON_AMPLITUDE * np.cos(2 * np.pi * (day_of_year - peak) / 365.25)
+
+
+# Month starts covering [start, end]
+def _months(start, end):
+    first = pd.Timestamp(start).to_period("M").to_timestamp()
+    return pd.date_range(first, pd.Timestamp(end), freq="MS")
+
+
+# One month of sales, the purchases that replenish it and its expenses, as
+# frames with the upload CSV columns (product_id holds the catalog index)
+def make_month(rng, catalog, month, start, end, sales_per_day, today):
+    days = pd.date_range(max(month, pd.Timestamp(start)), min(month + pd.offsets.MonthEnd(), pd.Timestamp(end)), freq="D")
+    years_in = (days - pd.Timestamp(start)).days.to_numpy() / 365.25
+    mid_year_day = days[len(days) // 2].dayofyear
+    mix = catalog["popularity"].to_numpy() * _season(mid_year_day, catalog["peak"].to_numpy())
+    mix /= mix.sum()
+    volume = np.average(_season(days.dayofyear.to_numpy(), catalog["peak"].to_numpy()[:, None]), axis=0, weights=mix)
+    rate = sales_per_day * volume * WEEKDAY_FACTORS[days.dayofweek.to_numpy()] * (1 + YEARLY_GROWTH) ** years_in
+
+    counts = rng.poisson(rate)
+    n = int(counts.sum())
+    sale_date = np.repeat(days.to_numpy(), counts)
+    product = rng.choice(len(catalog), n, p=mix)
+    quantity = rng.geometric(0.55, n)
+    discount = np.where(rng.random(n) < 0.1, rng.uniform(0.05, 0.2, n), 0.0)
+    age = (today - pd.DatetimeIndex(sale_date)).days.to_numpy()
+    sales = pd.DataFrame({
+        "product_id": product,
+        "quantity_sold": quantity,
+        "selling_price": np.round(catalog["selling_price"].to_numpy()[product] * (1 - discount), 2),
+        "sale_date": sale_date,
+        "shipped": (rng.random(n) < np.where(age > 3, 0.98, 0.4)).astype(int),
+        "payment_received": (rng.random(n) < np.where(age > 15, 0.97, 0.5)).astype(int),
+    })
+
+    # Replenish what sold this month (plus a little buffer), ordered ahead
+    demand = np.bincount(product, weights=quantity, minlength=len(catalog))
+    ordered = np.flatnonzero(demand)
+    order_date = days[0] - pd.to_timedelta(rng.integers(2, 15, len(ordered)), unit="D")
+    inflation = (1 + COST_INFLATION) ** ((order_date - pd.Timestamp(start)).days.to_numpy() / 365.25)
+    due = order_date + pd.to_timedelta(rng.choice(PAYMENT_TERMS, len(ordered)), unit="D")
+    settled = np.where(rng.random(len(ordered)) < 0.95, "Completed", "Overdue")
+    purchases = pd.DataFrame({
+        "product_id": ordered,
+        "vendor_name": np.where(rng.random(len(ordered)) < 0.85, catalog["vendor"].to_numpy()[ordered], rng.choice(VENDORS, len(ordered))),
+        "quantity_purchased": np.ceil(demand[ordered] * rng.uniform(1.0, 1.2, len(ordered))).astype(int),
+        "cost_price": np.round(catalog["cost_price"].to_numpy()[ordered] * inflation * rng.uniform(0.95, 1.05, len(ordered)), 2),
+        "order_date": order_date,
+        "payment_due": due,
+        "payment_status": np.where(due > today, "Pending", settled),
+    })
+
+    revenue = float((sales["quantity_sold"] * sales["selling_price"]).sum())
+    fixed = [(days[0], category, "Fixed", amount, f"{category} for {days[0]:%B %Y}") for category, amount in FIXED_EXPENSES.items()]
+    variable = []
+    for category, share in VARIABLE_EXPENSES.items():
+        bills = max(1, rng.poisson(3))
+        amounts = revenue * share * rng.dirichlet(np.ones(bills)) if revenue else rng.uniform(500, 2000, bills)
+        for day, amount in zip(rng.choice(days, bills), amounts):
+            variable.append((day, category, "Variable", amount, f"{category} expense"))
+    expenses = pd.DataFrame(fixed + variable, columns=["date", "category", "expense_type", "amount", "description"])
+    expenses["amount"] = expenses["amount"].round(2)
+    return purchases, sales, expenses
+
+
+# Stock on hand before the first month: about two months of expected demand
+def opening_stock(rng, catalog, start, sales_per_day):
+    expected = np.ceil(catalog["popularity"].to_numpy() * sales_per_day * 60 * 1.8).astype(int) + 5
+    order_date = pd.Timestamp(start) - pd.Timedelta(days=30)
+    return pd.DataFrame({
+        "product_id": np.arange(len(catalog)),
+        "vendor_name": catalog["vendor"],
+        "quantity_purchased": expected,
+        "cost_price": catalog["cost_price"],
+        "order_date": order_date,
+        "payment_due": order_date + pd.Timedelta(days=30),
+        "payment_status": "Completed",
+    })
+
+
+# Every frame of one tenant, in insert order: ("Products", frame) first,
+# then purchases, sales and expenses month by month
+def tenant_frames(seed, args):
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(args.end)
+    start = end - pd.Timedelta(days=int(round(args.years * 365.25)) - 1)
+    today = end + pd.Timedelta(days=1)
+    catalog = make_catalog(rng, args.skus)
+    yield "Products", catalog[list(UPLOAD_SCHEMAS["Products"])]
+    yield "Purchases", opening_stock(rng, catalog, start, args.sales_per_day)
+    for month in _months(start, end):
+        purchases, sales, expenses = make_month(rng, catalog, month, start, end, args.sales_per_day, today)
+        yield "Purchases", purchases
+        yield "Sales", sales
+        yield "Expenses", expenses
+
+
+# Upload-CSV text for dates and flags
+def _csv_frame(table, frame):
+    frame = frame.copy()
+    for col in ("order_date", "payment_due", "sale_date", "date"):
+        if col in frame:
+            frame[col] = pd.to_datetime(frame[col]).dt.strftime("%Y-%m-%d")
+    return frame[list(UPLOAD_SCHEMAS[table])]
+
+
+def write_csv(tenant, seed, args, product_offset):
+    folder = os.path.join(args.out, f"tenant_{tenant:04d}")
+    os.makedirs(folder, exist_ok=True)
+    written = {}
+    for table, frame in tenant_frames(seed, args):
+        if "product_id" in frame:
+            frame = frame.assign(product_id=frame["product_id"] + product_offset)
+        path = os.path.join(folder, f"{table}.csv")
+        _csv_frame(table, frame).to_csv(path, mode="a" if table in written else "w", header=table not in written, index=False)
+        written[table] = written.get(table, 0) + len(frame)
+    return written
+
+
+def create_user(tenant, args):
+    import bcrypt
+    from db import execute_query, fetch_data
+    username = f"loadtest_{args.seed}_{tenant:04d}"
+    if fetch_data("SELECT user_id FROM Users WHERE username = %s", (username,)):
+        return username, None
+    hashed = bcrypt.hashpw(args.password.encode("utf-8"), bcrypt.gensalt(rounds=4))
+    execute_query(
+        "INSERT INTO Users (username, email, password_hash) VALUES (%s, %s, %s)",
+        (username, f"{username}@example.com", hashed),
+    )
+    rows = fetch_data("SELECT user_id FROM Users WHERE username = %s", (username,))
+    return username, rows[0]["user_id"] if rows else None
+
+
+def write_db(user_id, seed, args):
+    from db import bulk_insert, fetch_data
+    written, product_ids = {}, None
+    for table, frame in tenant_frames(seed, args):
+        names = COLUMN_NAMES.get(table, {})
+        columns = ["user_id"] + [names.get(col, col) for col in UPLOAD_SCHEMAS[table]]
+        if product_ids is not None and "product_id" in frame:
+            frame = frame.assign(product_id=product_ids[frame["product_id"].to_numpy()])
+        for col in ("order_date", "payment_due", "sale_date", "date"):
+            if col in frame:
+                frame[col] = pd.to_datetime(frame[col]).dt.date
+        values = frame[list(UPLOAD_SCHEMAS[table])].astype(object)
+        rows = ((user_id,) + row for row in values.itertuples(index=False, name=None))
+        written[table] = written.get(table, 0) + bulk_insert(table, columns, rows)
+        if table == "Products":
+            ids = fetch_data("SELECT product_id FROM Products WHERE user_id = %s ORDER BY product_id", (user_id,))
+            product_ids = np.array([int(row["product_id"]) for row in ids])
+    return written
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"Generating {args.tenants} tenant(s) x {args.skus} SKUs x {args.years:g} year(s) "
+          f"at ~{args.sales_per_day:g} sales/day, ending {args.end} (seed {args.seed})")
+    seeds = np.random.SeedSequence(args.seed).spawn(args.tenants)
+    totals = {}
+    started = time.monotonic()
+    for tenant, seed in enumerate(seeds, start=1):
+        if args.db:
+            username, user_id = create_user(tenant, args)
+            if user_id is None:
+                print(f"⚠️ {username} already exists or could not be created, skipped")
+                continue
+            written = write_db(user_id, seed, args)
+        else:
+            written = write_csv(tenant, seed, args, args.first_product_id + (tenant - 1) * args.skus)
+        for table, count in written.items():
+            totals[table] = totals.get(table, 0) + count
+        print(f"  tenant {tenant}: " + ", ".join(f"{table} {count:,}" for table, count in written.items()))
+    print(f"✅ {', '.join(f'{table} {count:,}' for table, count in totals.items())} rows in {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import streamlit as st
+import pandas as pd
+from db import cached, read_sql
+from loaders import TABLE_SCHEMAS, apply_schema, where_clause
+
+# Rows per page in the raw-data grids
+DEFAULT_PAGE_SIZE = 50
+
+
+# Keyset values must go back to the driver as plain Python scalars
+def _plain(value):
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value.item() if hasattr(value, "item") else value
+
+
+# One page of the user's rows, ordered by (sort_column, id_column) and
+# starting after the keyset `after` = (sort value, id) of the previous
+# page's last row. Text search runs as LIKE on `search_columns` and, for
+# each (column, table, text_column) in `search_lookups`, matches rows whose
+# `column` points at a row of the user's `table` with a matching
+# `text_column` (e.g. sales by product name); a numeric search also matches
+# `key_columns` exactly. Fetches page_size + 1 rows so
+# the caller knows whether a next page exists.
+def fetch_page(table, user_id, columns, id_column, sort_column=None, descending=False,
+               search="", search_columns=(), key_columns=None, after=None,
+               page_size=DEFAULT_PAGE_SIZE, filters=None, search_lookups=()):
+    schema = TABLE_SCHEMAS[table]
+    sort_column = sort_column or id_column
+    clause, params = where_clause(user_id, filters)
+    params = list(params)
+
+    search = (search or "").strip()
+    if search:
+        matches = [f"{column} LIKE %s" for column in search_columns]
+        params.extend([f"%{search}%"] * len(search_columns))
+        for column, lookup_table, text_column in search_lookups:
+            matches.append(f"{column} IN (SELECT {column} FROM {lookup_table} WHERE user_id = %s AND {text_column} LIKE %s)")
+            params.extend([user_id, f"%{search}%"])
+        if search.isdigit():
+            for column in key_columns or [id_column]:
+                matches.append(f"{column} = %s")
+                params.append(int(search))
+        clause += f" AND ({' OR '.join(matches) or '1 = 0'})"
+
+    op, direction = ("<", "DESC") if descending else (">", "ASC")
+    if sort_column == id_column:
+        order = f"{id_column} {direction}"
+        if after is not None:
+            clause += f" AND {id_column} {op} %s"
+            params.append(after[1])
+    else:
+        order = f"{sort_column} {direction}, {id_column} {direction}"
+        if after is not None:
+            clause += f" AND ({sort_column}, {id_column}) {op} (%s, %s)"
+            params.extend(after)
+
+    query = f"SELECT {', '.join(columns)} FROM {table} WHERE {clause} ORDER BY {order} LIMIT {int(page_size) + 1}"
+    params = tuple(params)
+    return cached(
+        user_id, query, params,
+        lambda: apply_schema(read_sql(query, params), schema),
+        tables=[table] + [lookup_table for _, lookup_table, _ in search_lookups], namespace="typed",
+    )
+
+
+# Paginated grid with server-side search and sort. Only the visible page is
+# fetched and sent to the browser; the stack of keysets for the pages
+# already visited lives in the session so Previous needs no OFFSET scan.
+# Sort columns should be NOT NULL, since NULLs fall outside the keyset.
+# Returns the visible page.
+def paged_grid(key, table, user_id, columns, id_column, sort_columns=None,
+               search_columns=(), key_columns=None, page_size=DEFAULT_PAGE_SIZE, filters=None,
+               search_lookups=()):
+    sort_columns = sort_columns or [id_column]
+    c1, c2, c3 = st.columns([3, 2, 1])
+    search = c1.text_input("Search", key=f"{key}_search")
+    sort_column = c2.selectbox("Sort by", sort_columns, key=f"{key}_sort")
+    descending = c3.checkbox("Descending", value=True, key=f"{key}_desc")
+
+    state = st.session_state.setdefault(f"grid:{key}", {"query": None, "cursors": [None]})
+    signature = (search, sort_column, descending, repr(filters))
+    if state["query"] != signature:
+        state["query"], state["cursors"] = signature, [None]
+
+    page = fetch_page(
+        table, user_id, columns, id_column, sort_column, descending,
+        search, search_columns, key_columns, state["cursors"][-1], page_size, filters,
+        search_lookups,
+    )
+    has_next = len(page) > page_size
+    page = page.head(page_size)
+    st.dataframe(page, use_container_width=True, hide_index=True)
+
+    prev_col, info_col, next_col = st.columns([1, 2, 1])
+    if prev_col.button("◀ Previous", key=f"{key}_prev", disabled=len(state["cursors"]) == 1):
+        state["cursors"].pop()
+        st.rerun()
+    info_col.caption(f"Page {len(state['cursors'])} · {len(page)} rows")
+    if next_col.button("Next ▶", key=f"{key}_next", disabled=not has_next):
+        last = page.iloc[-1]
+        state["cursors"].append((_plain(last[sort_column]), _plain(last[id_column])))
+        st.rerun()
+    return page
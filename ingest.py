@@ -0,0 +1,112 @@
+import pandas as pd
+from db import bulk_insert
+
+# Rows parsed per chunk. This bounds the parsed rows held at once, not the
+# upload itself: Streamlit keeps the whole uploaded file in memory, and
+# server.maxUploadSize in .streamlit/config.toml caps its size.
+CHUNK_ROWS = 50_000
+
+# Expected CSV columns and their dtypes for each uploadable table. Date
+# columns are read as text and parsed per chunk so bad values are reported.
+UPLOAD_SCHEMAS = {
+    "Products": {
+        "NAME": "string", "category": "string",
+        "cost_price": "float64", "selling_price": "float64",
+    },
+    "Purchases": {
+        "product_id": "Int64", "vendor_name": "string", "quantity_purchased": "Int64",
+        "cost_price": "float64", "order_date": "string", "payment_due": "string",
+        "payment_status": "string",
+    },
+    "Sales": {
+        "product_id": "Int64", "quantity_sold": "Int64", "selling_price": "float64",
+        "sale_date": "string", "shipped": "string", "payment_received": "string",
+    },
+    "Expenses": {
+        "date": "string", "category": "string", "expense_type": "string",
+        "amount": "float64", "description": "string",
+    },
+}
+DATE_COLUMNS = {
+    "Purchases": ["order_date", "payment_due"],
+    "Sales": ["sale_date"],
+    "Expenses": ["date"],
+}
+# Dates every row must have: they key the daily rollups (ledger.ROLLUPS)
+REQUIRED_COLUMNS = {
+    "Purchases": ["order_date"],
+    "Sales": ["sale_date"],
+    "Expenses": ["date"],
+}
+FLAG_COLUMNS = {
+    "Sales": ["shipped", "payment_received"],
+}
+# CSV header -> table column, where they differ
+COLUMN_NAMES = {
+    "Expenses": {"date": "expense_date", "expense_type": "TYPE"},
+}
+
+FLAG_VALUES = {"yes": 1, "y": 1, "true": 1, "1": 1, "no": 0, "n": 0, "false": 0, "0": 0}
+
+
+# Columns of the schema that are absent from the file header
+def missing_columns(file, table):
+    header = pd.read_csv(file, nrows=0).columns
+    file.seek(0)
+    return [col for col in UPLOAD_SCHEMAS[table] if col not in header]
+
+
+def _invalid(chunk, mask, col, first_line, problem="Invalid"):
+    lines = [str(first_line + i) for i in mask.to_numpy().nonzero()[0][:5]]
+    return ValueError(f"{problem} {col} value on line(s) {', '.join(lines)}")
+
+
+# Parse and validate one chunk in place
+def _prepare(chunk, table, first_line):
+    for col in DATE_COLUMNS.get(table, []):
+        parsed = pd.to_datetime(chunk[col], errors="coerce")
+        bad = parsed.isna() & chunk[col].notna()
+        if bad.any():
+            raise _invalid(chunk, bad, col, first_line)
+        if col in REQUIRED_COLUMNS.get(table, []) and parsed.isna().any():
+            raise _invalid(chunk, parsed.isna(), col, first_line, "Missing")
+        chunk[col] = parsed.dt.date
+    for col in FLAG_COLUMNS.get(table, []):
+        mapped = chunk[col].str.strip().str.lower().map(FLAG_VALUES)
+        bad = mapped.isna() & chunk[col].notna()
+        if bad.any():
+            raise _invalid(chunk, bad, col, first_line)
+        chunk[col] = mapped
+    return chunk
+
+
+# Yield validated chunks of an uploaded CSV, parsing chunk_rows rows at a
+# time instead of building one frame for the whole file
+def read_upload(file, table, chunk_rows=CHUNK_ROWS):
+    schema = UPLOAD_SCHEMAS[table]
+    reader = pd.read_csv(file, chunksize=chunk_rows, dtype=schema, usecols=list(schema))
+    first_line = 2  # line 1 is the header
+    for chunk in reader:
+        yield _prepare(chunk[list(schema)], table, first_line)
+        first_line += len(chunk)
+
+
+# Stream an uploaded CSV into its table in a single transaction.
+# on_progress(fraction_of_file_read, rows_inserted) is called after each batch.
+def stream_upload(file, table, user_id, on_progress=None, chunk_rows=CHUNK_ROWS):
+    names = COLUMN_NAMES.get(table, {})
+    columns = ["user_id"] + [names.get(col, col) for col in UPLOAD_SCHEMAS[table]]
+    size = getattr(file, "size", None) or 1
+
+    def rows():
+        for chunk in read_upload(file, table, chunk_rows):
+            values = chunk.astype(object)
+            values = values.where(values.notna(), None)
+            for row in values.itertuples(index=False, name=None):
+                yield (user_id,) + row
+
+    def report(done):
+        if on_progress:
+            on_progress(min(file.tell() / size, 1.0), done)
+
+    return bulk_insert(table, columns, rows(), on_chunk=report)
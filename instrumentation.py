@@ -0,0 +1,282 @@
+import re
+import time
+import logging
+import threading
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+logger = logging.getLogger(__name__)
+
+# Timing and attribution of every SQL statement. db.connection() hands out
+# connections wrapped by instrument(), so fetch_data, read_sql (pandas),
+# execute_query, the write helpers and the direct cursors in fifo, forecast
+# and ledger are all measured in one place. Each statement is recorded with
+# the page and section it ran in (see page() and mark()), its time, rows
+# and an estimate of the bytes fetched. Slow SELECTs are logged with their
+# EXPLAIN plan, and a statement repeated many times in one script run with
+# different parameters (an N+1 pattern) is logged once per run.
+DEFAULT_SLOW_QUERY_MS = 500
+DEFAULT_N_PLUS_ONE = 20       # executions of one statement shape per run
+MAX_RECORDS = 1000            # statements kept per run (totals keep counting)
+SAMPLE_ROWS = 100             # rows sampled to estimate bytes fetched
+
+STATS_KEY = "perf"
+QUERY_COUNT_KEY = "db_query_count"
+
+_lock = threading.Lock()
+_query_total = 0
+
+
+def slow_query_seconds():
+    return float(st.secrets.get("slow_query_ms", DEFAULT_SLOW_QUERY_MS)) / 1000
+
+
+def n_plus_one_threshold():
+    return int(st.secrets.get("n_plus_one_threshold", DEFAULT_N_PLUS_ONE))
+
+
+# Statement shape: literals and IN lists collapsed, whitespace normalized
+def fingerprint(sql):
+    sql = re.sub(r"'(?:[^'\\]|\\.)*'", "?", " ".join(str(sql).split()))
+    sql = re.sub(r"\b\d+(\.\d+)?\b", "?", sql)
+    sql = re.sub(r"%s", "?", sql)
+    return re.sub(r"\(\s*\?(\s*,\s*\?)*\s*\)", "(?)", sql)
+
+
+def _value_bytes(value):
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    return 8
+
+
+# Bytes fetched, estimated from the first SAMPLE_ROWS rows
+def estimate_bytes(rows):
+    if not rows:
+        return 0
+    sample = rows[:SAMPLE_ROWS]
+    total = sum(
+        _value_bytes(value)
+        for row in sample
+        for value in (row.values() if isinstance(row, dict) else row)
+    )
+    return int(total / len(sample) * len(rows))
+
+
+# Stats of the current script run (None outside one, or before page())
+def current():
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    return st.session_state.get(STATS_KEY)
+
+
+# Start a page's stats for this run. Call once near the top of the script.
+def page(name):
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return
+    st.session_state[STATS_KEY] = {
+        "page": name, "section": None, "started": time.perf_counter(), "section_started": None,
+        "sections": {}, "queries": [], "totals": {"queries": 0, "seconds": 0.0, "rows": 0, "bytes": 0},
+        "shapes": {}, "n_plus_one": [], "slow": [], "elapsed": None,
+        "query_seconds": {}, "render_seconds": {},
+    }
+
+
+def _close_section(stats):
+    name, started = stats["section"], stats["section_started"]
+    if name is not None:
+        with _lock:
+            stats["sections"][name] = stats["sections"].get(name, 0.0) + time.perf_counter() - started
+    stats["section"] = None
+
+
+# Start a named section of the page. It lasts until the next mark() or
+# end_page(), and statements run meanwhile are attributed to it.
+def mark(name):
+    stats = current()
+    if stats is None:
+        return
+    _close_section(stats)
+    stats["section"], stats["section_started"] = name, time.perf_counter()
+
+
+# Call a Streamlit element (st.plotly_chart, st.dataframe, ...) and count
+# the time it takes as rendering time of the current section
+def render(element, *args, **kwargs):
+    stats = current()
+    start = time.perf_counter()
+    try:
+        return element(*args, **kwargs)
+    finally:
+        if stats is not None:
+            with _lock:
+                section = stats["section"]
+                stats["render_seconds"][section] = stats["render_seconds"].get(section, 0.0) + time.perf_counter() - start
+
+
+# Close the last section and record the page's total time
+def end_page():
+    stats = current()
+    if stats is None:
+        return None
+    _close_section(stats)
+    stats["elapsed"] = time.perf_counter() - stats["started"]
+    return stats
+
+
+def query_total():
+    return _query_total
+
+
+# EXPLAIN plan of a slow SELECT (the error instead if it cannot be explained)
+def _explain(conn, sql, params):
+    try:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(f"EXPLAIN {sql}", params or ())
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+    except Exception as e:
+        return [{"error": str(e)}]
+
+
+# Record a finished statement against the session and the process totals
+def _record(conn, sql, params, seconds, rows, nbytes, batch):
+    global _query_total
+    shape = fingerprint(sql)
+    in_session = get_script_run_ctx(suppress_warning=True) is not None
+    stats = st.session_state.get(STATS_KEY) if in_session else None
+    with _lock:
+        _query_total += 1
+        if in_session:
+            st.session_state[QUERY_COUNT_KEY] = st.session_state.get(QUERY_COUNT_KEY, 0) + 1
+    slow = seconds >= slow_query_seconds()
+    plan = _explain(conn, sql, params) if slow and shape.lstrip().upper().startswith("SELECT") else None
+    where = f"{stats['page']}/{stats['section'] or '-'}" if stats else "-"
+    if slow:
+        logger.warning("Slow query (%.0f ms, %s rows) in %s: %s\n%s", seconds * 1000, rows, where, shape, plan)
+    if stats is None:
+        return
+    record = {
+        "page": stats["page"], "section": stats["section"], "sql": shape,
+        "seconds": seconds, "rows": rows, "bytes": nbytes, "batch": batch,
+    }
+    with _lock:
+        totals = stats["totals"]
+        totals["queries"] += 1
+        totals["seconds"] += seconds
+        totals["rows"] += rows
+        totals["bytes"] += nbytes
+        section = stats["section"]
+        stats["query_seconds"][section] = stats["query_seconds"].get(section, 0.0) + seconds
+        if len(stats["queries"]) < MAX_RECORDS:
+            stats["queries"].append(record)
+        if slow:
+            stats["slow"].append({**record, "explain": plan})
+        if batch == 1:
+            count = stats["shapes"][shape] = stats["shapes"].get(shape, 0) + 1
+            if count == n_plus_one_threshold():
+                stats["n_plus_one"].append({"sql": shape, "page": stats["page"], "section": stats["section"]})
+                logger.warning("Possible N+1: %s ran %d times in %s", shape, count, where)
+
+
+# Cursor that times execute/executemany plus the fetches that follow, and
+# records the statement when the next one starts or the cursor closes
+class InstrumentedCursor:
+    def __init__(self, cursor, conn):
+        self._cursor = cursor
+        self._conn = conn
+        self._pending = None
+
+    def _start(self, sql, params, batch, start):
+        self._pending = {"sql": sql, "params": params, "batch": batch, "seconds": time.perf_counter() - start, "rows": 0, "bytes": 0}
+
+    def finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            rows = pending["rows"] or max(self._cursor.rowcount or 0, 0)
+            _record(self._conn, pending["sql"], pending["params"] if pending["batch"] == 1 else None,
+                    pending["seconds"], rows, pending["bytes"], pending["batch"])
+
+    def _fetched(self, rows, start):
+        if self._pending is not None:
+            self._pending["seconds"] += time.perf_counter() - start
+            self._pending["rows"] += len(rows)
+            self._pending["bytes"] += estimate_bytes(rows)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self.finish()
+        start = time.perf_counter()
+        try:
+            if params is None:
+                return self._cursor.execute(operation, *args, **kwargs)
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            self._start(operation, params, 1, start)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self.finish()
+        seq_params = list(seq_params)
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            self._start(operation, None, len(seq_params), start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(rows, start)
+        return rows
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        self._fetched(rows, start)
+        return rows
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched([row] if row is not None else [], start)
+        return row
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        try:
+            return self._cursor.close()
+        finally:
+            self.finish()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+# Connection whose cursors are instrumented; everything else passes through
+class InstrumentedConnection:
+    def __init__(self, conn):
+        self._conn = conn
+        self._cursors = []
+
+    def cursor(self, *args, **kwargs):
+        cursor = InstrumentedCursor(self._conn.cursor(*args, **kwargs), self._conn)
+        self._cursors.append(cursor)
+        return cursor
+
+    # Record statements whose cursors were never closed
+    def finish(self):
+        for cursor in self._cursors:
+            cursor.finish()
+        self._cursors = []
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def instrument(conn):
+    return InstrumentedConnection(conn)
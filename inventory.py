@@ -0,0 +1,53 @@
+import pandas as pd
+from db import read_sql
+
+# Per-product stock position for one user. Stock comes from the
+# stock_levels summary kept current by the write path; only the 30-day
+# sales window and first order date still touch the history tables.
+INVENTORY_QUERY = """
+    SELECT
+        p.product_id, p.Name, p.category, p.cost_price, p.selling_price,
+        COALESCE(sl.quantity_purchased, 0) AS quantity_purchased,
+        COALESCE(sl.quantity_sold, 0) AS quantity_sold,
+        COALESCE(sl.live_stock, 0) AS live_stock,
+        COALESCE(sl.live_stock, 0) * p.cost_price AS stock_value,
+        COALESCE(sl.live_stock, 0) * p.selling_price AS potential_revenue,
+        p.selling_price - p.cost_price AS profit_margin,
+        (p.selling_price - p.cost_price) * COALESCE(sl.live_stock, 0) AS total_profit,
+        COALESCE(s.sold_last_30, 0) AS sold_last_30,
+        pu.first_order_date
+    FROM Products p
+    LEFT JOIN stock_levels sl
+        ON sl.user_id = p.user_id AND sl.product_id = p.product_id
+    LEFT JOIN (
+        SELECT product_id, MIN(order_date) AS first_order_date
+        FROM Purchases
+        WHERE user_id = %s
+        GROUP BY product_id
+    ) pu ON pu.product_id = p.product_id
+    LEFT JOIN (
+        SELECT product_id, SUM(quantity_sold) AS sold_last_30
+        FROM Sales
+        WHERE user_id = %s AND sale_date >= NOW() - INTERVAL 30 DAY
+        GROUP BY product_id
+    ) s ON s.product_id = p.product_id
+    WHERE p.user_id = %s
+"""
+
+STOCK_QUERY = """
+    SELECT product_id, quantity_purchased, quantity_sold, live_stock
+    FROM stock_levels
+    WHERE user_id = %s
+"""
+
+
+# Load the inventory summary (one row per product) for a user
+def load_inventory(user_id):
+    inventory = read_sql(INVENTORY_QUERY, (user_id, user_id, user_id), user_id=user_id)
+    inventory['first_order_date'] = pd.to_datetime(inventory['first_order_date'], errors='coerce')
+    return inventory
+
+
+# Current stock per product for a user, straight from stock_levels
+def load_stock_levels(user_id):
+    return read_sql(STOCK_QUERY, (user_id,), user_id=user_id)
@@ -0,0 +1,43 @@
+from db import fetch_data
+from ledger import SUMMARY_MEASURES
+
+# KPI cards served from the per-user user_summary row, which the write path
+# keeps current (see ledger.SUMMARY_MEASURES). Every page's cards come from
+# one primary-key lookup, however large the history is. To add a card,
+# add its measure to SUMMARY_MEASURES and a column to user_summary, then
+# list it under the page here.
+SUMMARY_COLUMNS = [column for measures in SUMMARY_MEASURES.values() for column in measures]
+
+SUMMARY_QUERY = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM user_summary WHERE user_id = %s"
+
+# Cards per page: name -> value computed from the summary row
+KPI_CARDS = {
+    "home": {
+        "total_products": lambda s: int(s["product_count"]),
+        "total_sales": lambda s: s["sales_revenue"],
+        "total_expenses": lambda s: s["expense_total"],
+    },
+    "purchases": {
+        "total_orders": lambda s: int(s["purchase_count"]),
+        "total_quantity": lambda s: int(s["units_purchased"]),
+        "total_cost": lambda s: s["purchase_cost"],
+    },
+    "finance": {
+        "total_sales": lambda s: s["sales_revenue"],
+        "total_products": lambda s: int(s["product_count"]),
+        "total_expenses": lambda s: s["purchase_cost"],   # spend on stock, as the page has always shown
+    },
+}
+
+
+# The user's summary row as floats; zeros before their first write
+def load_summary(user_id):
+    rows = fetch_data(SUMMARY_QUERY, (user_id,), user_id=user_id)
+    row = rows[0] if rows else {}
+    return {column: float(row.get(column) or 0) for column in SUMMARY_COLUMNS}
+
+
+# The KPI card values for one page
+def page_kpis(user_id, page):
+    summary = load_summary(user_id)
+    return {name: value(summary) for name, value in KPI_CARDS[page].items()}
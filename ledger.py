@@ -0,0 +1,197 @@
+from collections import defaultdict
+
+# Summary tables derived from the base tables. They are updated in the
+# same transaction as the write that changes the underlying rows, so readers
+# never have to re-aggregate the transaction history.
+
+
+# Keep stock_levels in step with added (sign=+1) or removed (sign=-1) rows
+def _apply_stock_levels(cursor, table, rows, sign):
+    column = "quantity_purchased" if table == "Purchases" else "quantity_sold"
+    deltas = defaultdict(int)
+    for row in rows:
+        deltas[(row["user_id"], row["product_id"])] += sign * int(row[column] or 0)
+    purchased = column == "quantity_purchased"
+    params = [
+        (user_id, product_id, delta if purchased else 0, 0 if purchased else delta)
+        for (user_id, product_id), delta in deltas.items() if delta
+    ]
+    if params:
+        cursor.executemany("""
+            INSERT INTO stock_levels (user_id, product_id, quantity_purchased, quantity_sold)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                quantity_purchased = quantity_purchased + VALUES(quantity_purchased),
+                quantity_sold = quantity_sold + VALUES(quantity_sold)
+        """, params)
+
+
+def _number(value):
+    return float(value or 0)
+
+
+# Per-user KPI totals kept in user_summary: column -> contribution of one row
+SUMMARY_MEASURES = {
+    "Products": {
+        "product_count": lambda row: 1,
+    },
+    "Sales": {
+        "sales_count": lambda row: 1,
+        "units_sold": lambda row: _number(row["quantity_sold"]),
+        "sales_revenue": lambda row: _number(row["quantity_sold"]) * _number(row["selling_price"]),
+    },
+    "Purchases": {
+        "purchase_count": lambda row: 1,
+        "units_purchased": lambda row: _number(row["quantity_purchased"]),
+        "purchase_cost": lambda row: _number(row["quantity_purchased"]) * _number(row["cost_price"]),
+    },
+    "Expenses": {
+        "expense_count": lambda row: 1,
+        "expense_total": lambda row: _number(row["amount"]),
+    },
+}
+
+
+# Keep the user's user_summary row in step with added or removed rows
+def _apply_user_summary(cursor, table, rows, sign):
+    measures = SUMMARY_MEASURES[table]
+    columns = list(measures)
+    deltas = defaultdict(lambda: [0.0] * len(columns))
+    for row in rows:
+        totals = deltas[row["user_id"]]
+        for i, column in enumerate(columns):
+            totals[i] += sign * measures[column](row)
+    params = [(user_id, *totals) for user_id, totals in deltas.items() if any(totals)]
+    if params:
+        cursor.executemany(f"""
+            INSERT INTO user_summary (user_id, {', '.join(columns)})
+            VALUES ({', '.join(['%s'] * (len(columns) + 1))})
+            ON DUPLICATE KEY UPDATE
+                {', '.join(f"{column} = {column} + VALUES({column})" for column in columns)}
+        """, params)
+
+
+# Daily rollups behind the trend charts: base table -> (rollup table, date
+# column, {key column: value stored when missing}, {rollup column:
+# contribution of one row}). Keys are part of the rollup's primary key, so
+# a missing value is stored as a sentinel of the column's type (0 for ids,
+# '' for text).
+ROLLUPS = {
+    "Sales": ("sales_daily", "sale_date", {"product_id": 0}, {
+        "order_count": lambda row: 1,
+        "units": lambda row: _number(row["quantity_sold"]),
+        "revenue": lambda row: _number(row["quantity_sold"]) * _number(row["selling_price"]),
+    }),
+    "Purchases": ("purchases_daily", "order_date", {"product_id": 0, "vendor_name": ""}, {
+        "order_count": lambda row: 1,
+        "units": lambda row: _number(row["quantity_purchased"]),
+        "cost": lambda row: _number(row["quantity_purchased"]) * _number(row["cost_price"]),
+    }),
+    "Expenses": ("expenses_daily", "expense_date", {"category": "", "TYPE": ""}, {
+        "expense_count": lambda row: 1,
+        "amount": lambda row: _number(row["amount"]),
+    }),
+}
+
+
+# Add or remove rows' contributions in the table's daily rollup
+def _apply_rollup(cursor, table, rows, sign):
+    rollup, date_column, missing, measures = ROLLUPS[table]
+    keys, columns = list(missing), list(measures)
+    deltas = defaultdict(lambda: [0.0] * len(columns))
+    for row in rows:
+        if row[date_column] is None:
+            continue   # undated rows belong to no day (uploads require the date)
+        key = (row["user_id"], row[date_column], *(row[k] if row[k] is not None else missing[k] for k in keys))
+        totals = deltas[key]
+        for i, column in enumerate(columns):
+            totals[i] += sign * measures[column](row)
+    params = [(*key, *totals) for key, totals in deltas.items()]
+    if params:
+        cursor.executemany(f"""
+            INSERT INTO {rollup} (user_id, day, {', '.join(keys + columns)})
+            VALUES ({', '.join(['%s'] * (len(keys) + len(columns) + 2))})
+            ON DUPLICATE KEY UPDATE
+                {', '.join(f"{column} = {column} + VALUES({column})" for column in columns)}
+        """, params)
+
+
+# Weighted-average purchase cost per product: running quantity and cost
+# totals in product_costs, avg_cost = total_cost / total_quantity. Every
+# change is appended to product_cost_history with the resulting average;
+# an edit shows up as a reversal of the old row followed by the new one.
+def _apply_product_costs(cursor, table, rows, sign):
+    deltas = defaultdict(lambda: [0.0, 0.0])
+    for row in rows:
+        quantity = _number(row["quantity_purchased"])
+        totals = deltas[(row["user_id"], row["product_id"])]
+        totals[0] += sign * quantity
+        totals[1] += sign * quantity * _number(row["cost_price"])
+    changes = [(user_id, product_id, quantity, cost) for (user_id, product_id), (quantity, cost) in deltas.items() if quantity or cost]
+    if not changes:
+        return
+    cursor.executemany("""
+        INSERT INTO product_costs (user_id, product_id, total_quantity, total_cost, avg_cost)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            total_quantity = total_quantity + VALUES(total_quantity),
+            total_cost = total_cost + VALUES(total_cost),
+            avg_cost = total_cost / NULLIF(total_quantity, 0)
+    """, [(user_id, product_id, quantity, cost, cost / quantity if quantity else None) for user_id, product_id, quantity, cost in changes])
+    cursor.executemany("""
+        INSERT INTO product_cost_history (user_id, product_id, quantity_delta, cost_delta, total_quantity, total_cost, avg_cost)
+        SELECT user_id, product_id, %s, %s, total_quantity, total_cost, avg_cost
+        FROM product_costs
+        WHERE user_id = %s AND product_id = %s
+    """, [(quantity, cost, user_id, product_id) for user_id, product_id, quantity, cost in changes])
+
+
+# FIFO layers (fifo.py) pick up new rows by id watermark on their own. A
+# row that already has an id is being edited or removed, so the layers of
+# its product are marked for a rebuild.
+FIFO_KEYS = {"Purchases": "purchase_id", "Sales": "sale_id"}
+
+
+def _mark_fifo_dirty(cursor, table, rows, sign):
+    key = FIFO_KEYS[table]
+    params = {(row["user_id"], row["product_id"]) for row in rows if sign < 0 or row.get(key) is not None}
+    if params:
+        cursor.executemany("""
+            INSERT INTO fifo_products (user_id, product_id, dirty) VALUES (%s, %s, 1)
+            ON DUPLICATE KEY UPDATE dirty = 1
+        """, sorted(params))
+
+
+LEDGERS = {
+    "Products": [_apply_user_summary],
+    "Purchases": [_apply_stock_levels, _apply_user_summary, _apply_rollup, _apply_product_costs, _mark_fifo_dirty],
+    "Sales": [_apply_stock_levels, _apply_user_summary, _apply_rollup, _mark_fifo_dirty],
+    "Expenses": [_apply_user_summary, _apply_rollup],
+}
+
+
+# Summary tables derived from each base table
+DERIVED_TABLES = {
+    "Products": ["user_summary"],
+    "Purchases": ["stock_levels", "user_summary", "purchases_daily", "product_costs", "product_cost_history", "fifo_products"],
+    "Sales": ["stock_levels", "user_summary", "sales_daily", "fifo_products"],
+    "Expenses": ["user_summary", "expenses_daily"],
+}
+
+
+# Apply a batch of row changes to every summary table derived from `table`.
+# rows are dicts holding at least the table's columns plus user_id.
+def apply_row_changes(cursor, table, rows, sign):
+    if not rows:
+        return
+    for ledger in LEDGERS.get(table, []):
+        ledger(cursor, table, rows, sign)
+
+
+def tracks(table):
+    return table in LEDGERS
+
+
+# Every table whose contents change when `table` is written
+def affected_tables(table):
+    return [table, *DERIVED_TABLES.get(table, [])]
@@ -0,0 +1,194 @@
+import threading
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+import pandas as pd
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from db import cached, read_sql, fetch_data, get_pool, get_query_cache, get_table_versions
+
+# Declared column types per table. Only the columns a page asks for are
+# selected, and the conversion runs once per load: the typed frame is what
+# gets cached, so reruns neither re-fetch nor re-parse.
+#   id       -> smallest integer dtype that fits (keys are never summed)
+#   flag     -> smallest integer dtype that fits (0/1)
+#   int      -> int64 (quantities are summed and multiplied, so they keep
+#               full width; float64 when the column has NULLs)
+#   float    -> float64 (money is not downcast to keep totals exact to the paisa)
+#   date     -> datetime64
+#   category -> pandas category
+#   text     -> left as-is
+TABLE_SCHEMAS = {
+    "Products": {
+        "product_id": "id", "Name": "text", "category": "category",
+        "cost_price": "float", "selling_price": "float", "stock": "int",
+    },
+    "Sales": {
+        "sale_id": "id", "product_id": "id", "quantity_sold": "int", "selling_price": "float",
+        "sale_date": "date", "shipped": "flag", "payment_received": "flag",
+    },
+    "Purchases": {
+        "purchase_id": "id", "product_id": "id", "vendor_name": "category",
+        "quantity_purchased": "int", "cost_price": "float", "order_date": "date",
+        "payment_due": "date", "payment_status": "category",
+    },
+    "Expenses": {
+        "expense_id": "id", "expense_date": "date", "category": "category", "TYPE": "category",
+        "amount": "float", "description": "text",
+    },
+}
+
+
+# Convert freshly loaded columns to their declared dtypes
+def apply_schema(df, schema):
+    for col in df.columns:
+        kind = schema.get(col)
+        if kind in ("id", "flag"):
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+        elif kind == "int":
+            df[col] = pd.to_numeric(df[col]).astype("float64" if df[col].isna().any() else "int64")
+        elif kind == "float":
+            df[col] = pd.to_numeric(df[col])
+        elif kind == "date":
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+        elif kind == "category":
+            df[col] = df[col].astype("category")
+    return df
+
+
+# Load the user's rows of `table`, projected to `columns`, narrowed by
+# `filters` (see where_clause) and typed per schema
+def load_table(table, user_id, columns=None, order_by=None, filters=None, use_cache=True):
+    schema = TABLE_SCHEMAS[table]
+    columns = list(columns or schema)
+    clause, params = where_clause(user_id, filters)
+    query = f"SELECT {', '.join(columns)} FROM {table} WHERE {clause}"
+    if order_by:
+        query += f" ORDER BY {order_by}"
+
+    def load():
+        return apply_schema(read_sql(query, params), schema)
+    if not use_cache:
+        return load()
+    return cached(user_id, query, params, load, tables=[table], namespace="typed")
+
+
+# Threads for load_concurrently, one per pooled connection
+@st.cache_resource
+def get_load_executor():
+    return ThreadPoolExecutor(max_workers=get_pool().size, thread_name_prefix="loader")
+
+
+# Run independent loads side by side on pooled connections, so a page waits
+# for its slowest query rather than the sum of them. `loads` maps a name to
+# a zero-argument callable (e.g. a load_table call). Returns the results and
+# the exceptions of the loads that failed, each keyed by name.
+def load_concurrently(loads):
+    # Shared resources are created here, on the script thread, so workers
+    # only ever find them already built
+    get_pool(), get_query_cache(), get_table_versions()
+    executor = get_load_executor()
+    ctx = get_script_run_ctx()
+
+    def run(load):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return load()
+
+    futures = {name: executor.submit(run, load) for name, load in loads.items()}
+    results, errors = {}, {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            errors[name] = e
+    return results, errors
+
+
+# Report each failed load and stop the page if any failed
+def stop_on_errors(errors):
+    for name, e in errors.items():
+        st.error(f"❌ Error loading {name}: {e}")
+    if errors:
+        st.stop()
+
+
+# Earliest and latest value of a date column for the user (None when empty)
+def date_bounds(table, user_id, column):
+    rows = fetch_data(f"SELECT MIN({column}) AS first, MAX({column}) AS last FROM {table} WHERE user_id = %s", (user_id,), user_id=user_id)
+    if not rows or rows[0]["first"] is None:
+        return None, None
+    return pd.Timestamp(rows[0]["first"]).date(), pd.Timestamp(rows[0]["last"]).date()
+
+
+# Sidebar default date range: the user's whole history (today when there
+# is none yet). load_window then only fetches days outside what is loaded.
+def default_window(first, last):
+    if last is None:
+        return date.today(), date.today()
+    return first, last
+
+
+# IN filter for a multiselect; nothing when every option is still selected
+def choice_filter(column, selected, options):
+    if set(options) <= set(selected):
+        return []
+    return [(column, "in", list(selected))]
+
+
+# Rows of `table` whose `date_column` falls in [start, end], honouring the
+# other filters. The loaded window is kept in the session: narrowing it is
+# served locally, and widening it only fetches the days not loaded yet.
+# The window is reloaded when the filters change or the table is written.
+def load_window(table, user_id, date_column, start, end, columns=None, filters=None):
+    filters = list(filters or [])
+    state_key = f"window:{table}"
+    signature = (user_id, tuple(columns or ()), repr(filters), get_table_versions().snapshot(user_id, [table]))
+    state = st.session_state.get(state_key)
+
+    def fetch(lo, hi):
+        return load_table(
+            table, user_id, columns,
+            filters=filters + [(date_column, ">=", lo), (date_column, "<=", hi)],
+            use_cache=False,
+        )
+
+    if state is None or state["signature"] != signature or end < state["start"] or start > state["end"]:
+        frame = fetch(start, end)
+        state = {"signature": signature, "start": start, "end": end, "frame": frame}
+    else:
+        pieces = [state["frame"]]
+        if start < state["start"]:
+            pieces.insert(0, fetch(start, state["start"] - timedelta(days=1)))
+        if end > state["end"]:
+            pieces.append(fetch(state["end"] + timedelta(days=1), end))
+        if len(pieces) > 1:
+            frame = pd.concat(pieces, ignore_index=True)
+            state = {
+                "signature": signature,
+                "start": min(start, state["start"]),
+                "end": max(end, state["end"]),
+                "frame": apply_schema(frame, TABLE_SCHEMAS[table]),
+            }
+    st.session_state[state_key] = state
+
+    frame = state["frame"]
+    dates = frame[date_column]
+    return frame[(dates >= pd.Timestamp(start)) & (dates <= pd.Timestamp(end))].reset_index(drop=True)
+
+
+# Parameterized WHERE clause for the user's rows plus optional filters.
+# filters is a list of (column, op, value) with op one of =, >=, <=, in.
+def where_clause(user_id, filters):
+    clauses, params = ["user_id = %s"], [user_id]
+    for column, op, value in filters or []:
+        if op == "in":
+            values = list(value)
+            if not values:
+                clauses.append("1 = 0")
+                continue
+            clauses.append(f"{column} IN ({', '.join(['%s'] * len(values))})")
+            params.extend(values)
+        else:
+            clauses.append(f"{column} {op} %s")
+            params.append(value)
+    return " AND ".join(clauses), tuple(params)
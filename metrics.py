@@ -0,0 +1,82 @@
+import numpy as np
+
+# Finance metrics shared by the dashboard pages. Everything here works on
+# whole columns (joins, masks, groupby sums) rather than per-row Python.
+
+
+def _pending_mask(purchases):
+    return purchases['payment_status'].astype(str).str.lower() == 'pending'
+
+
+# Revenue of every sale line
+def revenue(sales):
+    return sales['quantity_sold'] * sales['selling_price']
+
+
+# Value of sales not yet paid for
+def receivables(sales):
+    unpaid = sales['payment_received'].astype(int) == 0
+    return float(revenue(sales)[unpaid].sum())
+
+
+# Value of purchases still pending payment
+def payables(purchases):
+    owed = purchases['quantity_purchased'] * purchases['cost_price']
+    return float(owed[_pending_mask(purchases)].sum())
+
+
+# Pending amount owed to each vendor (vendors with nothing owed are dropped)
+def supplier_outstanding(purchases):
+    owed = np.where(_pending_mask(purchases), purchases['quantity_purchased'] * purchases['cost_price'], 0)
+    outstanding = purchases.assign(outstanding=owed).groupby('vendor_name', observed=True)['outstanding'].sum().reset_index()
+    return outstanding[outstanding['outstanding'] > 0]
+
+
+# Products joined with their live stock and holding cost
+def stock_position(products, stock_levels):
+    position = products.merge(stock_levels[['product_id', 'live_stock']], on='product_id', how='left')
+    position['live_stock'] = position['live_stock'].fillna(0)
+    position['holding_cost'] = position['live_stock'] * position['cost_price']
+    return position
+
+
+# Days inventory outstanding, using a 30-day COGS window
+def days_inventory_outstanding(position, cogs_total):
+    daily_cogs = cogs_total / 30 if cogs_total > 0 else 1
+    return position['live_stock'].mean() / daily_cogs if daily_cogs else 0
+
+
+# Sales lines with product name, category and cost, plus revenue/cost/profit
+def sales_detail(sales, products):
+    detail = sales.merge(products[['product_id', 'Name', 'category', 'cost_price']], on='product_id', how='left')
+    detail['Revenue'] = revenue(detail)
+    detail['Cost'] = detail['quantity_sold'] * detail['cost_price']
+    detail['Profit'] = detail['Revenue'] - detail['Cost']
+    return detail
+
+
+def category_profit(detail):
+    return detail.groupby('category', observed=True)[['Revenue', 'Cost', 'Profit']].sum().reset_index()
+
+
+def category_sales(detail):
+    return detail.groupby('category', observed=True)['Revenue'].sum().reset_index(name='total_sales')
+
+
+def top_product_sales(detail, top_n):
+    return (
+        detail.groupby('Name')['Revenue'].sum()
+        .reset_index(name='total_sales')
+        .sort_values(by='total_sales', ascending=False)
+        .head(top_n)
+    )
+
+
+# Products at or below their reorder point (replenishment.reorder_plan),
+# flagged Critical when stock is below safety stock
+def low_stock(position, plan):
+    columns = ['product_id', 'safety_stock', 'reorder_point', 'reorder_qty', 'needs_reorder']
+    low = position.merge(plan[columns], on='product_id', how='inner')
+    low = low[low['needs_reorder']].drop(columns='needs_reorder')
+    low['Status'] = np.where(low['live_stock'] < low['safety_stock'], 'Critical', 'Low')
+    return low
@@ -0,0 +1,218 @@
+import os
+import sys
+import argparse
+import importlib.util
+
+import mysql.connector
+from mysql.connector import Error
+
+from db import connection_config
+
+# Versioned schema migrations. Each file in migrations/ is named
+# <version>_<name>.sql or <version>_<name>.py and runs once, in version
+# order; applied versions are recorded in schema_migrations. A .py
+# migration defines upgrade(cursor). MySQL commits DDL implicitly, so every
+# statement in a migration must be safe to re-run if the migration fails
+# half way (CREATE ... IF NOT EXISTS, ensure_index, REPLACE INTO).
+# 0000 creates the base tables, so an empty database is set up by running
+# this alone.
+#
+#   python migrate.py            apply pending migrations, then check indexes
+#   python migrate.py --status   list applied and pending migrations
+#   python migrate.py --verify   only run the EXPLAIN checks
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+HISTORY_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version VARCHAR(16) PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# The page queries that must use an index, and the index they should pick.
+# Parameters are placeholders; EXPLAIN only needs the shape of the query.
+INDEX_CHECKS = [
+    ("Sales by date window", "SELECT * FROM Sales WHERE user_id = %s AND sale_date >= %s AND sale_date <= %s",
+     (0, "2000-01-01", "2000-03-31"), "idx_sales_user_date"),
+    ("Sales for one product", "SELECT sale_date, quantity_sold FROM Sales WHERE user_id = %s AND product_id = %s",
+     (0, 0), "idx_sales_user_product"),
+    ("Purchases by date window", "SELECT * FROM Purchases WHERE user_id = %s AND order_date >= %s AND order_date <= %s",
+     (0, "2000-01-01", "2000-03-31"), "idx_purchases_user_date"),
+    ("Purchases for one product", "SELECT cost_price FROM Purchases WHERE user_id = %s AND product_id = %s",
+     (0, 0), "idx_purchases_user_product"),
+    ("Payment alerts", "SELECT vendor_name, product_id, payment_due FROM Purchases WHERE user_id = %s AND payment_status = %s AND payment_due < %s",
+     (0, "Pending", "2000-01-01"), "idx_purchases_user_status_due"),
+    ("Expenses by date", "SELECT * FROM Expenses WHERE user_id = %s ORDER BY expense_date DESC",
+     (0,), "idx_expenses_user_date"),
+    ("Products for a user", "SELECT COUNT(*) FROM Products WHERE user_id = %s",
+     (0,), "idx_products_user"),
+]
+
+
+# Split a SQL script into statements on semicolons outside quotes and comments
+def split_statements(script):
+    statements, current, quote, i = [], [], None, 0
+    while i < len(script):
+        char = script[i]
+        if quote:
+            current.append(char)
+            if char == "\\":
+                current.append(script[i + 1:i + 2])
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in ("'", '"', "`"):
+            quote = char
+            current.append(char)
+        elif script.startswith("--", i) or char == "#":
+            end = script.find("\n", i)
+            i = len(script) if end == -1 else end
+            continue
+        elif script.startswith("/*", i):
+            end = script.find("*/", i + 2)
+            i = len(script) if end == -1 else end + 2
+            continue
+        elif char == ";":
+            statements.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    statements.append("".join(current).strip())
+    return [statement for statement in statements if statement]
+
+
+# Create an index unless one with that name, or one already covering the
+# same leading columns, exists on the table
+def ensure_index(cursor, table, name, columns):
+    cursor.execute(
+        """
+        SELECT INDEX_NAME, COLUMN_NAME
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        ORDER BY INDEX_NAME, SEQ_IN_INDEX
+        """,
+        (table,),
+    )
+    existing = {}
+    for index_name, column in cursor.fetchall():
+        existing.setdefault(index_name, []).append(column.lower())
+    wanted = [column.lower() for column in columns]
+    if name in existing or any(cols[:len(wanted)] == wanted for cols in existing.values()):
+        return False
+    cursor.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+    return True
+
+
+# (version, name, path) for every migration file, in version order
+def discover(directory=MIGRATIONS_DIR):
+    found = []
+    for filename in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(filename)
+        if ext not in (".sql", ".py") or "_" not in stem:
+            continue
+        version, name = stem.split("_", 1)
+        if version.isdigit():
+            found.append((version, name, os.path.join(directory, filename)))
+    return found
+
+
+def applied_versions(cursor):
+    cursor.execute(HISTORY_TABLE)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def run_migration(cursor, path):
+    if path.endswith(".sql"):
+        with open(path, "r") as file:
+            for statement in split_statements(file.read()):
+                cursor.execute(statement)
+    else:
+        spec = importlib.util.spec_from_file_location(os.path.basename(path)[:-3], path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.upgrade(cursor)
+
+
+# Apply every pending migration; returns the versions that ran
+def migrate(conn):
+    cursor = conn.cursor()
+    try:
+        done = applied_versions(cursor)
+        ran = []
+        for version, name, path in discover():
+            if version in done:
+                continue
+            print(f"→ {version} {name}")
+            run_migration(cursor, path)
+            cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+            conn.commit()
+            ran.append(version)
+        return ran
+    except Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# EXPLAIN each page query and report whether it uses the expected index
+def verify_indexes(conn):
+    cursor = conn.cursor(dictionary=True)
+    ok = True
+    try:
+        for label, query, params, index in INDEX_CHECKS:
+            cursor.execute("EXPLAIN " + query, params)
+            plan = cursor.fetchall()
+            used = [row.get("key") for row in plan]
+            if index in used:
+                print(f"✅ {label}: {index}")
+            else:
+                ok = False
+                print(f"⚠️ {label}: expected {index}, plan uses {used} ({plan[0].get('type') if plan else 'no plan'})")
+    finally:
+        cursor.close()
+    return ok
+
+
+def status(conn):
+    cursor = conn.cursor()
+    try:
+        done = applied_versions(cursor)
+    finally:
+        cursor.close()
+    for version, name, _ in discover():
+        print(f"{'applied' if version in done else 'pending'}  {version} {name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply Retail Pulse schema migrations")
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations")
+    parser.add_argument("--verify", action="store_true", help="only check index usage with EXPLAIN")
+    args = parser.parse_args(argv)
+
+    try:
+        conn = mysql.connector.connect(**connection_config())
+    except Error as err:
+        print(f"❌ MySQL Error: {err}")
+        return 1
+    try:
+        if args.status:
+            status(conn)
+            return 0
+        if not args.verify:
+            ran = migrate(conn)
+            print(f"✅ Applied {len(ran)} migration(s)." if ran else "✅ Database is up to date.")
+        return 0 if verify_indexes(conn) else 1
+    except Error as err:
+        print(f"❌ MySQL Error: {err}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+-- The tables init_db.py used to create, as the pages read and write them.
+-- Existing databases already have them, so every statement is a no-op
+-- there; a fresh database gets them before 0001 builds on top. Expenses
+-- starts without a key; 0003 adds expense_id.
+CREATE TABLE IF NOT EXISTS Users (
+    user_id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    username VARCHAR(255) NOT NULL UNIQUE,
+    email VARCHAR(255) NOT NULL UNIQUE,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS Products (
+    product_id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    Name VARCHAR(255),
+    category VARCHAR(255),
+    cost_price DECIMAL(10, 2),
+    selling_price DECIMAL(10, 2),
+    stock INT DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES Users(user_id)
+);
+
+CREATE TABLE IF NOT EXISTS Purchases (
+    purchase_id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    product_id INT,
+    vendor_name VARCHAR(255),
+    quantity_purchased INT,
+    cost_price DECIMAL(10, 2),
+    order_date DATE,
+    payment_due DATE,
+    payment_status VARCHAR(50),
+    FOREIGN KEY (user_id) REFERENCES Users(user_id)
+);
+
+CREATE TABLE IF NOT EXISTS Sales (
+    sale_id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    product_id INT,
+    quantity_sold INT,
+    selling_price DECIMAL(10, 2),
+    sale_date DATE,
+    shipped TINYINT(1) DEFAULT 0,
+    payment_received TINYINT(1) DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES Users(user_id)
+);
+
+CREATE TABLE IF NOT EXISTS Expenses (
+    user_id INT NOT NULL,
+    expense_date DATE,
+    category VARCHAR(100),
+    TYPE VARCHAR(50),
+    amount DECIMAL(10, 2),
+    description VARCHAR(255),
+    FOREIGN KEY (user_id) REFERENCES Users(user_id)
+);
@@ -0,0 +1,19 @@
+-- Running stock position per product, maintained by the write path in db.py
+CREATE TABLE IF NOT EXISTS stock_levels (
+    user_id INT NOT NULL,
+    product_id INT NOT NULL,
+    quantity_purchased BIGINT NOT NULL DEFAULT 0,
+    quantity_sold BIGINT NOT NULL DEFAULT 0,
+    live_stock BIGINT AS (quantity_purchased - quantity_sold) STORED,
+    PRIMARY KEY (user_id, product_id)
+);
+
+-- Backfill from existing history (safe to re-run)
+REPLACE INTO stock_levels (user_id, product_id, quantity_purchased, quantity_sold)
+SELECT user_id, product_id, SUM(quantity_purchased), SUM(quantity_sold)
+FROM (
+    SELECT user_id, product_id, quantity_purchased, 0 AS quantity_sold FROM Purchases
+    UNION ALL
+    SELECT user_id, product_id, 0 AS quantity_purchased, quantity_sold FROM Sales
+) movements
+GROUP BY user_id, product_id;
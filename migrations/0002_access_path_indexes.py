@@ -0,0 +1,18 @@
+from migrate import ensure_index
+
+# Composite indexes for the page access paths: every query filters on
+# user_id first, then narrows by a date window, a product or payment status.
+INDEXES = [
+    ("Sales", "idx_sales_user_date", ["user_id", "sale_date"]),
+    ("Sales", "idx_sales_user_product", ["user_id", "product_id"]),
+    ("Purchases", "idx_purchases_user_date", ["user_id", "order_date"]),
+    ("Purchases", "idx_purchases_user_product", ["user_id", "product_id"]),
+    ("Purchases", "idx_purchases_user_status_due", ["user_id", "payment_status", "payment_due"]),
+    ("Expenses", "idx_expenses_user_date", ["user_id", "expense_date"]),
+    ("Products", "idx_products_user", ["user_id"]),
+]
+
+
+def upgrade(cursor):
+    for table, name, columns in INDEXES:
+        ensure_index(cursor, table, name, columns)
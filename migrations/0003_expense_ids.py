@@ -0,0 +1,21 @@
+# Expenses had no key, so edits and deletes matched rows on every field and
+# the raw-data grid had nothing to page on. Give each row an expense_id.
+
+
+def upgrade(cursor):
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Expenses' AND COLUMN_NAME = 'expense_id'
+        """
+    )
+    if cursor.fetchone()[0]:
+        return
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.TABLE_CONSTRAINTS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Expenses' AND CONSTRAINT_TYPE = 'PRIMARY KEY'
+        """
+    )
+    key = "UNIQUE KEY" if cursor.fetchone()[0] else "PRIMARY KEY"
+    cursor.execute(f"ALTER TABLE Expenses ADD COLUMN expense_id INT NOT NULL AUTO_INCREMENT {key} FIRST")
@@ -0,0 +1,38 @@
+-- Per-user KPI totals, maintained by the write path (ledger.SUMMARY_MEASURES)
+CREATE TABLE IF NOT EXISTS user_summary (
+    user_id INT NOT NULL PRIMARY KEY,
+    product_count BIGINT NOT NULL DEFAULT 0,
+    sales_count BIGINT NOT NULL DEFAULT 0,
+    units_sold DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    sales_revenue DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    purchase_count BIGINT NOT NULL DEFAULT 0,
+    units_purchased DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    purchase_cost DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    expense_count BIGINT NOT NULL DEFAULT 0,
+    expense_total DECIMAL(20, 2) NOT NULL DEFAULT 0
+);
+
+-- Backfill from existing history (safe to re-run)
+REPLACE INTO user_summary (
+    user_id, product_count, sales_count, units_sold, sales_revenue,
+    purchase_count, units_purchased, purchase_cost, expense_count, expense_total
+)
+SELECT user_id, SUM(product_count), SUM(sales_count), SUM(units_sold), SUM(sales_revenue),
+       SUM(purchase_count), SUM(units_purchased), SUM(purchase_cost), SUM(expense_count), SUM(expense_total)
+FROM (
+    SELECT user_id, COUNT(*) AS product_count, 0 AS sales_count, 0 AS units_sold, 0 AS sales_revenue,
+           0 AS purchase_count, 0 AS units_purchased, 0 AS purchase_cost, 0 AS expense_count, 0 AS expense_total
+    FROM Products GROUP BY user_id
+    UNION ALL
+    SELECT user_id, 0, COUNT(*), COALESCE(SUM(quantity_sold), 0), COALESCE(SUM(quantity_sold * selling_price), 0),
+           0, 0, 0, 0, 0
+    FROM Sales GROUP BY user_id
+    UNION ALL
+    SELECT user_id, 0, 0, 0, 0,
+           COUNT(*), COALESCE(SUM(quantity_purchased), 0), COALESCE(SUM(quantity_purchased * cost_price), 0), 0, 0
+    FROM Purchases GROUP BY user_id
+    UNION ALL
+    SELECT user_id, 0, 0, 0, 0, 0, 0, 0, COUNT(*), COALESCE(SUM(amount), 0)
+    FROM Expenses GROUP BY user_id
+) totals
+GROUP BY user_id;
@@ -0,0 +1,56 @@
+-- Daily rollups behind the trend charts, maintained by the write path
+-- (ledger.ROLLUPS). Charts scan one row per day and key instead of every
+-- transaction.
+CREATE TABLE IF NOT EXISTS sales_daily (
+    user_id INT NOT NULL,
+    day DATE NOT NULL,
+    product_id INT NOT NULL,
+    order_count BIGINT NOT NULL DEFAULT 0,
+    units DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    revenue DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, product_id),
+    KEY idx_sales_daily_product (user_id, product_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS purchases_daily (
+    user_id INT NOT NULL,
+    day DATE NOT NULL,
+    product_id INT NOT NULL,
+    vendor_name VARCHAR(255) NOT NULL DEFAULT '',
+    order_count BIGINT NOT NULL DEFAULT 0,
+    units DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    cost DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, product_id, vendor_name)
+);
+
+CREATE TABLE IF NOT EXISTS expenses_daily (
+    user_id INT NOT NULL,
+    day DATE NOT NULL,
+    category VARCHAR(255) NOT NULL DEFAULT '',
+    TYPE VARCHAR(64) NOT NULL DEFAULT '',
+    expense_count BIGINT NOT NULL DEFAULT 0,
+    amount DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, category, TYPE)
+);
+
+-- Backfill from existing history (safe to re-run)
+REPLACE INTO sales_daily (user_id, day, product_id, order_count, units, revenue)
+SELECT user_id, DATE(sale_date), COALESCE(product_id, 0), COUNT(*),
+       COALESCE(SUM(quantity_sold), 0), COALESCE(SUM(quantity_sold * selling_price), 0)
+FROM Sales
+WHERE sale_date IS NOT NULL
+GROUP BY user_id, DATE(sale_date), COALESCE(product_id, 0);
+
+REPLACE INTO purchases_daily (user_id, day, product_id, vendor_name, order_count, units, cost)
+SELECT user_id, DATE(order_date), COALESCE(product_id, 0), COALESCE(vendor_name, ''), COUNT(*),
+       COALESCE(SUM(quantity_purchased), 0), COALESCE(SUM(quantity_purchased * cost_price), 0)
+FROM Purchases
+WHERE order_date IS NOT NULL
+GROUP BY user_id, DATE(order_date), COALESCE(product_id, 0), COALESCE(vendor_name, '');
+
+REPLACE INTO expenses_daily (user_id, day, category, TYPE, expense_count, amount)
+SELECT user_id, DATE(expense_date), COALESCE(category, ''), COALESCE(TYPE, ''), COUNT(*),
+       COALESCE(SUM(amount), 0)
+FROM Expenses
+WHERE expense_date IS NOT NULL
+GROUP BY user_id, DATE(expense_date), COALESCE(category, ''), COALESCE(TYPE, '');
@@ -0,0 +1,17 @@
+-- Stored catalog forecasts (forecast.py): monthly actuals, one-step fitted
+-- values and future forecasts per product, plus the run that produced them
+CREATE TABLE IF NOT EXISTS sales_forecasts (
+    user_id INT NOT NULL,
+    product_id INT NOT NULL,
+    month DATE NOT NULL,
+    quantity_sold DECIMAL(20, 2) NULL,
+    forecast DECIMAL(20, 4) NULL,
+    PRIMARY KEY (user_id, product_id, month)
+);
+
+CREATE TABLE IF NOT EXISTS forecast_runs (
+    user_id INT NOT NULL PRIMARY KEY,
+    data_version VARCHAR(64) NOT NULL,
+    method VARCHAR(32) NOT NULL,
+    created_at DATETIME NOT NULL
+);
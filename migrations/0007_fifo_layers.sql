@@ -0,0 +1,43 @@
+-- FIFO cost layers and per-sale cost (fifo.py). Layers are built
+-- incrementally from the id watermarks; fifo_products holds each product's
+-- running totals and the dirty flag set when a layered row changes.
+CREATE TABLE IF NOT EXISTS fifo_watermarks (
+    user_id INT NOT NULL PRIMARY KEY,
+    last_purchase_id INT NOT NULL DEFAULT 0,
+    last_sale_id INT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS fifo_products (
+    user_id INT NOT NULL,
+    product_id INT NOT NULL,
+    purchased_qty DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    purchased_cost DECIMAL(20, 4) NOT NULL DEFAULT 0,
+    sold_qty DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    last_unit_cost DECIMAL(20, 4) NOT NULL DEFAULT 0,
+    dirty TINYINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, product_id)
+);
+
+CREATE TABLE IF NOT EXISTS fifo_layers (
+    user_id INT NOT NULL,
+    product_id INT NOT NULL,
+    purchase_id INT NOT NULL,
+    order_date DATE NULL,
+    quantity DECIMAL(20, 2) NOT NULL,
+    unit_cost DECIMAL(20, 4) NOT NULL,
+    cum_qty_end DECIMAL(20, 2) NOT NULL,
+    cum_cost_end DECIMAL(20, 4) NOT NULL,
+    PRIMARY KEY (user_id, product_id, purchase_id),
+    KEY idx_fifo_layers_open (user_id, product_id, cum_qty_end)
+);
+
+CREATE TABLE IF NOT EXISTS fifo_sale_costs (
+    user_id INT NOT NULL,
+    sale_id INT NOT NULL,
+    product_id INT NOT NULL,
+    sale_date DATE NULL,
+    quantity DECIMAL(20, 2) NOT NULL,
+    cogs DECIMAL(20, 4) NOT NULL,
+    PRIMARY KEY (user_id, sale_id),
+    KEY idx_fifo_sale_costs_product (user_id, product_id)
+);
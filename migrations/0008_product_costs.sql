@@ -0,0 +1,42 @@
+-- Weighted-average purchase cost per product, maintained by the write path
+-- (ledger._apply_product_costs), with every change recorded in
+-- product_cost_history.
+CREATE TABLE IF NOT EXISTS product_costs (
+    user_id INT NOT NULL,
+    product_id INT NOT NULL,
+    total_quantity DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    total_cost DECIMAL(20, 4) NOT NULL DEFAULT 0,
+    avg_cost DECIMAL(20, 4) NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, product_id)
+);
+
+CREATE TABLE IF NOT EXISTS product_cost_history (
+    history_id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    product_id INT NOT NULL,
+    quantity_delta DECIMAL(20, 2) NOT NULL,
+    cost_delta DECIMAL(20, 4) NOT NULL,
+    total_quantity DECIMAL(20, 2) NOT NULL,
+    total_cost DECIMAL(20, 4) NOT NULL,
+    avg_cost DECIMAL(20, 4) NULL,
+    recorded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_product_cost_history_product (user_id, product_id, history_id)
+);
+
+-- Backfill from existing purchases (safe to re-run)
+REPLACE INTO product_costs (user_id, product_id, total_quantity, total_cost, avg_cost)
+SELECT user_id, product_id,
+       COALESCE(SUM(quantity_purchased), 0),
+       COALESCE(SUM(quantity_purchased * cost_price), 0),
+       SUM(quantity_purchased * cost_price) / NULLIF(SUM(quantity_purchased), 0)
+FROM Purchases
+GROUP BY user_id, product_id;
+
+INSERT INTO product_cost_history (user_id, product_id, quantity_delta, cost_delta, total_quantity, total_cost, avg_cost)
+SELECT c.user_id, c.product_id, c.total_quantity, c.total_cost, c.total_quantity, c.total_cost, c.avg_cost
+FROM product_costs c
+WHERE NOT EXISTS (
+    SELECT 1 FROM product_cost_history h
+    WHERE h.user_id = c.user_id AND h.product_id = c.product_id
+);
@@ -0,0 +1,37 @@
+# Keep one stored forecast and one run per forecasting method, so the
+# smoothing and Prophet backends no longer overwrite each other's results
+# for the same user. Existing rows belong to the method of the user's run.
+
+
+def _primary_key(cursor, table):
+    cursor.execute(
+        """
+        SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_NAME = 'PRIMARY'
+        ORDER BY ORDINAL_POSITION
+        """,
+        (table,),
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def upgrade(cursor):
+    if "method" not in _primary_key(cursor, "sales_forecasts"):
+        cursor.execute(
+            """
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'sales_forecasts' AND COLUMN_NAME = 'method'
+            """
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute("ALTER TABLE sales_forecasts ADD COLUMN method VARCHAR(32) NOT NULL DEFAULT 'smoothing' AFTER user_id")
+        cursor.execute(
+            """
+            UPDATE sales_forecasts f
+            JOIN forecast_runs r ON r.user_id = f.user_id
+            SET f.method = r.method
+            """
+        )
+        cursor.execute("ALTER TABLE sales_forecasts DROP PRIMARY KEY, ADD PRIMARY KEY (user_id, method, product_id, month)")
+    if "method" not in _primary_key(cursor, "forecast_runs"):
+        cursor.execute("ALTER TABLE forecast_runs DROP PRIMARY KEY, ADD PRIMARY KEY (user_id, method)")
@@ -0,0 +1,10 @@
+-- Last failed refit per user and forecasting method (prophet_backend.py).
+-- A refit that failed is not resubmitted until the sales history changes.
+CREATE TABLE IF NOT EXISTS forecast_failures (
+    user_id INT NOT NULL,
+    method VARCHAR(32) NOT NULL,
+    data_version VARCHAR(64) NOT NULL,
+    error TEXT NOT NULL,
+    failed_at DATETIME NOT NULL,
+    PRIMARY KEY (user_id, method)
+);
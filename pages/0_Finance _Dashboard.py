@@ -1,7 +1,14 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from db import get_connection, execute_query
+from loaders import load_table, load_concurrently, stop_on_errors
+from inventory import load_stock_levels
+from replenishment import reorder_plan
+from kpis import page_kpis
+import fifo
+import metrics
+import instrumentation
+import perf_panel
 from auth import check_login
 
 st.set_page_config(page_title="📊 Dashboard", layout="wide")
@@ -32,6 +39,8 @@ st.markdown("""
 
 # --- Authentication Check ---
 check_login()
+instrumentation.page("Finance")
+user_id = st.session_state.user_id
 
 st.markdown("<h1 style='text-align:left;margin-bottom:0.5rem;position:relative;left:-50px;top:-60px;'> Retail Dashboard</h1>", unsafe_allow_html=True)
 st.markdown("<div style='text-align:left;font-size:1.15rem;color:#475569;margin-bottom:0 rem;font-weight:500;position:relative;left:-50px;top:-80px;'>Unified business and finance insights at a glance.</div>", unsafe_allow_html=True)
@@ -111,45 +120,35 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 # --- Load Data ---
-conn = get_connection()
-products = pd.read_sql("SELECT * FROM Products", conn)
-sales = pd.read_sql("SELECT * FROM Sales", conn)
-purchases = pd.read_sql("SELECT * FROM Purchases", conn)
-
-# After loading sales and purchases DataFrames
-sales['payment_received'] = sales['payment_received'].astype(int)
-purchases['payment_status'] = purchases['payment_status'].astype(str)
+instrumentation.mark("Load data")
+data, errors = load_concurrently({
+    "Products": lambda: load_table("Products", user_id, ["product_id", "Name", "category", "cost_price", "selling_price"]),
+    "Sales": lambda: load_table("Sales", user_id, ["product_id", "quantity_sold", "selling_price", "sale_date", "payment_received"]),
+    "Purchases": lambda: load_table("Purchases", user_id, ["product_id", "vendor_name", "quantity_purchased", "cost_price", "order_date", "payment_status"]),
+    "stock levels": lambda: load_stock_levels(user_id),
+    "FIFO layers": lambda: fifo.refresh(user_id),
+})
+stop_on_errors(errors)
+products, sales, purchases, stock_levels = data["Products"], data["Sales"], data["Purchases"], data["stock levels"]
 
 # Calculate Accounts Receivable before Key Metrics
-receivables = sales[sales['payment_received'] == 0]['quantity_sold'] * sales[sales['payment_received'] == 0]['selling_price']
-receivables = receivables.sum() if not sales.empty else 0
+receivables = metrics.receivables(sales)
 
 st.markdown("<div class='kpi-section-title'style='text-align:left;position:relative;margin-bottom:0rem;top:-50px;'>Key Metrics</div>", unsafe_allow_html=True)
 
 
 # --- KPI Cards ---
-total_sales = (sales['quantity_sold'] * sales['selling_price']).sum()
-total_products = products.shape[0]
-total_expenses = purchases['quantity_purchased'].sum() * purchases['cost_price'].mean() if not purchases.empty else 0
-# COGS & Profit
-cogs = 0
-for _, row in sales.iterrows():
-    cost = products.loc[products['product_id'] == row['product_id'], 'cost_price']
-    if not cost.empty:
-        cogs += row['quantity_sold'] * cost.values[0]
+instrumentation.mark("KPIs")
+cards = page_kpis(user_id, "finance")
+total_sales = cards["total_sales"]
+total_products = cards["total_products"]
+total_expenses = cards["total_expenses"]
+# COGS & Profit (FIFO)
+cogs = fifo.total_cogs(user_id)
 gross_profit = total_sales - cogs
 # DIO
-purchase_qty = purchases.groupby('product_id')['quantity_purchased'].sum().reset_index(name='total_purchased')
-sales_qty = sales.groupby('product_id')['quantity_sold'].sum().reset_index(name='total_sold')
-live_stock = pd.merge(products, purchase_qty, on='product_id', how='left')
-live_stock = pd.merge(live_stock, sales_qty, on='product_id', how='left')
-live_stock['total_purchased'].fillna(0, inplace=True)
-live_stock['total_sold'].fillna(0, inplace=True)
-live_stock['live_stock'] = live_stock['total_purchased'] - live_stock['total_sold']
-live_stock['holding_cost'] = live_stock['live_stock'] * live_stock['cost_price']
-avg_inventory = live_stock['live_stock'].mean()
-daily_cogs = cogs / 30 if cogs > 0 else 1
-DIO = avg_inventory / daily_cogs if daily_cogs else 0
+live_stock = metrics.stock_position(products, stock_levels)
+DIO = metrics.days_inventory_outstanding(live_stock, cogs)
 
 k1, k2, k3 = st.columns(3)
 with k1:
@@ -203,6 +202,7 @@ with k6:
     """, unsafe_allow_html=True)
 
 # --- Ratio Analysis Section ---
+instrumentation.mark("Ratios")
 st.markdown("<div class='kpi-section-title' style='text-align:left;position:relative;margin-bottom:2.5rem;font-size:2.0rem;color:#0F172A;font-weight:500;'>Ratio Analysis</div>", unsafe_allow_html=True)
 st.markdown("<div style='height:16px;'></div>", unsafe_allow_html=True)
 
@@ -210,16 +210,15 @@ st.markdown("<div style='height:16px;'></div>", unsafe_allow_html=True)
 # receivables = sales[sales['payment_received'] == 0]['quantity_sold'] * sales[sales['payment_received'] == 0]['selling_price']
 # receivables = receivables.sum() if not sales.empty else 0
 
-# Inventory value
-inventory_value = live_stock['holding_cost'].sum() if not live_stock.empty else 0
+# Inventory value (remaining FIFO layers)
+inventory_value = fifo.valuation(user_id)['value'].sum()
 
 # Current Assets
 cash = 0  # Update if you have cash data
 current_assets = cash + receivables + inventory_value
 
 # Current Liabilities: purchases where payment_status == 'Pending'
-current_liabilities = purchases[purchases['payment_status'].str.lower() == 'pending']['quantity_purchased'] * purchases[purchases['payment_status'].str.lower() == 'pending']['cost_price']
-current_liabilities = current_liabilities.sum() if not purchases.empty else 0
+current_liabilities = metrics.payables(purchases)
 
 # Quick Assets
 quick_assets = cash + receivables
@@ -231,8 +230,7 @@ gross_margin = (gross_profit / total_sales) * 100 if total_sales else 0
 net_profit = total_sales - total_expenses
 net_margin = (net_profit / total_sales) * 100 if total_sales else 0
 # Calculate Accounts Payable
-accounts_payable = purchases[purchases['payment_status'].str.lower() == 'pending']['quantity_purchased'] * purchases[purchases['payment_status'].str.lower() == 'pending']['cost_price']
-accounts_payable = accounts_payable.sum() if not purchases.empty else 0
+accounts_payable = current_liabilities
 
 # Display
 r1, r2, r3, r4, r5 = st.columns(5)
@@ -248,11 +246,9 @@ with r5:
     st.metric("Accounts Payable", f"₹ {accounts_payable:,.2f}")
 
 # --- Category-wise Profitability ---
-merged = pd.merge(sales, products[['product_id', 'NAME', 'category', 'cost_price']], on='product_id', how='left')
-merged['Revenue'] = merged['quantity_sold'] * merged['selling_price']
-merged['Cost'] = merged['quantity_sold'] * merged['cost_price']
-merged['Profit'] = merged['Revenue'] - merged['Cost']
-category_profit = merged.groupby('category')[['Revenue', 'Cost', 'Profit']].sum().reset_index()
+instrumentation.mark("Category profit")
+merged = metrics.sales_detail(sales, products)
+category_profit = metrics.category_profit(merged)
 fig_cat = px.bar(category_profit, x='category', y='Profit', color='category', title="Category-wise Profitability", color_discrete_sequence=px.colors.qualitative.Pastel)
 fig_cat.update_layout(
     paper_bgcolor='#fff', plot_bgcolor='#fff', margin=dict(l=20, r=20, t=40, b=20),
@@ -263,16 +259,13 @@ fig_cat.update_layout(
 )
 
 # --- Interactive Sales Breakdown ---
-num_products = merged['NAME'].nunique()
+instrumentation.mark("Sales breakdown")
+num_products = merged['Name'].nunique()
 if num_products <= 3:
     top_n = num_products
 else:
     top_n = st.slider("Top N Products by Sales", 3, min(50, num_products), min(5, num_products))
-category_sales = (
-    merged.groupby('category')
-    .apply(lambda x: (x['quantity_sold'] * x['selling_price']).sum())
-    .reset_index(name='total_sales')
-)
+category_sales = metrics.category_sales(merged)
 fig_pie = px.pie(category_sales, values='total_sales', names='category', title="Category-wise Sales", color_discrete_sequence=px.colors.qualitative.Set3)
 fig_pie.update_traces(textinfo='percent+label')
 fig_pie.update_layout(
@@ -281,14 +274,8 @@ fig_pie.update_layout(
     margin=dict(l=20, r=20, t=40, b=20),
     legend=dict(font=dict(size=14)),
 )
-product_sales = (
-    merged.groupby('NAME')
-    .apply(lambda x: (x['quantity_sold'] * x['selling_price']).sum())
-    .reset_index(name='total_sales')
-    .sort_values(by='total_sales', ascending=False)
-    .head(top_n)
-)
-fig_bar = px.bar(product_sales, x='NAME', y='total_sales', title=f"Top {top_n} Products by Sales", color='NAME', color_discrete_sequence=px.colors.qualitative.Prism)
+product_sales = metrics.top_product_sales(merged, top_n)
+fig_bar = px.bar(product_sales, x='Name', y='total_sales', title=f"Top {top_n} Products by Sales", color='Name', color_discrete_sequence=px.colors.qualitative.Prism)
 fig_bar.update_layout(
     xaxis_title="", yaxis_title="Sales", paper_bgcolor='#fff', plot_bgcolor='#fff',
     font=dict(size=16, color='#1a2233'),
@@ -299,10 +286,9 @@ fig_bar.update_layout(
 )
 
 # --- Supplier Payment Simulation ---
+instrumentation.mark("Supplier payments")
 pastel_colors = ["#A3C1DA", "#F7CAC9", "#B5EAD7", "#FFDAC1", "#E2F0CB", "#CBAACB", "#FFB7B2", "#B5EAD7"]
-purchases['outstanding'] = purchases.apply(lambda x: x['quantity_purchased'] * x['cost_price'] if x['payment_status'].lower() == 'pending' else 0, axis=1)
-supplier_outstanding = purchases.groupby('vendor_name')['outstanding'].sum().reset_index()
-supplier_outstanding = supplier_outstanding[supplier_outstanding['outstanding'] > 0]
+supplier_outstanding = metrics.supplier_outstanding(purchases)
 if not supplier_outstanding.empty:
     fig_out = px.pie(supplier_outstanding, names='vendor_name', values='outstanding', title='Pending Payments to Vendors', color_discrete_sequence=pastel_colors)
     fig_out.update_layout(
@@ -315,13 +301,14 @@ else:
     st.markdown("<div class='success-card'>✅ All supplier payments are cleared.</div>", unsafe_allow_html=True)
 
 # --- Sales & Vendor Analytics Tabs ---
+instrumentation.mark("Analytics tabs")
 sales_tab, vendor_tab = st.tabs(["📊 Sales Analytics", "🤝 Vendor Analytics"])
 
 with sales_tab:
     st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Category-wise Profitability</div>", unsafe_allow_html=True)
     st.markdown("<div style='height:16px;'></div>", unsafe_allow_html=True)
     st.markdown("<div style='display:flex;justify-content:center;'><div style='max-width:600px;width:100%;'>", unsafe_allow_html=True)
-    st.plotly_chart(fig_cat, use_container_width=True)
+    instrumentation.render(st.plotly_chart, fig_cat, use_container_width=True)
     st.markdown("</div></div>", unsafe_allow_html=True)
     st.markdown("<div style='height:32px;'></div>", unsafe_allow_html=True)
     st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Sales Breakdown</div>", unsafe_allow_html=True)
@@ -329,11 +316,11 @@ with sales_tab:
     col7, col8 = st.columns(2)
     with col7:
         st.markdown("<div style='display:flex;justify-content:center;'><div style='max-width:400px;width:100%;'>", unsafe_allow_html=True)
-        st.plotly_chart(fig_pie, use_container_width=True)
+        instrumentation.render(st.plotly_chart, fig_pie, use_container_width=True)
         st.markdown("</div></div>", unsafe_allow_html=True)
     with col8:
         st.markdown("<div style='display:flex;justify-content:center;'><div style='max-width:400px;width:100%;'>", unsafe_allow_html=True)
-        st.plotly_chart(fig_bar, use_container_width=True)
+        instrumentation.render(st.plotly_chart, fig_bar, use_container_width=True)
         st.markdown("</div></div>", unsafe_allow_html=True)
     st.markdown("<div style='height:32px;'></div>", unsafe_allow_html=True)
 
@@ -342,13 +329,14 @@ with vendor_tab:
     st.markdown("<div style='height:16px;'></div>", unsafe_allow_html=True)
     if not supplier_outstanding.empty:
         st.markdown("<div style='display:flex;justify-content:center;'><div style='max-width:600px;width:100%;'>", unsafe_allow_html=True)
-        st.plotly_chart(fig_out, use_container_width=True)
+        instrumentation.render(st.plotly_chart, fig_out, use_container_width=True)
         st.markdown("</div></div>", unsafe_allow_html=True)
     else:
         st.markdown("<div class='success-card'>✅ All supplier payments are cleared.</div>", unsafe_allow_html=True)
     st.markdown("<div style='height:32px;'></div>", unsafe_allow_html=True)
 
 # --- Inventory Holding Costs & DIO ---
+instrumentation.mark("Holding costs")
 st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500;position:relative;top:-40px;'>Inventory Holding Costs & DIO</div>", unsafe_allow_html=True)
 col4, col5 = st.columns(2)
 with col4:
@@ -356,7 +344,7 @@ with col4:
         <div class='metric-card-inv'>
             <div class='icon'>💸</div>
             <div class='label'>Inventory Holding Cost</div>
-            <div class='value'>₹ {live_stock['holding_cost'].sum():,.2f}</div>
+            <div class='value'>₹ {inventory_value:,.2f}</div>
             <div class='desc'>Total value of unsold inventory currently held.</div>
         </div>
     """, unsafe_allow_html=True)
@@ -372,20 +360,15 @@ with col5:
 st.markdown("<div style='height:32px;'></div>", unsafe_allow_html=True)
 
 # --- Low Stock Alert ---
+instrumentation.mark("Low stock")
 st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500;position:relative:top:-60px;'>Low Stock Alerts</div>", unsafe_allow_html=True)
-low_stock_df = live_stock[live_stock['live_stock'] <= 5].copy()
+low_stock_df = metrics.low_stock(live_stock, reorder_plan(user_id))
 if not low_stock_df.empty:
     st.markdown("<div class='alert-card'>⚠️ <b>Some products are low on stock!</b></div>", unsafe_allow_html=True)
-    # Add status and action columns
-    def status(row):
-        if row['live_stock'] < 0:
-            return 'Critical'
-        else:
-            return 'Low'
-    low_stock_df['Status'] = low_stock_df.apply(status, axis=1)
+    # Add action column
     low_stock_df['Action'] = 'Reorder Now'
-    st.dataframe(
-        low_stock_df[['NAME', 'category', 'live_stock', 'Status', 'Action']]
+    instrumentation.render(st.dataframe,
+        low_stock_df[['Name', 'category', 'live_stock', 'reorder_point', 'reorder_qty', 'Status', 'Action']]
         .style.applymap(lambda v: 'color: #b91c1c; font-weight:700;' if v == 'Critical' else ('color: #f59e42; font-weight:600;' if v == 'Low' else ''), subset=['Status'])
         .applymap(lambda v: 'color: #2563eb; font-weight:600;' if v == 'Reorder Now' else '', subset=['Action']),
         use_container_width=True
@@ -394,6 +377,7 @@ else:
     st.markdown("<div class='success-card'>✅ No low stock alerts!</div>", unsafe_allow_html=True)
 
 # --- Recent Transactions ---
+instrumentation.mark("Recent transactions")
 st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500;position:relative:top:-40px;'>Recent Transactions</div>", unsafe_allow_html=True)
 recent_sales = sales.sort_values('sale_date', ascending=False).head(5)
 recent_purchases = purchases.sort_values('order_date', ascending=False).head(5)
@@ -401,14 +385,15 @@ col6, col7 = st.columns(2)
 
 with col6:
     st.markdown("<div class='recent-subheader'>Recent Sales</div>", unsafe_allow_html=True)
-    st.dataframe(recent_sales[['sale_date', 'product_id', 'quantity_sold', 'selling_price']], use_container_width=True)
+    instrumentation.render(st.dataframe, recent_sales[['sale_date', 'product_id', 'quantity_sold', 'selling_price']], use_container_width=True)
     st.markdown("</div>", unsafe_allow_html=True)
 
 with col7:
     st.markdown("<div class='recent-subheader'>Recent Purchases</div>", unsafe_allow_html=True)
-    st.dataframe(recent_purchases[['order_date', 'product_id', 'quantity_purchased', 'cost_price']], use_container_width=True)
+    instrumentation.render(st.dataframe, recent_purchases[['order_date', 'product_id', 'quantity_purchased', 'cost_price']], use_container_width=True)
     st.markdown("</div>", unsafe_allow_html=True)
 # --- Download Report Button ---
+instrumentation.mark("Download")
 import io
 import base64
 report_df = pd.DataFrame({
@@ -423,3 +408,5 @@ output = io.BytesIO()
 report_df.to_csv(output, index=False)
 b64 = base64.b64encode(output.getvalue()).decode()
 st.markdown(f"<a href='data:file/csv;base64,{b64}' download='dashboard_report.csv' style='color:#2563eb;font-weight:700;'>⬇️ Download Key Metrics as CSV</a>", unsafe_allow_html=True)
+
+perf_panel.show({"products": products, "sales": sales, "purchases": purchases, "stock levels": stock_levels})
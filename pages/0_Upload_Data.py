@@ -1,12 +1,15 @@
 import streamlit as st
 import pandas as pd
-from db import execute_query
+from db import insert_row
+from ingest import missing_columns, stream_upload
+import instrumentation
 from auth import check_login
 
 # --------------------------
 # Check if user is logged in
 # --------------------------
 check_login()
+instrumentation.page("Upload Data")
 user_id = st.session_state.user_id
 
 st.set_page_config(page_title="Upload Data", layout="wide")
@@ -16,29 +19,24 @@ st.markdown("<h1 style='text-align:left;margin-bottom:0.5rem;position:relative;t
 # --------------------------
 # Function to insert uploaded data into SQL
 # --------------------------
-def handle_csv_upload(label, table_name, required_columns):
+def handle_csv_upload(label, table_name):
     uploaded_file = st.file_uploader(f"Choose a {label} file", type=["csv"], key=label)
     if uploaded_file is not None:
         try:
-            df = pd.read_csv(uploaded_file)
-
             # Validate required columns
-            missing_cols = [col for col in required_columns if col not in df.columns]
+            missing_cols = missing_columns(uploaded_file, table_name)
             if missing_cols:
                 st.error(f"Missing columns: {', '.join(missing_cols)}")
                 return
 
-            df['user_id'] = user_id  # Add user ID
-
-            # Insert rows into database
-            for _, row in df.iterrows():
-                cols = ", ".join(row.index)
-                vals = tuple(row.values)
-                placeholders = ", ".join(["%s"] * len(row))
-                query = f"INSERT INTO {table_name} ({cols}) VALUES ({placeholders})"
-                execute_query(query, vals)
+            # Stream the file in chunks and insert it in a single transaction
+            progress = st.progress(0.0, text=f"Uploading {label} data...")
+            def report(fraction, done):
+                progress.progress(fraction, text=f"Inserted {done:,} rows")
+            total = stream_upload(uploaded_file, table_name, user_id, on_progress=report)
+            progress.empty()
 
-            st.success(f"{label} uploaded successfully!")
+            st.success(f"{label} uploaded successfully! ({total:,} rows)")
 
         except Exception as e:
             st.error(f"Error uploading {label} data: {str(e)}")
@@ -58,6 +56,8 @@ def get_csv_download_button(label, df, filename):
 
 # --- CSV Upload Section ---
 st.markdown("<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500;position:relative;top:0px;'>Upload Data via CSV</h3>", unsafe_allow_html=True)
+st.caption("Every purchase needs an order_date and every sale a sale_date; files with empty dates are rejected.")
+st.caption(f"Files up to {st.get_option('server.maxUploadSize')} MB can be uploaded; larger exports need to be split into several files.")
 product_sample = pd.DataFrame({
     "NAME": ["T-shirt"],
     "category": ["Clothing"],
@@ -84,13 +84,13 @@ sales_sample = pd.DataFrame({
 col1, col2, col3 = st.columns(3)
 with col1:
     get_csv_download_button("Product", product_sample, "sample_products.csv")
-    handle_csv_upload("Product", "products", ["NAME", "category", "cost_price", "selling_price"])
+    handle_csv_upload("Product", "Products")
 with col2:
     get_csv_download_button("Purchase", purchase_sample, "sample_purchases.csv")
-    handle_csv_upload("Purchase", "purchases", ["product_id", "vendor_name", "quantity_purchased", "cost_price", "order_date", "payment_due", "payment_status"])
+    handle_csv_upload("Purchase", "Purchases")
 with col3:
     get_csv_download_button("Sales", sales_sample, "sample_sales.csv")
-    handle_csv_upload("Sales", "sales", ["product_id", "quantity_sold", "selling_price", "sale_date", "shipped", "payment_received"])
+    handle_csv_upload("Sales", "Sales")
 
 st.markdown("<hr style='margin:2.5rem 0;'>", unsafe_allow_html=True)
 
@@ -106,11 +106,10 @@ with col4:
             selling_price = st.number_input("Selling Price", min_value=0.0)
             submit = st.form_submit_button("Add Product")
             if submit:
-                query = """
-                    INSERT INTO Products (user_id, NAME, category, cost_price, selling_price)
-                    VALUES (%s, %s, %s, %s, %s)
-                """
-                execute_query(query, (user_id, name, category, cost_price, selling_price))
+                insert_row("Products", user_id, {
+                    "NAME": name, "category": category,
+                    "cost_price": cost_price, "selling_price": selling_price,
+                })
                 st.success("Product added successfully!")
 with col5:
     with st.expander("➕ Add Purchase Manually"):
@@ -124,11 +123,11 @@ with col5:
             payment_status = st.selectbox("Payment Status", ["Pending", "Completed","Overdue"])
             submit = st.form_submit_button("Add Purchase")
             if submit:
-                query = """
-                    INSERT INTO Purchases (user_id, product_id, vendor_name, quantity_purchased, cost_price, order_date, payment_due, payment_status)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                execute_query(query, (user_id, product_id, vendor_name, quantity_purchased, cost_price, order_date, payment_due, payment_status))
+                insert_row("Purchases", user_id, {
+                    "product_id": product_id, "vendor_name": vendor_name,
+                    "quantity_purchased": quantity_purchased, "cost_price": cost_price,
+                    "order_date": order_date, "payment_due": payment_due, "payment_status": payment_status,
+                })
                 st.success("Purchase added successfully!")
 with col6:
     with st.expander("➕ Add Sale Manually"):
@@ -144,11 +143,10 @@ with col6:
 
             submit = st.form_submit_button("Add Sale")
             if submit:
-                query = """
-                     INSERT INTO Sales (user_id, product_id, quantity_sold, selling_price, sale_date, shipped, payment_received)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                """
-                execute_query(query, (user_id, product_id, quantity_sold, selling_price, sale_date, shipped_value, payment_received_value))
+                insert_row("Sales", user_id, {
+                    "product_id": product_id, "quantity_sold": quantity_sold, "selling_price": selling_price,
+                    "sale_date": sale_date, "shipped": shipped_value, "payment_received": payment_received_value,
+                })
                 st.success("Sale added successfully!")
 
 
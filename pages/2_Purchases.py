@@ -1,13 +1,19 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from db import get_connection
+from db import update_rows, delete_rows
+from grid import paged_grid
+from loaders import TABLE_SCHEMAS, load_table, date_bounds, default_window, choice_filter
+from kpis import page_kpis
+import instrumentation
+from reports import distinct_values, vendor_share, product_purchases, monthly_purchases
 from auth import check_login
 
 # -------------------------
 # Authentication Check
 # -------------------------
 check_login()
+instrumentation.page("Purchases")
 user_id = st.session_state.user_id
 
 
@@ -167,24 +173,50 @@ st.markdown(
     unsafe_allow_html=True
 )
 # -------------------------
-# Connect to SQL
+# Load Data from SQL
 # -------------------------
-conn = get_connection()
+first_order, last_order = date_bounds("Purchases", user_id, "order_date")
 
 # -------------------------
-# Load Data from SQL
+# Sidebar Filters
 # -------------------------
-purchases = pd.read_sql("SELECT * FROM Purchases", conn)
-purchases['order_date'] = pd.to_datetime(purchases['order_date'], errors='coerce')
-purchases['payment_due'] = pd.to_datetime(purchases['payment_due'], errors='coerce')
+st.markdown("""
+<style>
+   [data-testid="stSidebar"] {
+        background-color: #0F172A !important;
+    }
+    [data-testid="stSidebar"] * {
+        color: white !important;
+    }
+</style>
+""", unsafe_allow_html=True)
+
+# --- Sidebar Filters ---
+product_options = distinct_values("Purchases", user_id, "product_id")
+vendor_options = distinct_values("Purchases", user_id, "vendor_name")
+status_options = distinct_values("Purchases", user_id, "payment_status")
+product_filter = st.sidebar.multiselect("Product ID", product_options, default=product_options, key="product_filter")
+vendor_filter = st.sidebar.multiselect("Vendor", vendor_options, default=vendor_options, key="vendor_filter")
+status_filter = st.sidebar.multiselect("Payment Status", status_options, default=status_options, key="status_filter")
+default_start, default_end = default_window(first_order, last_order)
+start_date = st.sidebar.date_input("Start Date", default_start, key="start_date")
+end_date = st.sidebar.date_input("End Date", default_end, key="end_date")
+
+# The filters become the WHERE clause of the purchase records grid
+filters = (
+    choice_filter("product_id", product_filter, product_options)
+    + choice_filter("vendor_name", vendor_filter, vendor_options)
+    + choice_filter("payment_status", status_filter, status_options)
+)
 
 # -------------------------
 # Compute KPIs
 # -------------------------
-total_orders = len(purchases)
-total_quantity = purchases['quantity_purchased'].sum()
-total_cost = (purchases['quantity_purchased'] * purchases['cost_price']).sum()
-vendors = purchases['vendor_name'].nunique()
+cards = page_kpis(user_id, "purchases")
+total_orders = cards['total_orders']
+total_quantity = cards['total_quantity']
+total_cost = cards['total_cost']
+vendors = len(vendor_options)
 
 st.markdown("<div class='kpi-section-title'style='text-align:left;position:relative;margin-bottom:1rem;'>Key Metrics</div>", unsafe_allow_html=True)
 
@@ -206,13 +238,17 @@ st.markdown("<hr class='divider'>", unsafe_allow_html=True)
 show_raw = st.checkbox("Show Raw Data Table (Edit/Delete)")
 if show_raw:
     st.markdown("<h1 style='font-size:2.0rem;color:#0F172A;font-weight:00;position:relative:top:-40px;'>Purchase Records</h4>", unsafe_allow_html=True)
-    raw_df = purchases.copy()
-    st.dataframe(raw_df, use_container_width=True)
+    raw_df = paged_grid(
+        "purchases", "Purchases", user_id, list(TABLE_SCHEMAS["Purchases"]), "purchase_id",
+        sort_columns=["purchase_id", "order_date", "payment_due", "quantity_purchased"],
+        search_columns=["vendor_name", "payment_status"], key_columns=["purchase_id", "product_id"],
+        filters=filters + [("order_date", ">=", start_date), ("order_date", "<=", end_date)],
+    )
     st.markdown("<b>Edit or Delete a Purchase Record:</b>", unsafe_allow_html=True)
-    selected_id = st.selectbox("Select Purchase ID to Edit/Delete", raw_df['purchase_id'] if 'purchase_id' in raw_df.columns else raw_df.index)
+    selected_id = st.selectbox("Select Purchase ID to Edit/Delete", raw_df['purchase_id'].tolist())
     action = st.radio("Action", ["Edit", "Delete"])
-    if action == "Edit":
-        row = raw_df[raw_df['purchase_id'] == selected_id].iloc[0] if 'purchase_id' in raw_df.columns else raw_df.loc[[selected_id]].iloc[0]
+    if action == "Edit" and selected_id is not None:
+        row = raw_df[raw_df['purchase_id'] == selected_id].iloc[0]
         with st.form("edit_purchase_form"):
             st.write("Edit the fields and click Save:")
             product_id = st.number_input("Product ID", min_value=1, value=int(row['product_id']))
@@ -224,68 +260,25 @@ if show_raw:
             payment_status = st.selectbox("Payment Status", ["Pending", "Completed", "Overdue"], index=["Pending", "Completed", "Overdue"].index(row['payment_status']) if row['payment_status'] in ["Pending", "Completed", "Overdue"] else 0)
             submit = st.form_submit_button("Save Changes")
             if submit:
-                conn = get_connection()
-                cursor = conn.cursor()
-                cursor.execute("""
-                    UPDATE Purchases SET product_id=%s, vendor_name=%s, quantity_purchased=%s, cost_price=%s, order_date=%s, payment_due=%s, payment_status=%s WHERE purchase_id=%s
-                """, (product_id, vendor_name, quantity_purchased, cost_price, order_date, payment_due, payment_status, selected_id))
-                conn.commit()
-                cursor.close()
-                conn.close()
+                update_rows("Purchases", user_id, {"purchase_id": selected_id}, {
+                    "product_id": product_id, "vendor_name": vendor_name,
+                    "quantity_purchased": quantity_purchased, "cost_price": cost_price,
+                    "order_date": order_date, "payment_due": payment_due, "payment_status": payment_status,
+                })
                 st.success("Purchase record updated!")
                 st.rerun()
-    elif action == "Delete":
+    elif action == "Delete" and selected_id is not None:
         if st.button("Delete This Record", key="delete_btn", help="Delete this record", use_container_width=True):
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM Purchases WHERE purchase_id=%s", (selected_id,))
-            conn.commit()
-            cursor.close()
-            conn.close()
+            delete_rows("Purchases", user_id, {"purchase_id": selected_id})
             st.success("Purchase record deleted!")
-            st.erun()
-
-# -------------------------
-# Sidebar Filters
-# -------------------------
-st.markdown("""
-<style>
-   [data-testid="stSidebar"] {
-        background-color: #0F172A !important;
-    }
-    [data-testid="stSidebar"] * {
-        color: white !important;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# --- Sidebar Filters ---
-product_filter = st.sidebar.multiselect("Product ID", purchases['product_id'].dropna().unique(), default=purchases['product_id'].unique(), key="product_filter")
-vendor_filter = st.sidebar.multiselect("Vendor", purchases['vendor_name'].dropna().unique(), default=purchases['vendor_name'].unique(), key="vendor_filter")
-status_filter = st.sidebar.multiselect("Payment Status", purchases['payment_status'].dropna().unique(), default=purchases['payment_status'].unique(), key="status_filter")
-start_date = st.sidebar.date_input("Start Date", purchases['order_date'].min(), key="start_date")
-end_date = st.sidebar.date_input("End Date", purchases['order_date'].max(), key="end_date")
-
-filtered = purchases[
-    (purchases['product_id'].isin(product_filter)) &
-    (purchases['vendor_name'].isin(vendor_filter)) &
-    (purchases['payment_status'].isin(status_filter)) &
-    (purchases['order_date'] >= pd.to_datetime(start_date)) &
-    (purchases['order_date'] <= pd.to_datetime(end_date))
-]
-
-# -------------------------
-# Display Filtered Table
-# -------------------------
-if show_raw:
-    st.markdown("<h4 style='margin-top:2rem;'>Purchase Records</h4>", unsafe_allow_html=True)
-    st.dataframe(filtered, use_container_width=True)
+            st.rerun()
 
 # ---------- Payment Alerts ----------
 st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:600;position:relative:top:-40px;'>Payment Alerts</div>", unsafe_allow_html=True)
 today = pd.to_datetime("today")
-pending = purchases[(purchases['payment_status'].str.lower() == "pending") & (purchases['payment_due'] >= today)]
-overdue = purchases[(purchases['payment_status'].str.lower() == "pending") & (purchases['payment_due'] < today)]
+unpaid = load_table("Purchases", user_id, ["vendor_name", "product_id", "payment_due"], filters=[("payment_status", "=", "pending")])
+pending = unpaid[unpaid['payment_due'] >= today]
+overdue = unpaid[unpaid['payment_due'] < today]
 
 col1, col2 = st.columns(2)
 
@@ -316,7 +309,7 @@ st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A
 col1, col2 = st.columns(2)
 
 with col1:
-    vendor_summary = purchases.groupby('vendor_name')['quantity_purchased'].sum().reset_index()
+    vendor_summary = vendor_share(user_id)
     fig_donut = px.pie(
         vendor_summary,
         names='vendor_name',
@@ -335,7 +328,7 @@ with col1:
 
 # Top Products Chart
 with col2:
-    product_summary = purchases.groupby('product_id')['quantity_purchased'].sum().reset_index().sort_values(by='quantity_purchased', ascending=False)
+    product_summary = product_purchases(user_id)
     fig_product = px.bar(
         product_summary,
         x='product_id',
@@ -352,10 +345,10 @@ with col2:
     st.plotly_chart(fig_product, use_container_width=True)
 
 # Monthly Trend
-monthly_summary = purchases.groupby(purchases['order_date'].dt.to_period('M').astype(str))['quantity_purchased'].sum().reset_index()
+monthly_summary = monthly_purchases(user_id)
 fig_monthly = px.area(
     monthly_summary,
-    x='order_date',
+    x='month',
     y='quantity_purchased',
     title="Monthly Purchase Volume",
     color_discrete_sequence=['#1D4ED8']
@@ -1,13 +1,21 @@
 import streamlit as st  
-import pandas as pd
 import plotly.express as px
-from db import get_connection
+from db import update_rows, delete_rows
+from inventory import load_inventory
+from loaders import load_concurrently, stop_on_errors
+from grid import paged_grid
+from replenishment import reorder_plan, service_level, lead_time_days
+import metrics
+import fifo
+import instrumentation
+import perf_panel
 from auth import check_login
 
 # -------------------------
 # Authentication Check
 # -------------------------
 check_login()
+instrumentation.page("Inventory")
 user_id = st.session_state.user_id
 
 st.set_page_config(page_title="Inventory", layout="wide")
@@ -127,47 +135,21 @@ st.markdown(
 # -------------------------
 # Load data
 # -------------------------
-conn = get_connection()
-
-try:
-    purchases = pd.read_sql("SELECT product_id, quantity_purchased, cost_price, order_date FROM Purchases", conn)
-    sales = pd.read_sql("SELECT product_id, quantity_sold, selling_price, sale_date FROM Sales", conn)
-    products = pd.read_sql("SELECT Name, category, product_id, cost_price, selling_price FROM Products", conn)
-except Exception as e:
-    st.error(f"❌ Error loading data: {e}")
-    st.stop()
-
-# -------------------------
-# Preprocessing
-# -------------------------
-purchases['product_id'] = purchases['product_id'].astype(str).str.strip().str.upper()
-sales['product_id'] = sales['product_id'].astype(str).str.strip().str.upper()
-products['product_id'] = products['product_id'].astype(str).str.strip().str.upper()
-
-# Aggregate data
-purchase_agg = purchases.groupby('product_id').agg({'quantity_purchased': 'sum'}).reset_index()
-sales_agg = sales.groupby('product_id').agg({'quantity_sold': 'sum'}).reset_index()
-
-# Merge all data
-inventory_df = products.merge(purchase_agg, on='product_id', how='left')
-inventory_df = inventory_df.merge(sales_agg, on='product_id', how='left')
-
-# Fill NaNs
-inventory_df['quantity_purchased'] = inventory_df['quantity_purchased'].fillna(0)
-inventory_df['quantity_sold'] = inventory_df['quantity_sold'].fillna(0)
-
-# Live stock = quantity_purchased - quantity_sold
-inventory_df['live_stock'] = inventory_df['quantity_purchased'] - inventory_df['quantity_sold']
-inventory_df['stock_value'] = inventory_df['live_stock'] * inventory_df['cost_price']
-inventory_df['potential_revenue'] = inventory_df['live_stock'] * inventory_df['selling_price']
-inventory_df['profit_margin'] = inventory_df['selling_price'] - inventory_df['cost_price']
-inventory_df['total_profit'] = inventory_df['profit_margin'] * inventory_df['live_stock']
+instrumentation.mark("Load data")
+data, errors = load_concurrently({
+    "inventory": lambda: load_inventory(user_id),
+    "FIFO layers": lambda: fifo.refresh(user_id),
+})
+stop_on_errors(errors)
+inventory_df = data["inventory"]
 
+products = inventory_df[['Name', 'category', 'product_id', 'cost_price', 'selling_price']]
 inventory_df.rename(columns={'Name': 'name', 'category': 'Category'}, inplace=True)
 
 # -------------------------
 # Sidebar Filters
 # -------------------------
+instrumentation.mark("Filters")
 st.sidebar.header("Filter Inventory")
 categories = inventory_df['Category'].dropna().unique()
 selected_category = st.sidebar.multiselect("Category", categories, default=list(categories))
@@ -180,6 +162,7 @@ if search_term:
 # -------------------------
 # Key Metrics (Light Card Format, Even Row, 4 KPIs)
 # -------------------------
+instrumentation.mark("Key metrics")
 st.markdown("<div style='max-width:900px;margin:0 auto 2.5rem auto;'>", unsafe_allow_html=True)
 st.markdown("<div class='kpi-section-title'style='text-align:left;position:relative;margin-bottom:4.5rem;'>Key Metrics</div>", unsafe_allow_html=True)
 k1, k2, k3, k4 = st.columns(4)
@@ -215,21 +198,27 @@ st.markdown("</div>", unsafe_allow_html=True)
 # -------------------------
 # Product Table
 # -------------------------
+instrumentation.mark("Product table")
 st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Product List (Live Stock)</div>", unsafe_allow_html=True)
-st.dataframe(filtered[['product_id', 'name', 'Category', 'cost_price', 'selling_price', 'live_stock', 'stock_value']], use_container_width=True)
+instrumentation.render(st.dataframe, filtered[['product_id', 'name', 'Category', 'cost_price', 'selling_price', 'live_stock', 'stock_value']], use_container_width=True)
 
 # -------------------------
 # Raw Data Table with Edit/Delete (Products)
 # -------------------------
+instrumentation.mark("Raw data")
 show_raw_products = st.checkbox("Show Raw Product Data (Edit/Delete)")
 if show_raw_products:
     st.markdown("<h4 style='margin-top:2.5rem;'>Products Table (Raw Data)</h4>", unsafe_allow_html=True)
-    st.dataframe(products, use_container_width=True)
+    product_page = paged_grid(
+        "products", "Products", user_id,
+        ["product_id", "Name", "category", "cost_price", "selling_price"], "product_id",
+        sort_columns=["product_id", "Name", "category"], search_columns=["Name", "category"],
+    )
     st.markdown("<b>Edit or Delete a Product Record:</b>", unsafe_allow_html=True)
-    selected_pid = st.selectbox("Select Product ID to Edit/Delete", products['product_id'] if 'product_id' in products.columns else products.index)
+    selected_pid = st.selectbox("Select Product ID to Edit/Delete", product_page['product_id'].tolist())
     action = st.radio("Action", ["Edit", "Delete"], key="product_action")
-    if action == "Edit":
-        row = products[products['product_id'] == selected_pid].iloc[0] if 'product_id' in products.columns else products.loc[[selected_pid]].iloc[0]
+    if action == "Edit" and selected_pid is not None:
+        row = product_page[product_page['product_id'] == selected_pid].iloc[0]
         with st.form("edit_product_form"):
             st.write("Edit the fields and click Save:")
             name = st.text_input("Product Name", value=row['Name'])
@@ -238,24 +227,15 @@ if show_raw_products:
             selling_price = st.number_input("Selling Price", min_value=0.0, value=float(row['selling_price']))
             submit = st.form_submit_button("Save Changes")
             if submit:
-                conn = get_connection()
-                cursor = conn.cursor()
-                cursor.execute("""
-                    UPDATE Products SET Name=%s, category=%s, cost_price=%s, selling_price=%s WHERE product_id=%s
-                """, (name, category, cost_price, selling_price, selected_pid))
-                conn.commit()
-                cursor.close()
-                conn.close()
+                update_rows("Products", user_id, {"product_id": selected_pid}, {
+                    "Name": name, "category": category,
+                    "cost_price": cost_price, "selling_price": selling_price,
+                })
                 st.success("Product record updated!")
                 st.rerun()
-    elif action == "Delete":
+    elif action == "Delete" and selected_pid is not None:
         if st.button("Delete This Product", key="delete_product_btn", help="Delete this product", use_container_width=True):
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM Products WHERE product_id=%s", (selected_pid,))
-            conn.commit()
-            cursor.close()
-            conn.close()
+            delete_rows("Products", user_id, {"product_id": selected_pid})
             st.success("Product record deleted!")
             st.rerun()
 
@@ -263,40 +243,45 @@ st.markdown("<hr class='divider'>", unsafe_allow_html=True)
 # -------------------------
 # Slow Moving Products (last 30 days)
 # -------------------------
-if 'sale_date' in sales.columns:
-    sales['sale_date'] = pd.to_datetime(sales['sale_date'], errors='coerce')
-    last_30 = sales[sales['sale_date'] >= pd.Timestamp.now() - pd.Timedelta(days=30)]
-    slow_sales = last_30.groupby('product_id')['quantity_sold'].sum().reset_index()
-    slow_sales = products.merge(slow_sales, on='product_id', how='left')
-    slow_sales['quantity_sold'] = slow_sales['quantity_sold'].fillna(0)
-    slowest = slow_sales.sort_values(by='quantity_sold').head(10)
-    st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Slow Moving Products (Last 30 Days)</div>", unsafe_allow_html=True)
-    st.dataframe(slowest[["product_id", "Name", "category", "quantity_sold"]], use_container_width=True)
+instrumentation.mark("Slow movers")
+slow_sales = products.assign(quantity_sold=inventory_df['sold_last_30'])
+slowest = slow_sales.sort_values(by='quantity_sold').head(10)
+st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Slow Moving Products (Last 30 Days)</div>", unsafe_allow_html=True)
+instrumentation.render(st.dataframe, slowest[["product_id", "Name", "category", "quantity_sold"]], use_container_width=True)
 
 # -------------------------
 # Download Inventory Report
 # -------------------------
+instrumentation.mark("Download")
 import io
 csv = filtered.to_csv(index=False).encode('utf-8')
 st.download_button('Download Inventory Report (CSV)', csv, 'inventory_report.csv', 'text/csv')
 st.markdown('</div>', unsafe_allow_html=True)
 st.markdown("<hr class='divider'>", unsafe_allow_html=True)
 # -------------------------
-# Inventory Age Analysis (if purchase date available)
+# Inventory Age Analysis (units still held per FIFO layer age)
 # -------------------------
-if 'order_date' in purchases.columns:
-    purchases['order_date'] = pd.to_datetime(purchases['order_date'], errors='coerce')
-    product_first_purchase = purchases.groupby('product_id')['order_date'].min().reset_index()
-    inventory_age = products.merge(product_first_purchase, on='product_id', how='left')
-    inventory_age['days_in_stock'] = (pd.Timestamp.now() - inventory_age['order_date']).dt.days
-    st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Inventory Age Analysis</div>", unsafe_allow_html=True)
-    st.dataframe(inventory_age[["product_id", "Name", "category", "days_in_stock"]], use_container_width=True)
+instrumentation.mark("Inventory age")
+inventory_age = products[["product_id", "Name", "category"]].merge(fifo.ageing(user_id), on="product_id")
+inventory_age = inventory_age.merge(fifo.valuation(user_id)[["product_id", "value"]], on="product_id", how="left")
+st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Inventory Age Analysis</div>", unsafe_allow_html=True)
+instrumentation.render(st.dataframe,
+    inventory_age[["product_id", "Name", "category", *fifo.AGE_LABELS, "oldest_days", "value"]].rename(
+        columns={"oldest_days": "Oldest (days)", "value": "FIFO Value (₹)"}),
+    use_container_width=True,
+)
 
 st.markdown("<hr class='divider'>", unsafe_allow_html=True)
 # -------------------------
 # Low Stock Alerts with Reorder Action
 # -------------------------
-low_stock = filtered[filtered['live_stock'] < 10]
+instrumentation.mark("Low stock")
+level = st.slider("Service level", 0.80, 0.99, min(max(service_level(), 0.80), 0.99), 0.01, help="Chance of not running out before a reorder arrives")
+st.caption(
+    f"Reorder points assume a {lead_time_days():g}-day supplier lead time for every product (set lead_time_days in secrets); "
+    "purchases record no receipt dates, so the usual gap between a product's orders only sizes the reorder quantity."
+)
+low_stock = metrics.low_stock(filtered, reorder_plan(user_id, level))
 if not low_stock.empty:
     st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Low Stock Alerts</div>", unsafe_allow_html=True)
     st.markdown(f"""
@@ -305,7 +290,7 @@ if not low_stock.empty:
         </div>
     """, unsafe_allow_html=True)
     low_stock['Action'] = 'Reorder Now'
-    st.dataframe(low_stock[["product_id", "name", "Category", "live_stock", "Action"]], use_container_width=True)
+    instrumentation.render(st.dataframe, low_stock[["product_id", "name", "Category", "live_stock", "safety_stock", "reorder_point", "reorder_qty", "Action"]], use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
 else:
     st.success('✅ All filtered products are well stocked.')
@@ -313,6 +298,7 @@ else:
 # -------------------------
 # Visualizations
 # -------------------------
+instrumentation.mark("Charts")
 st.markdown("---")
 col1, col2 = st.columns(2)
 
@@ -322,7 +308,7 @@ with col1:
                  title="Inventory Value by Category", hole=0.45,
                  color_discrete_sequence=px.colors.sequential.RdBu)
     fig1.update_layout(showlegend=True, plot_bgcolor="#FFFFFF", paper_bgcolor="#FFFFFF")
-    st.plotly_chart(fig1, use_container_width=True)
+    instrumentation.render(st.plotly_chart, fig1, use_container_width=True)
 
 with col2:
     top_profit = filtered.sort_values(by='total_profit', ascending=False).head(10)
@@ -330,11 +316,12 @@ with col2:
                  title="Top Products by Profit Potential",
                  color_continuous_scale='viridis')
     fig2.update_layout(xaxis_title="Product", yaxis_title="Profit", showlegend=False)
-    st.plotly_chart(fig2, use_container_width=True)
+    instrumentation.render(st.plotly_chart, fig2, use_container_width=True)
 
 # -------------------------
 # Top Products by Stock
 # -------------------------
+instrumentation.mark("Top stock")
 st.markdown("---")
 st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Top N Products by Stock</div>", unsafe_allow_html=True)
 top_stock = st.slider("", 5, 20, 10)
@@ -346,4 +333,6 @@ stock_bar = px.bar(
     color_continuous_scale='sunsetdark'
 )
 stock_bar.update_layout(xaxis_title="Product", yaxis_title="Live Stock", showlegend=False)
-st.plotly_chart(stock_bar, use_container_width=True)
+instrumentation.render(st.plotly_chart, stock_bar, use_container_width=True)
+
+perf_panel.show({"inventory": inventory_df, "filtered": filtered, "inventory age": inventory_age})
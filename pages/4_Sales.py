@@ -1,13 +1,21 @@
 import streamlit as st 
 import pandas as pd
 import plotly.express as px
-from db import get_connection
+from db import update_rows, delete_rows
+from grid import paged_grid
+from loaders import TABLE_SCHEMAS, load_table, load_window, date_bounds, default_window, choice_filter, load_concurrently, stop_on_errors
+from reports import product_costs, monthly_sales
+from forecast import ensure_forecasts, load_forecast, catalog_forecast, last_run
+import prophet_backend
+import instrumentation
+import perf_panel
 from auth import check_login
 
 # -------------------------
 # Authentication Check
 # -------------------------
 check_login()
+instrumentation.page("Sales")
 user_id = st.session_state.user_id
 
 st.set_page_config(page_title="📈 Sales", layout="wide")
@@ -164,33 +172,20 @@ st.markdown(
     "</div>",
     unsafe_allow_html=True
 )
-conn = get_connection()
-
-try:
-    sales = pd.read_sql("SELECT * FROM Sales", conn)
-    products = pd.read_sql("SELECT product_id, Name, category FROM Products", conn)
-    purchases = pd.read_sql("SELECT product_id, cost_price FROM Purchases", conn)
-except Exception as e:
-    st.error(f"❌ Error loading data: {e}")
-    st.stop()
-
-# ----------------------
-# Preprocessing
-# ----------------------
-sales['product_id'] = sales['product_id'].astype(str).str.strip().str.upper()
-products['product_id'] = products['product_id'].astype(str).str.strip().str.upper()
-purchases['product_id'] = purchases['product_id'].astype(str).str.strip().str.upper()
-
-sales = sales.merge(products, on='product_id', how='left')
-sales = sales.merge(purchases.groupby('product_id').mean().reset_index(), on='product_id', how='left')
-
-sales['sales_date'] = pd.to_datetime(sales['sale_date'], errors='coerce')
-sales['revenue'] = sales['quantity_sold'] * sales['selling_price']
-sales['profit'] = sales['quantity_sold'] * (sales['selling_price'] - sales['cost_price'])
+instrumentation.mark("Load data")
+data, errors = load_concurrently({
+    "Products": lambda: load_table("Products", user_id, ["product_id", "Name", "category"]),
+    "product costs": lambda: product_costs(user_id),
+    "sales dates": lambda: date_bounds("Sales", user_id, "sale_date"),
+})
+stop_on_errors(errors)
+products, costs = data["Products"], data["product costs"]
+first_sale, last_sale = data["sales dates"]
 
 # ----------------------
 # Sidebar Filters
 # ----------------------
+instrumentation.mark("Filters")
 st.markdown("""
     <style>
     /* Force black text for selectbox and multiselect in sidebar */
@@ -220,26 +215,47 @@ st.markdown("""
 
 
 st.sidebar.header("🔍 Filter Sales")
-product_filter = st.sidebar.multiselect("Product", sales['Name'].dropna().unique(), default=sales['Name'].dropna().unique())
-shipped_filter = st.sidebar.selectbox("Shipped Status", ["All"] + sorted(sales['shipped'].dropna().unique().tolist()))
-payment_filter = st.sidebar.selectbox("Payment Status", ["All"] + sorted(sales['payment_received'].dropna().unique().tolist()))
-start_date = st.sidebar.date_input("Start Date", sales['sales_date'].min())
-end_date = st.sidebar.date_input("End Date", sales['sales_date'].max())
-
-filtered_sales = sales[
-    (sales['Name'].isin(product_filter)) &
-    (sales['sales_date'] >= pd.to_datetime(start_date)) &
-    (sales['sales_date'] <= pd.to_datetime(end_date))
-]
+product_names = products['Name'].dropna().unique()
+product_filter = st.sidebar.multiselect("Product", product_names, default=product_names)
+shipped_filter = st.sidebar.selectbox("Shipped Status", ["All", 0, 1])
+payment_filter = st.sidebar.selectbox("Payment Status", ["All", 0, 1])
+default_start, default_end = default_window(first_sale, last_sale)
+start_date = st.sidebar.date_input("Start Date", default_start)
+end_date = st.sidebar.date_input("End Date", default_end)
 
+# The filters become the WHERE clause; only the selected window is fetched
+filters = choice_filter(
+    "product_id",
+    products.loc[products['Name'].isin(product_filter), 'product_id'].tolist(),
+    products['product_id'].tolist(),
+)
 if shipped_filter != "All":
-    filtered_sales = filtered_sales[filtered_sales['shipped'] == shipped_filter]
+    filters.append(("shipped", "=", shipped_filter))
 if payment_filter != "All":
-    filtered_sales = filtered_sales[filtered_sales['payment_received'] == payment_filter]
+    filters.append(("payment_received", "=", payment_filter))
+
+try:
+    sales = load_window("Sales", user_id, "sale_date", start_date, end_date, filters=filters)
+except Exception as e:
+    st.error(f"❌ Error loading data: {e}")
+    st.stop()
+
+# ----------------------
+# Preprocessing
+# ----------------------
+instrumentation.mark("Preprocessing")
+sales = sales.merge(products, on='product_id', how='left')
+sales = sales.merge(costs, on='product_id', how='left')
+
+sales['sales_date'] = sales['sale_date']
+sales['revenue'] = sales['quantity_sold'] * sales['selling_price']
+sales['profit'] = sales['quantity_sold'] * (sales['selling_price'] - sales['cost_price'])
+filtered_sales = sales
 
 # ----------------------
 # KPIs (Light Card Format, Even Row, 4 KPIs, Match Inventory Style)
 # ----------------------
+instrumentation.mark("KPIs")
 avg_order_value = filtered_sales['revenue'].sum() / len(filtered_sales) if len(filtered_sales) > 0 else 0
 st.markdown("<div style='max-width:900px;margin:0 auto 2.5rem auto;'>", unsafe_allow_html=True)
 st.markdown("<div class='kpi-section-title'style='text-align:left;position:relative;margin-bottom:4.5rem;top:-30px;'>Key Metrics</div>", unsafe_allow_html=True)
@@ -277,6 +293,7 @@ st.markdown("</div>", unsafe_allow_html=True)
 # ----------------------
 # Quick Insights Row
 # ----------------------
+instrumentation.mark("Quick insights")
 best_seller = filtered_sales.groupby('Name')['quantity_sold'].sum().idxmax() if not filtered_sales.empty else None
 most_profitable = filtered_sales.groupby('Name')['profit'].sum().idxmax() if not filtered_sales.empty else None
 recent_sale = filtered_sales.sort_values('sales_date', ascending=False).iloc[0] if not filtered_sales.empty else None
@@ -293,6 +310,7 @@ st.markdown("</div>", unsafe_allow_html=True)
 # ----------------------
 # Download Sales Report
 # ----------------------
+instrumentation.mark("Download")
 import io
 csv = filtered_sales.to_csv(index=False).encode('utf-8')
 st.download_button('Download Sales Report (CSV)', csv, 'sales_report.csv', 'text/csv')
@@ -300,18 +318,25 @@ st.download_button('Download Sales Report (CSV)', csv, 'sales_report.csv', 'text
 # ----------------------
 # Raw Data Table with Edit/Delete (Sales)
 # ----------------------
+instrumentation.mark("Transactions")
 show_raw_sales = st.checkbox("Show Raw Sales Data (Edit/Delete)")
 if show_raw_sales:
     st.markdown("<h4 style='margin-top:2.5rem;'>Sales Table (Raw Data)</h4>", unsafe_allow_html=True)
-    st.dataframe(sales, use_container_width=True)
+    st.caption("Search matches product names, or a sale or product ID. Use the sidebar dates to narrow the days shown.")
+    sales_page = paged_grid(
+        "sales", "Sales", user_id, list(TABLE_SCHEMAS["Sales"]), "sale_id",
+        sort_columns=["sale_id", "sale_date", "quantity_sold", "selling_price"],
+        search_lookups=[("product_id", "Products", "Name")], key_columns=["sale_id", "product_id"],
+        filters=filters + [("sale_date", ">=", start_date), ("sale_date", "<=", end_date)],
+    )
     st.markdown("<b>Edit or Delete a Sales Record:</b>", unsafe_allow_html=True)
-    selected_sid = st.selectbox("Select Sale ID to Edit/Delete", sales['sale_id'] if 'sale_id' in sales.columns else sales.index)
+    selected_sid = st.selectbox("Select Sale ID to Edit/Delete", sales_page['sale_id'].tolist())
     action = st.radio("Action", ["Edit", "Delete"], key="sales_action")
-    if action == "Edit":
-        row = sales[sales['sale_id'] == selected_sid].iloc[0] if 'sale_id' in sales.columns else sales.loc[[selected_sid]].iloc[0]
+    if action == "Edit" and selected_sid is not None:
+        row = sales_page[sales_page['sale_id'] == selected_sid].iloc[0]
         with st.form("edit_sales_form"):
             st.write("Edit the fields and click Save:")
-            product_id = st.text_input("Product ID", value=row['product_id'])
+            product_id = st.number_input("Product ID", min_value=1, value=int(row['product_id']))
             quantity_sold = st.number_input("Quantity Sold", min_value=1, value=int(row['quantity_sold']))
             selling_price = st.number_input("Selling Price", min_value=0.0, value=float(row['selling_price']))
             sale_date = st.date_input("Sale Date", value=row['sale_date'])
@@ -319,24 +344,16 @@ if show_raw_sales:
             payment_received = st.selectbox("Payment Received",["Yes", "No"],index=0 if row['payment_received'] == 1 else 1) 
             submit = st.form_submit_button("Save Changes")
             if submit:
-                conn = get_connection()
-                cursor = conn.cursor()
-                cursor.execute("""
-                    UPDATE Sales SET product_id=%s, quantity_sold=%s, selling_price=%s, sale_date=%s, shipped=%s, payment_received=%s WHERE sale_id=%s
-                """, (product_id, quantity_sold, selling_price, sale_date, shipped_value, payment_received, selected_sid))
-                conn.commit()
-                cursor.close()
-                conn.close()
+                update_rows("Sales", user_id, {"sale_id": selected_sid}, {
+                    "product_id": product_id, "quantity_sold": quantity_sold, "selling_price": selling_price,
+                    "sale_date": sale_date, "shipped": 1 if shipped_value == "Yes" else 0,
+                    "payment_received": 1 if payment_received == "Yes" else 0,
+                })
                 st.success("Sales record updated!")
                 st.rerun()
-    elif action == "Delete":
+    elif action == "Delete" and selected_sid is not None:
         if st.button("Delete This Sale", key="delete_sale_btn", help="Delete this sale", use_container_width=True):
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM Sales WHERE sale_id=%s", (selected_sid,))
-            conn.commit()
-            cursor.close()
-            conn.close()
+            delete_rows("Sales", user_id, {"sale_id": selected_sid})
             st.success("Sales record deleted!")
             st.rerun()
 else:
@@ -347,7 +364,7 @@ else:
     if filtered_sales.empty:
         st.warning("⚠️ No matching sales records found with current filters.")
     else:
-        st.dataframe(
+        instrumentation.render(st.dataframe,
             filtered_sales[['sale_id', 'sales_date', 'Name', 'quantity_sold', 'revenue', 'profit', 'shipped', 'payment_received']],
             use_container_width=True
         )
@@ -355,6 +372,7 @@ else:
 # ----------------------
 # Sales by Product (Donut/Pie Chart + Ranked Table)
 # ----------------------
+instrumentation.mark("Sales by product")
 st.markdown("---")
 st.markdown("<div class='section-card'>", unsafe_allow_html=True)
 st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Product Sales Share</div>", unsafe_allow_html=True)
@@ -369,11 +387,11 @@ if not trend_df.empty:
         "#C7CEEA", "#FFFACD", "#FFD6E0", "#D4A5A5", "#B5B2C2"], title="")
     fig_pie.update_traces(textinfo='percent+label')
     fig_pie.update_layout(showlegend=True, template='plotly_white')
-    st.plotly_chart(fig_pie, use_container_width=True)
+    instrumentation.render(st.plotly_chart, fig_pie, use_container_width=True)
     # Ranked table with color-coded sales
     styled_table = pie_df.style
     st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Ranked Product Sales</div>", unsafe_allow_html=True)
-    st.dataframe(styled_table, use_container_width=True)
+    instrumentation.render(st.dataframe, styled_table, use_container_width=True)
 else:
     st.info("No data for selected products.")
 st.markdown("</div>", unsafe_allow_html=True)
@@ -381,19 +399,21 @@ st.markdown("</div>", unsafe_allow_html=True)
 # ----------------------
 # Profitability by Category
 # ----------------------
+instrumentation.mark("Category profit")
 st.markdown("---")
 st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Profitability by Category</div>", unsafe_allow_html=True)
 if 'category' in filtered_sales.columns:
-    cat_profit = filtered_sales.groupby('category')['profit'].sum().reset_index()
+    cat_profit = filtered_sales.groupby('category', observed=True)['profit'].sum().reset_index()
     fig_cat = px.bar(cat_profit, x='category', y='profit', color='profit', color_continuous_scale='peach', title="Profit by Category")
     fig_cat.update_layout(xaxis_title="Category", yaxis_title="Profit", template='plotly_white')
-    st.plotly_chart(fig_cat, use_container_width=True)
+    instrumentation.render(st.plotly_chart, fig_cat, use_container_width=True)
 else:
     st.info("No category data available.")
 
 # ----------------------
 # Top Selling Products
 # ----------------------
+instrumentation.mark("Top products")
 st.markdown("---")
 st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Top-Selling Products</div>", unsafe_allow_html=True)
 top_n = st.slider("Top N Products", 5, 20, 10)
@@ -403,51 +423,74 @@ top_products = top_products.sort_values(by='quantity_sold', ascending=False).hea
 col1, col2 = st.columns(2)
 with col1:
     fig1 = px.bar(top_products, x='Name', y='quantity_sold', title=f"Top {top_n} by Quantity", color='quantity_sold', color_continuous_scale='Tealgrn')
-    st.plotly_chart(fig1, use_container_width=True)
+    instrumentation.render(st.plotly_chart, fig1, use_container_width=True)
 
 with col2:
     fig2 = px.bar(top_products, x='Name', y='revenue', title=f"Top {top_n} by Revenue", color='revenue', color_continuous_scale='Emrld')
-    st.plotly_chart(fig2, use_container_width=True)
+    instrumentation.render(st.plotly_chart, fig2, use_container_width=True)
 
 # ----------------------
 # Monthly Trends
 # ----------------------
+instrumentation.mark("Monthly trends")
 st.markdown("---")
 st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Monthly Trends</div>", unsafe_allow_html=True)
-sales['month'] = sales['sales_date'].dt.to_period('M').astype(str)
-monthly = sales.groupby('month')[['quantity_sold', 'revenue', 'profit']].sum().reset_index()
+monthly = monthly_sales(user_id)
 fig_combined = px.line(monthly, x='month', y=['quantity_sold', 'revenue', 'profit'], markers=True, title="Monthly Sales Trends")
 fig_combined.update_layout(yaxis_title="Values", xaxis_title="Month", template='plotly_white')
-st.plotly_chart(fig_combined, use_container_width=True)
+instrumentation.render(st.plotly_chart, fig_combined, use_container_width=True)
 
 # ----------------------
 # Forecast Section
 # ----------------------
+instrumentation.mark("Forecast")
 st.markdown("---")
 st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Forecasted Sales</div>", unsafe_allow_html=True)
 
-available_products = sales['Name'].dropna().unique()
-selected_product = st.selectbox("Select Product", sorted(available_products))
-forecast_sales = sales[sales['Name'] == selected_product].copy()
-forecast_sales['month'] = forecast_sales['sales_date'].dt.to_period('M').astype(str)
-forecast_grouped = forecast_sales.groupby('month')['quantity_sold'].sum().reset_index()
-forecast_grouped['month'] = pd.to_datetime(forecast_grouped['month'], errors='coerce')
-forecast_grouped = forecast_grouped.sort_values('month')
-forecast_grouped['forecast'] = forecast_grouped['quantity_sold'].rolling(3, min_periods=1).mean()
+# Every product is fitted in one batch and stored per method; selecting a
+# product only reads its stored rows. The batch reruns when sales have
+# changed. Refits run in the background (smoothing on a thread, Prophet in
+# a process pool); until they finish the last stored forecast is shown,
+# marked as stale, and Prophet falls back to exponential smoothing if it has
+# none yet.
+forecast_models = ["Exponential smoothing"] + (["Prophet"] if prophet_backend.available() else [])
+forecast_model = st.radio("Forecast model", forecast_models, horizontal=True) if len(forecast_models) > 1 else forecast_models[0]
+forecast_method = "smoothing"
+if forecast_model == "Prophet":
+    running = prophet_backend.ensure_prophet_forecasts(user_id) is not None
+    run = last_run(user_id, "prophet")
+    failure = prophet_backend.current_failure(user_id)
+    if run is not None and failure is None:
+        forecast_method = "prophet"
+    if failure is not None:
+        st.warning(f"⚠️ Prophet could not fit the current sales history ({failure['error']}); showing exponential smoothing. It is retried when sales change.")
+    if running:
+        shown = f"showing the Prophet forecast from {run['created_at']:%d %b %Y %H:%M}" if run else "showing exponential smoothing until it finishes"
+        st.info(f"⏳ Prophet models are refitting in the background; {shown}.")
+        if st.button("Check for updated forecast"):
+            st.rerun()
+if forecast_method == "smoothing" and ensure_forecasts(user_id) is not None:
+    run = last_run(user_id)
+    shown = f"showing the forecast from {run['created_at']:%d %b %Y %H:%M}, which predates the latest sales" if run else "it will appear here when it finishes"
+    st.info(f"⏳ The forecast is refitting in the background; {shown}.")
+    if st.button("Check for updated forecast", key="check_smoothing_forecast"):
+        st.rerun()
+selected_product = st.selectbox("Select Product", sorted(product_names))
+if selected_product is not None:
+    selected_product_id = products.loc[products['Name'] == selected_product, 'product_id'].iloc[0]
+    combined_forecast = load_forecast(user_id, selected_product_id, forecast_method)
+else:
+    combined_forecast = pd.DataFrame({'month': pd.to_datetime([]), 'quantity_sold': [], 'forecast': []})
+forecast_grouped = combined_forecast.dropna(subset=['quantity_sold'])
 
 if not forecast_grouped.empty:
-    last_month = forecast_grouped['month'].max()
-    forecast_months = pd.date_range(start=last_month + pd.offsets.MonthBegin(), periods=3, freq='MS')
-    future_forecast = pd.DataFrame({
-        'month': forecast_months,
-        'quantity_sold': [None]*3,
-        'forecast': [forecast_grouped['forecast'].iloc[-1]]*3
-    })
-    combined_forecast = pd.concat([forecast_grouped, future_forecast], ignore_index=True)
-
     fig = px.line(combined_forecast, x='month', y='forecast', title=f"Forecast: {selected_product}", labels={'forecast': 'Forecasted Quantity'}, markers=True)
     fig.add_scatter(x=forecast_grouped['month'], y=forecast_grouped['quantity_sold'], mode='lines+markers', name='Actual Quantity', line=dict(color='orange'))
     fig.update_layout(template='plotly_white')
-    st.plotly_chart(fig, use_container_width=True)
+    instrumentation.render(st.plotly_chart, fig, use_container_width=True)
+    catalog_csv = catalog_forecast(user_id, forecast_method).to_csv(index=False).encode('utf-8')
+    st.download_button('Download Catalog Forecast (CSV)', catalog_csv, 'sales_forecast.csv', 'text/csv')
 else:
     st.warning("⚠️ No data available to forecast for this product.")
+
+perf_panel.show({"products": products, "product costs": costs, "sales": filtered_sales, "monthly": monthly})
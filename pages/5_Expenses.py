@@ -1,6 +1,11 @@
 import streamlit as st
 import pandas as pd
-from db import get_connection
+from db import insert_row, update_rows, delete_rows
+from loaders import load_table
+from grid import paged_grid
+import instrumentation
+from reports import monthly_expenses, category_expenses
+from ingest import missing_columns, stream_upload
 from datetime import date
 import plotly.express as px
 from auth import check_login
@@ -18,6 +23,7 @@ st.set_page_config(
 # Authentication Check
 # -------------------------
 check_login()
+instrumentation.page("Expenses")
 user_id = st.session_state.user_id
 
 # --- Custom Styling ---
@@ -89,10 +95,6 @@ st.markdown("""
 # --- Title ---
 st.markdown("<h1>Expense Management</h1>", unsafe_allow_html=True)
 
-# --- DB Connection ---
-conn = get_connection()
-cursor = conn.cursor()
-
 # --- Add Expenses Section (Expander) ---
 st.markdown("<div class='section-card'>", unsafe_allow_html=True)
 with st.expander("➕ Add Expense", expanded=False):
@@ -108,15 +110,11 @@ with st.expander("➕ Add Expense", expanded=False):
         description = st.text_input("Optional Description")
         submit = st.form_submit_button("Add Expense")
         if submit:
-            try:
-                cursor.execute("""
-                    INSERT INTO Expenses (user_id, expense_date, category,TYPE, amount, description)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, (user_id, expense_date, category, expense_type, amount, description))
-                conn.commit()
+            if insert_row("Expenses", user_id, {
+                "expense_date": expense_date, "category": category, "TYPE": expense_type,
+                "amount": amount, "description": description,
+            }):
                 st.success("Expense added successfully.")
-            except Exception as e:
-                st.error(f"Error: {e}")
 st.markdown("</div>", unsafe_allow_html=True)
 
 # --- Upload from CSV (Expander) ---
@@ -129,19 +127,19 @@ with st.expander("📤 Upload Expenses from CSV", expanded=False):
         "amount": [5000],
         "description": ["Social Media Campaign"]
     })
-    st.markdown("Sample Format:")
+    st.markdown("Sample Format (every row needs a date):")
     st.dataframe(sample_csv, use_container_width=True)
 uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"])
 if uploaded_file:
     try:
-        df_upload = pd.read_csv(uploaded_file)
-        df_upload["date"] = pd.to_datetime(df_upload["date"]).dt.date
-        for _, row in df_upload.iterrows():
-            cursor.execute("""
-                INSERT INTO Expenses (user_id, expense_date, category, TYPE, amount, description)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                """, (user_id, row["date"], row["category"], row["expense_type"], row["amount"], row["description"]))
-        conn.commit()
+        missing_cols = missing_columns(uploaded_file, "Expenses")
+        if missing_cols:
+            raise ValueError(f"Missing columns: {', '.join(missing_cols)}")
+        progress = st.progress(0.0, text="Uploading expenses...")
+        def report(fraction, done):
+            progress.progress(fraction, text=f"Inserted {done:,} rows")
+        stream_upload(uploaded_file, "Expenses", user_id, on_progress=report)
+        progress.empty()
         st.success("Expenses uploaded successfully.")
     except Exception as e:
         st.error(f"Error uploading file: {e}")
@@ -149,25 +147,23 @@ st.markdown("</div>", unsafe_allow_html=True)
 
 # --- Expense Data & Insights ---
 try:
-    df = pd.read_sql(f"""
-        SELECT expense_date, category, TYPE, amount, description
-        FROM Expenses
-        WHERE user_id = {user_id}
-        ORDER BY expense_date DESC
-    """, conn)
-    df["expense_date"] = pd.to_datetime(df["expense_date"]).dt.date
+    df = load_table("Expenses", user_id, order_by="expense_date DESC")
 
     # --- Raw Data Table with Edit/Delete (toggle) ---
     show_raw = st.checkbox("Show Raw Data Table (Edit/Delete)")
     if show_raw:
         st.markdown("<h4 style='margin-top:2.5rem;'>Expense Records (Raw Data)</h4>", unsafe_allow_html=True)
-        raw_df = df.copy()
-        st.dataframe(raw_df, use_container_width=True)
+        raw_df = paged_grid(
+            "expenses", "Expenses", user_id,
+            ["expense_id", "expense_date", "category", "TYPE", "amount", "description"], "expense_id",
+            sort_columns=["expense_date", "expense_id", "amount"],
+            search_columns=["category", "TYPE", "description"],
+        )
         st.markdown("<b>Edit or Delete an Expense Record:</b>", unsafe_allow_html=True)
-        selected_idx = st.selectbox("Select Row to Edit/Delete", raw_df.index)
+        selected_eid = st.selectbox("Select Expense ID to Edit/Delete", raw_df['expense_id'].tolist())
         action = st.radio("Action", ["Edit", "Delete"], key="expense_action")
-        if action == "Edit":
-            row = raw_df.loc[selected_idx]
+        if action == "Edit" and selected_eid is not None:
+            row = raw_df[raw_df['expense_id'] == selected_eid].iloc[0]
             with st.form("edit_expense_form"):
                 st.write("Edit the fields and click Save:")
                 expense_date = st.date_input("Expense Date", value=row['expense_date'])
@@ -177,27 +173,15 @@ try:
                 description = st.text_input("Description", value=row['description'])
                 submit = st.form_submit_button("Save Changes")
                 if submit:
-                    conn = get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                        UPDATE Expenses SET expense_date=%s, category=%s, TYPE=%s, amount=%s, description=%s
-                        WHERE user_id=%s AND expense_date=%s AND category=%s AND TYPE=%s AND amount=%s AND description=%s
-                    """, (expense_date, category, expense_type, amount, description, user_id, row['expense_date'], row['category'], row['TYPE'], row['amount'], row['description']))
-                    conn.commit()
-                    cursor.close()
-                    conn.close()
+                    update_rows("Expenses", user_id, {"expense_id": selected_eid}, {
+                        "expense_date": expense_date, "category": category, "TYPE": expense_type,
+                        "amount": amount, "description": description,
+                    })
                     st.success("Expense record updated!")
                     st.rerun()
-        elif action == "Delete":
+        elif action == "Delete" and selected_eid is not None:
             if st.button("Delete This Record", key="delete_expense_btn", help="Delete this record", use_container_width=True):
-                conn = get_connection()
-                cursor = conn.cursor()
-                cursor.execute("""
-                    DELETE FROM Expenses WHERE user_id=%s AND expense_date=%s AND category=%s AND TYPE=%s AND amount=%s AND description=%s
-                """, (user_id, row['expense_date'], row['category'], row['TYPE'], row['amount'], row['description']))
-                conn.commit()
-                cursor.close()
-                conn.close()
+                delete_rows("Expenses", user_id, {"expense_id": selected_eid})
                 st.success("Expense record deleted!")
                 st.rerun()
 
@@ -284,7 +268,7 @@ try:
     # --- Expense Breakdown Donut Chart ---
     st.markdown("<div class='section-card'>", unsafe_allow_html=True)
     st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Expense Breakdown by Category</div>", unsafe_allow_html=True)
-    cat_df = df.groupby('category')["amount"].sum().reset_index().sort_values(by="amount", ascending=False)
+    cat_df = category_expenses(user_id)
     fig_donut = px.pie(cat_df, names='category', values='amount', hole=0.45, color_discrete_sequence=[
         "#A3C4F3", "#FFB7B2", "#B5EAD7", "#FFDAC1", "#E2F0CB",
         "#C7CEEA", "#FFFACD", "#FFD6E0", "#D4A5A5", "#B5B2C2"],)
@@ -332,8 +316,7 @@ try:
     # --- Monthly Expense Trend (Bar Chart) ---
     st.markdown("<div class='section-card'>", unsafe_allow_html=True)
     st.markdown("<div class='section-title'<h1 style='font-size:2.0rem;color:#0F172A;font-weight:500'>Monthly Expense Trend</div>", unsafe_allow_html=True)
-    df["month"] = pd.to_datetime(df["expense_date"]).dt.to_period("M").astype(str)
-    monthly_chart = df.groupby(["month", "TYPE"])["amount"].sum().reset_index()
+    monthly_chart = monthly_expenses(user_id)
     fig = px.bar(
         monthly_chart,
         x="month",
@@ -0,0 +1,85 @@
+import pandas as pd
+import streamlit as st
+
+import instrumentation
+from cache import size_of
+from db import get_query_cache
+
+# Opt-in developer panel in the sidebar, shown at the end of a page when
+# `perf_panel = true` is set in secrets. It reads the stats instrumentation
+# collected during this script run: wall time per section (see mark()),
+# split into query time (recorded statements), render time (elements drawn
+# through instrumentation.render) and the rest, which is pandas work. Query
+# time is summed over statements, so a section that loads tables
+# concurrently can show more query time than wall time.
+
+
+def enabled():
+    return bool(st.secrets.get("perf_panel", False))
+
+
+# One row per section, in the order the page ran them
+def section_breakdown(stats):
+    rows = []
+    for name, seconds in stats["sections"].items():
+        query = stats["query_seconds"].get(name, 0.0)
+        render = stats["render_seconds"].get(name, 0.0)
+        rows.append({
+            "section": name,
+            "wall_ms": seconds * 1000,
+            "query_ms": query * 1000,
+            "render_ms": render * 1000,
+            "pandas_ms": max(seconds - min(query, seconds) - render, 0.0) * 1000,
+        })
+    return pd.DataFrame(rows, columns=["section", "wall_ms", "query_ms", "render_ms", "pandas_ms"])
+
+
+# Rows and deep memory of the page's main DataFrames
+def frame_memory(frames):
+    rows = [
+        {"frame": name, "rows": len(frame), "memory_mb": size_of(frame) / 1024 / 1024}
+        for name, frame in frames.items() if isinstance(frame, pd.DataFrame)
+    ]
+    return pd.DataFrame(rows, columns=["frame", "rows", "memory_mb"])
+
+
+# Close the page's stats and draw the panel. `frames` maps a label to the
+# DataFrames worth watching on this page.
+def show(frames=None):
+    if not enabled():
+        return
+    stats = instrumentation.end_page()
+    if stats is None:
+        return
+    breakdown = section_breakdown(stats)
+    totals = stats["totals"]
+    cache = get_query_cache().stats()
+    with st.sidebar.expander("⏱️ Performance", expanded=False):
+        st.caption(f"{stats['page']}: {stats['elapsed'] * 1000:,.0f} ms this run")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Query", f"{breakdown['query_ms'].sum():,.0f} ms")
+        col2.metric("Pandas", f"{breakdown['pandas_ms'].sum():,.0f} ms")
+        col3.metric("Render", f"{breakdown['render_ms'].sum():,.0f} ms")
+
+        st.markdown("**Sections**")
+        st.dataframe(breakdown.round(1), hide_index=True, use_container_width=True)
+
+        st.markdown("**Queries**")
+        st.caption(
+            f"{totals['queries']:,} statements, {totals['rows']:,} rows, "
+            f"~{totals['bytes'] / 1024 / 1024:,.1f} MB fetched; "
+            f"{len(stats['slow'])} slow, {len(stats['n_plus_one'])} possible N+1"
+        )
+        for item in stats["n_plus_one"]:
+            st.caption(f"⚠️ N+1 in {item['section'] or '-'}: `{item['sql'][:120]}`")
+
+        if frames:
+            st.markdown("**DataFrame memory**")
+            st.dataframe(frame_memory(frames).round(2), hide_index=True, use_container_width=True)
+
+        st.markdown("**Query cache**")
+        st.caption(
+            f"Hit rate {cache['hit_rate']:.0%} ({cache['hits']:,} hits, {cache['misses']:,} misses), "
+            f"{cache['entries']:,} entries, {cache['bytes'] / 1024 / 1024:,.1f} of "
+            f"{cache['max_bytes'] / 1024 / 1024:,.0f} MB, {cache['evictions']:,} evictions"
+        )
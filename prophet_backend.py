@@ -0,0 +1,148 @@
+import os
+import hashlib
+import logging
+import threading
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from forecast import HORIZON, demand_matrix, data_version, last_run, last_failure, record_failure, forecast_frame, store_forecasts
+
+logger = logging.getLogger(__name__)
+
+# Optional Prophet backend for the catalog forecast. Fits run one product
+# per task in a process pool, off the Streamlit script thread; the page
+# keeps showing the last stored forecast until every task of a refit has
+# finished and the new results are stored. Fitted models are saved as JSON
+# under forecast_cache_dir, named by product and a hash of the series they
+# were fitted on, so unchanged products are never refitted. A refit that
+# fails is recorded against its data version and not resubmitted until the
+# sales history changes.
+DEFAULT_WORKERS = 2
+DEFAULT_CACHE_DIR = ".model_cache"
+
+_jobs_lock = threading.Lock()
+
+
+def available():
+    return importlib.util.find_spec("prophet") is not None
+
+
+@st.cache_resource
+def get_executor():
+    return ProcessPoolExecutor(max_workers=int(st.secrets.get("forecast_workers", DEFAULT_WORKERS)))
+
+
+# Running refits by user_id: {"version", "matrix", "futures"}
+@st.cache_resource
+def get_jobs():
+    return {}
+
+
+def _series_key(first_month, values):
+    digest = hashlib.sha1(str(first_month).encode())
+    digest.update(np.ascontiguousarray(values, dtype=float).tobytes())
+    return digest.hexdigest()[:16]
+
+
+# Fit (or load) one product's model in a worker process. Returns the fitted
+# values over all months and the `horizon` forecasts.
+def fit_product(product_id, months, values, horizon, cache_dir):
+    from prophet import Prophet
+    from prophet.serialize import model_to_json, model_from_json
+
+    months = pd.DatetimeIndex(months)
+    start = int(np.argmax(values > 0))
+    history = pd.DataFrame({"ds": months[start:], "y": values[start:]})
+    future = pd.date_range(months[-1] + pd.offsets.MonthBegin(), periods=horizon, freq="MS")
+    fitted = np.full(len(values), np.nan)
+    if len(history) < 2:
+        return fitted, np.full(horizon, float(values[-1]))
+
+    path = os.path.join(cache_dir, f"{product_id}-{_series_key(months[start], values[start:])}.json")
+    if os.path.exists(path):
+        with open(path, "r") as file:
+            model = model_from_json(file.read())
+    else:
+        model = Prophet(
+            yearly_seasonality=len(history) >= 24,
+            weekly_seasonality=False,
+            daily_seasonality=False,
+        )
+        model.fit(history)
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(path + ".tmp", "w") as file:
+            file.write(model_to_json(model))
+        os.replace(path + ".tmp", path)
+
+    yhat = model.predict(pd.DataFrame({"ds": history["ds"].tolist() + list(future)}))["yhat"].clip(lower=0).to_numpy()
+    fitted[start:] = yhat[:len(history)]
+    return fitted, yhat[len(history):]
+
+
+# Queue a refit of every product unless one for this data version is running
+def start_refit(user_id):
+    version = data_version(user_id)
+    with _jobs_lock:
+        job = get_jobs().get(user_id)
+        if job is not None and job["version"] == version:
+            return job
+        matrix = demand_matrix(user_id)
+        cache_dir = st.secrets.get("forecast_cache_dir", DEFAULT_CACHE_DIR)
+        months = matrix.columns.to_numpy()
+        executor = get_executor()
+        futures = [
+            executor.submit(fit_product, product_id, months, row, HORIZON, cache_dir)
+            for product_id, row in zip(matrix.index, matrix.to_numpy(dtype=float))
+        ]
+        job = {"version": version, "matrix": matrix, "futures": futures}
+        get_jobs()[user_id] = job
+        return job
+
+
+# Store the user's refit once every task has finished. Returns the job
+# while it is still running, otherwise None.
+def collect(user_id):
+    with _jobs_lock:
+        job = get_jobs().get(user_id)
+        if job is None or not all(future.done() for future in job["futures"]):
+            return job
+        del get_jobs()[user_id]
+    try:
+        results = [future.result() for future in job["futures"]]
+    except Exception as e:
+        logger.warning("Prophet refit failed for user %s: %s", user_id, e)
+        record_failure(user_id, "prophet", job["version"], e)
+        return None
+    matrix = job["matrix"]
+    if matrix.empty:
+        frame = pd.DataFrame(columns=["product_id", "month", "quantity_sold", "forecast"])
+    else:
+        fitted = np.vstack([result[0] for result in results])
+        ahead = np.vstack([result[1] for result in results])
+        frame = forecast_frame(matrix, fitted, ahead)
+    store_forecasts(user_id, frame, job["version"], "prophet")
+    return None
+
+
+# The failure of the last refit, if it was of the current sales history
+def current_failure(user_id):
+    failure = last_failure(user_id, "prophet")
+    return failure if failure is not None and failure["data_version"] == data_version(user_id) else None
+
+
+# Make sure a Prophet forecast for the current sales history is stored or
+# on its way. Returns the running job, or None when the stored one is
+# current or this history already failed to fit.
+def ensure_prophet_forecasts(user_id):
+    job = collect(user_id)
+    if job is not None:
+        return job
+    run = last_run(user_id, "prophet")
+    if run is not None and run["data_version"] == data_version(user_id):
+        return None
+    if current_failure(user_id) is not None:
+        return None
+    return start_refit(user_id)
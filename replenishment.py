@@ -0,0 +1,120 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from db import cached, read_sql
+from inventory import load_stock_levels
+
+# Reorder points and safety stock for every product at once. Daily demand
+# comes from the sales_daily rollup as a product x day matrix. Purchases
+# record no receipt date, so supplier lead time cannot be measured: L is
+# the configured lead_time_days (DEFAULT_LEAD_DAYS) for every product. The
+# typical gap between a product's consecutive purchase orders is its order
+# cycle, which only sizes the reorder. With
+#   d, sd  = mean and std of daily demand
+#   L      = supplier lead time in days
+#   C      = order cycle in days (L for products with fewer than two orders)
+#   z      = normal quantile of the service level
+# safety stock = z * sd * sqrt(L) and the reorder point is d * L + safety
+# stock. A reorder tops stock up to reorder point + d * C.
+DEFAULT_SERVICE_LEVEL = 0.95
+DEFAULT_LOOKBACK_DAYS = 90   # days of sales used to measure demand
+DEFAULT_LEAD_DAYS = 7        # supplier lead time (no receipt dates are recorded)
+
+DAILY_DEMAND_QUERY = """
+    SELECT product_id, day, SUM(units) AS units
+    FROM sales_daily
+    WHERE user_id = %s AND day > CURDATE() - INTERVAL %s DAY AND day <= CURDATE()
+    GROUP BY product_id, day
+"""
+
+ORDER_DAYS_QUERY = """
+    SELECT DISTINCT product_id, day
+    FROM purchases_daily
+    WHERE user_id = %s
+    ORDER BY product_id, day
+"""
+
+
+def service_level():
+    return float(st.secrets.get("service_level", DEFAULT_SERVICE_LEVEL))
+
+
+def lead_time_days():
+    return float(st.secrets.get("lead_time_days", DEFAULT_LEAD_DAYS))
+
+
+# Mean and std of daily demand per product from (product_id, day, units)
+# rows covering `lookback_days` (days without sales count as zero demand;
+# only the latest `lookback_days` days are used)
+def daily_demand_stats(daily, lookback_days=DEFAULT_LOOKBACK_DAYS):
+    if daily.empty:
+        return pd.DataFrame(columns=['avg_daily_demand', 'demand_std'], dtype=float)
+    matrix = daily.astype({'units': float}).pivot_table(index='product_id', columns='day', values='units', aggfunc='sum', fill_value=0.0)
+    matrix = matrix.iloc[:, -lookback_days:]
+    values = np.zeros((len(matrix), lookback_days))
+    values[:, -matrix.shape[1]:] = matrix.to_numpy()
+    return pd.DataFrame({'avg_daily_demand': values.mean(axis=1), 'demand_std': values.std(axis=1)}, index=matrix.index)
+
+
+def demand_stats(user_id, lookback_days=DEFAULT_LOOKBACK_DAYS):
+    return daily_demand_stats(read_sql(DAILY_DEMAND_QUERY, (user_id, lookback_days)), lookback_days)
+
+
+# Mean and std of the days between consecutive purchase orders per product,
+# from distinct (product_id, day) rows sorted by product and day
+def order_gap_stats(orders):
+    if orders.empty:
+        return pd.DataFrame(columns=['order_cycle_days', 'order_cycle_std'], dtype=float)
+    product = orders['product_id'].to_numpy()
+    days = pd.to_datetime(orders['day']).to_numpy().astype('datetime64[D]').astype(np.int64)
+    same = product[1:] == product[:-1]
+    gaps = pd.DataFrame({'product_id': product[1:][same], 'gap': np.diff(days)[same].astype(float)})
+    stats = gaps.groupby('product_id')['gap'].agg(['mean', 'std'])
+    return stats.rename(columns={'mean': 'order_cycle_days', 'std': 'order_cycle_std'}).fillna(0.0)
+
+
+def order_cycle_stats(user_id):
+    return order_gap_stats(read_sql(ORDER_DAYS_QUERY, (user_id,)))
+
+
+# Plan from live stock per product plus the demand and order cycle stats,
+# for a supplier lead time of `lead_days`
+def build_plan(stock, demand, order_cycles, level, lead_days=DEFAULT_LEAD_DAYS):
+    plan = stock[['product_id', 'live_stock']].set_index('product_id').join(demand, how='outer')
+    plan = plan.join(order_cycles, how='left')
+    plan = plan.astype(float).fillna({
+        'live_stock': 0.0, 'avg_daily_demand': 0.0, 'demand_std': 0.0,
+        'order_cycle_days': float(lead_days), 'order_cycle_std': 0.0,
+    })
+
+    z = NormalDist().inv_cdf(level)
+    d, sd = plan['avg_daily_demand'].to_numpy(), plan['demand_std'].to_numpy()
+    lead, cycle = float(lead_days), plan['order_cycle_days'].to_numpy()
+    safety = z * sd * np.sqrt(lead)
+    reorder_point = d * lead + safety
+    stock_now = plan['live_stock'].to_numpy()
+
+    plan['lead_time_days'] = lead
+    plan['safety_stock'] = np.ceil(safety)
+    plan['reorder_point'] = np.ceil(reorder_point)
+    plan['reorder_qty'] = np.ceil(np.maximum(reorder_point + d * cycle - stock_now, 0))
+    plan['needs_reorder'] = (stock_now < 0) | ((reorder_point > 0) & (stock_now <= reorder_point))
+    return plan.reset_index().rename(columns={'index': 'product_id'})
+
+
+def _plan(user_id, level, lookback_days, lead_days=DEFAULT_LEAD_DAYS):
+    return build_plan(load_stock_levels(user_id), demand_stats(user_id, lookback_days), order_cycle_stats(user_id), level, lead_days)
+
+
+# Replenishment plan for every product of the user (cached until sales,
+# purchases or stock change)
+def reorder_plan(user_id, level=None, lookback_days=DEFAULT_LOOKBACK_DAYS):
+    level = service_level() if level is None else float(level)
+    lead_days = lead_time_days()
+    return cached(
+        user_id, "reorder_plan", (level, lookback_days, lead_days),
+        lambda: _plan(user_id, level, lookback_days, lead_days),
+        tables=["sales_daily", "purchases_daily", "stock_levels"], namespace="replenishment",
+    )
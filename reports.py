@@ -0,0 +1,126 @@
+import pandas as pd
+from db import read_sql, fetch_data
+
+# Whole-history aggregates behind the Sales, Purchases and Expenses charts.
+# They read the daily rollups kept by the write path (ledger.ROLLUPS), so
+# a chart scans one row per day and key rather than every transaction.
+
+# Weighted-average purchase cost per product (kept by the write path in
+# product_costs), used to price sales
+COST_QUERY = """
+    SELECT product_id, avg_cost AS cost_price
+    FROM product_costs
+    WHERE user_id = %s
+"""
+
+MONTHLY_SALES_QUERY = """
+    SELECT
+        DATE_SUB(d.day, INTERVAL DAY(d.day) - 1 DAY) AS month,
+        SUM(d.units) AS quantity_sold,
+        SUM(d.revenue) AS revenue,
+        SUM(d.revenue - d.units * c.avg_cost) AS profit
+    FROM sales_daily d
+    LEFT JOIN product_costs c ON c.user_id = d.user_id AND c.product_id = d.product_id
+    WHERE d.user_id = %s
+    GROUP BY month
+    ORDER BY month
+"""
+
+VENDOR_SHARE_QUERY = """
+    SELECT vendor_name, SUM(units) AS quantity_purchased
+    FROM purchases_daily
+    WHERE user_id = %s
+    GROUP BY vendor_name
+"""
+
+PRODUCT_PURCHASES_QUERY = """
+    SELECT product_id, SUM(units) AS quantity_purchased
+    FROM purchases_daily
+    WHERE user_id = %s
+    GROUP BY product_id
+    ORDER BY quantity_purchased DESC
+"""
+
+MONTHLY_PURCHASES_QUERY = """
+    SELECT
+        DATE_SUB(day, INTERVAL DAY(day) - 1 DAY) AS month,
+        SUM(units) AS quantity_purchased
+    FROM purchases_daily
+    WHERE user_id = %s
+    GROUP BY month
+    ORDER BY month
+"""
+
+MONTHLY_EXPENSES_QUERY = """
+    SELECT
+        DATE_SUB(day, INTERVAL DAY(day) - 1 DAY) AS month,
+        TYPE,
+        SUM(amount) AS amount
+    FROM expenses_daily
+    WHERE user_id = %s
+    GROUP BY month, TYPE
+    ORDER BY month
+"""
+
+CATEGORY_EXPENSES_QUERY = """
+    SELECT category, SUM(amount) AS amount
+    FROM expenses_daily
+    WHERE user_id = %s
+    GROUP BY category
+    ORDER BY amount DESC
+"""
+
+
+# SUM/AVG come back as Decimal; make the measure columns plain floats
+def _numeric(df, columns):
+    return df.astype({column: float for column in columns})
+
+
+# Months come back as the first day of the month; charts label them YYYY-MM
+def _month_labels(df, column="month"):
+    df[column] = pd.to_datetime(df[column]).dt.to_period('M').astype(str)
+    return df
+
+
+# Weighted-average purchase cost per product
+def product_costs(user_id):
+    return _numeric(read_sql(COST_QUERY, (user_id,), user_id=user_id), ['cost_price'])
+
+
+# Quantity, revenue and profit per month over the user's full sales history
+def monthly_sales(user_id):
+    df = read_sql(MONTHLY_SALES_QUERY, (user_id,), user_id=user_id)
+    return _month_labels(_numeric(df, ['quantity_sold', 'revenue', 'profit']))
+
+
+# Distinct values of a column, for the sidebar filter options
+def distinct_values(table, user_id, column):
+    rows = fetch_data(
+        f"SELECT DISTINCT {column} FROM {table} WHERE user_id = %s AND {column} IS NOT NULL ORDER BY {column}",
+        (user_id,), user_id=user_id,
+    )
+    return [row[column] for row in rows]
+
+
+# Units bought per vendor, per product and per month
+def vendor_share(user_id):
+    return _numeric(read_sql(VENDOR_SHARE_QUERY, (user_id,), user_id=user_id), ['quantity_purchased'])
+
+
+def product_purchases(user_id):
+    return _numeric(read_sql(PRODUCT_PURCHASES_QUERY, (user_id,), user_id=user_id), ['quantity_purchased'])
+
+
+def monthly_purchases(user_id):
+    df = read_sql(MONTHLY_PURCHASES_QUERY, (user_id,), user_id=user_id)
+    return _month_labels(_numeric(df, ['quantity_purchased']))
+
+
+# Expense amount per month and type, and per category
+def monthly_expenses(user_id):
+    df = read_sql(MONTHLY_EXPENSES_QUERY, (user_id,), user_id=user_id)
+    return _month_labels(_numeric(df, ['amount']))
+
+
+def category_expenses(user_id):
+    return _numeric(read_sql(CATEGORY_EXPENSES_QUERY, (user_id,), user_id=user_id), ['amount'])
@@ -0,0 +1,95 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pd = pytest.importorskip("pandas")
+
+import cache
+from cache import QueryCache, TableVersions, size_of, tables_in
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_ttl(clock):
+    store = QueryCache(ttl=60, max_bytes=10_000)
+    store.put("k", [{"a": 1}])
+    clock[0] += 59
+    assert store.get("k") == [{"a": 1}]
+    clock[0] += 2
+    assert store.get("k") is None
+    assert store.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted_first(clock):
+    row = [{"v": "x" * 100}]
+    store = QueryCache(ttl=60, max_bytes=size_of(row) * 2)
+    store.put("a", row)
+    store.put("b", row)
+    store.get("a")
+    store.put("c", row)
+    assert store.get("b") is None
+    assert store.get("a") == row and store.get("c") == row
+    assert store.stats()["evictions"] == 1
+
+
+def test_byte_budget_is_kept(clock):
+    frame = pd.DataFrame({"x": range(100)})
+    store = QueryCache(ttl=60, max_bytes=size_of(frame) * 3)
+    for key in range(10):
+        store.put(key, frame)
+    stats = store.stats()
+    assert stats["entries"] == 3
+    assert stats["bytes"] <= stats["max_bytes"]
+
+
+def test_oversized_results_are_not_cached(clock):
+    store = QueryCache(ttl=60, max_bytes=10)
+    assert store.get_or_load("k", lambda: [{"a": "too big to fit"}]) == [{"a": "too big to fit"}]
+    assert store.stats()["entries"] == 0
+
+
+def test_callers_get_copies(clock):
+    store = QueryCache(ttl=60, max_bytes=100_000)
+    store.put("rows", [{"a": 1}])
+    store.put("frame", pd.DataFrame({"a": [1]}))
+    rows, frame = store.get("rows"), store.get("frame")
+    rows[0]["a"] = 2
+    frame.loc[0, "a"] = 2
+    assert store.get("rows") == [{"a": 1}]
+    assert store.get("frame").loc[0, "a"] == 1
+
+
+def test_get_or_load_counts_hits_and_misses(clock):
+    store = QueryCache(ttl=60, max_bytes=100_000)
+    calls = []
+    load = lambda: calls.append(1) or [{"a": 1}]
+    store.get_or_load("k", load)
+    store.get_or_load("k", load)
+    assert len(calls) == 1
+    assert store.stats()["hits"] == 1 and store.stats()["misses"] == 1
+
+
+@pytest.mark.parametrize("query, tables", [
+    ("SELECT * FROM Sales WHERE user_id = %s", ["sales"]),
+    ("SELECT s.x FROM `Sales` s JOIN Products p ON p.product_id = s.product_id", ["products", "sales"]),
+    ("select * from sales_daily left join Products using (product_id)", ["products", "sales_daily"]),
+    ("SELECT 1", []),
+])
+def test_tables_in(query, tables):
+    assert tables_in(query) == tables
+
+
+def test_table_versions_change_only_for_written_tables():
+    versions = TableVersions()
+    before = versions.snapshot(1, ["Sales", "Products"])
+    versions.bump(1, ["sales"])
+    assert versions.snapshot(1, ["Sales", "Products"]) == (before[0] + 1, before[1])
+    assert versions.snapshot(2, ["Sales"]) == (0,)
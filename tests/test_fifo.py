@@ -0,0 +1,103 @@
+import os
+import sys
+import uuid
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("mysql.connector")
+
+import fifo
+from db import get_pool, connection, fetch_data, execute_query, insert_row, bump_versions
+from ledger import affected_tables
+
+# Runs against the MySQL configured in .streamlit/secrets.toml (migrated
+# with migrate.py) and is skipped when none is reachable. Each test works
+# in a throwaway user whose rows are deleted afterwards.
+
+USER_TABLES = [
+    "fifo_sale_costs", "fifo_layers", "fifo_products", "fifo_watermarks",
+    "product_cost_history", "product_costs", "purchases_daily", "sales_daily",
+    "stock_levels", "user_summary", "Sales", "Purchases", "Products",
+]
+DAY = date(2025, 1, 15)
+
+
+@pytest.fixture
+def user_id():
+    try:
+        get_pool().release(get_pool().acquire())
+    except Exception as e:
+        pytest.skip(f"no database: {e}")
+    username = f"test_fifo_{uuid.uuid4().hex[:12]}"
+    execute_query("INSERT INTO Users (username, email, password_hash) VALUES (%s, %s, %s)", (username, f"{username}@example.com", "x"))
+    user_id = fetch_data("SELECT user_id FROM Users WHERE username = %s", (username,))[0]["user_id"]
+    yield user_id
+    for table in USER_TABLES:
+        execute_query(f"DELETE FROM {table} WHERE user_id = %s", (user_id,))
+    execute_query("DELETE FROM Users WHERE user_id = %s", (user_id,))
+
+
+def _product(user_id, name):
+    insert_row("Products", user_id, {"Name": name, "category": "Test", "cost_price": 1.0, "selling_price": 2.0, "stock": 0})
+    return fetch_data("SELECT MAX(product_id) AS id FROM Products WHERE user_id = %s", (user_id,))[0]["id"]
+
+
+def _purchase(product_id, quantity, cost_price):
+    return {
+        "product_id": product_id, "vendor_name": "Test", "quantity_purchased": quantity, "cost_price": cost_price,
+        "order_date": DAY, "payment_due": DAY, "payment_status": "paid",
+    }
+
+
+# An upload holds a lower purchase_id than a single insert that commits
+# first; a refresh in between moves the watermark past the upload's row.
+# The next refresh must still layer it.
+def test_rows_committed_below_the_watermark_are_layered(user_id):
+    slow, quick = _product(user_id, "Slow upload"), _product(user_id, "Quick insert")
+    with connection() as conn:
+        cursor = conn.cursor()
+        values = _purchase(slow, 10, 5.0)
+        cursor.execute(
+            f"INSERT INTO Purchases (user_id, {', '.join(values)}) VALUES ({', '.join(['%s'] * (len(values) + 1))})",
+            (user_id, *values.values()),
+        )
+        assert insert_row("Purchases", user_id, _purchase(quick, 3, 2.0))
+        fifo.refresh(user_id)
+        conn.commit()
+        cursor.close()
+    bump_versions(user_id, affected_tables("Purchases"))
+
+    assert insert_row("Sales", user_id, {
+        "product_id": slow, "quantity_sold": 4, "selling_price": 9.0, "sale_date": DAY, "shipped": 1, "payment_received": 1,
+    })
+    fifo.refresh(user_id)
+
+    value = fifo.valuation(user_id).set_index("product_id")
+    assert value.loc[slow, "remaining"] == 6
+    assert value.loc[slow, "value"] == pytest.approx(30.0)
+    assert value.loc[quick, "remaining"] == 3
+    assert fifo.total_cogs(user_id) == pytest.approx(20.0)
+
+
+# Uploads may leave quantities and costs empty; those rows count as 0
+# instead of making every refresh fail on a NaN insert
+def test_rows_with_missing_quantity_or_cost_are_layered(user_id):
+    product = _product(user_id, "Gaps")
+    assert insert_row("Purchases", user_id, _purchase(product, 5, 4.0))
+    assert insert_row("Purchases", user_id, _purchase(product, None, 3.0))
+    assert insert_row("Purchases", user_id, _purchase(product, 2, None))
+    assert insert_row("Sales", user_id, {
+        "product_id": product, "quantity_sold": None, "selling_price": 9.0, "sale_date": DAY, "shipped": 1, "payment_received": 1,
+    })
+    assert insert_row("Sales", user_id, {
+        "product_id": product, "quantity_sold": 6, "selling_price": 9.0, "sale_date": DAY, "shipped": 1, "payment_received": 1,
+    })
+    fifo.refresh(user_id)
+
+    value = fifo.valuation(user_id).set_index("product_id")
+    assert value.loc[product, "remaining"] == 1
+    assert value.loc[product, "value"] == pytest.approx(0.0)
+    assert fifo.total_cogs(user_id) == pytest.approx(20.0)
@@ -0,0 +1,136 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+pytest.importorskip("mysql.connector")
+
+import forecast
+
+# The vectorized smoothing pass is checked against plain per-product
+# exponential smoothing; the background refit against stubbed storage.
+
+
+# Simple exponential smoothing of one series from its first sale: the fit
+# at t is the level after t - 1, and the forecast is the final level
+def _reference(series, alpha):
+    fitted = np.full(len(series), np.nan)
+    start = int(np.argmax(series > 0))
+    level = series[start]
+    for t in range(start + 1, len(series)):
+        fitted[t] = level
+        level = alpha * series[t] + (1 - alpha) * level
+    return fitted, max(level, 0.0)
+
+
+@pytest.fixture
+def matrix():
+    months = pd.date_range("2024-01-01", periods=8, freq="MS")
+    return pd.DataFrame(
+        [[4, 6, 5, 7, 6, 8, 7, 9], [0, 0, 3, 1, 4, 2, 5, 3], [10, 2, 9, 1, 8, 2, 7, 1]],
+        index=pd.Index([11, 12, 13], name="product_id"), columns=months, dtype=float,
+    )
+
+
+def test_smooth_matches_per_product_smoothing(matrix):
+    y = matrix.to_numpy()
+    alphas = np.array([0.2, 0.5, 0.8])
+    fitted, ahead = forecast._smooth(y, alphas, season_length=None, horizon=2)
+    for a, alpha in enumerate(alphas):
+        for p in range(len(y)):
+            expected_fit, expected_next = _reference(y[p], alpha)
+            np.testing.assert_allclose(fitted[a, p], expected_fit)
+            np.testing.assert_allclose(ahead[a, p], [expected_next] * 2)
+
+
+def test_months_before_the_first_sale_have_no_fit(matrix):
+    fitted, _ = forecast._smooth(matrix.to_numpy(), np.array([0.5]))
+    assert np.isnan(fitted[0, 1, :3]).all()
+    assert not np.isnan(fitted[0, 1, 3:]).any()
+
+
+def test_fit_all_picks_the_alpha_with_the_lowest_error(matrix):
+    alphas = np.linspace(0.1, 0.9, 9)
+    fitted, ahead = forecast.fit_all(matrix, season_length=None, alphas=alphas)
+    for p, series in enumerate(matrix.to_numpy()):
+        fits = [_reference(series, alpha) for alpha in alphas]
+        errors = [np.nansum((fit - series) ** 2) for fit, _ in fits]
+        best_fit, best_next = fits[int(np.argmin(errors))]
+        np.testing.assert_allclose(fitted[p], best_fit)
+        np.testing.assert_allclose(ahead[p], best_next)
+
+
+def test_seasonal_pattern_is_carried_forward():
+    pattern = np.array([5, 8, 12, 9], dtype=float)
+    y = np.tile(pattern, 3)[None, :]
+    fitted, ahead = forecast._smooth(y, np.array([0.3]), season_length=4, horizon=4)
+    np.testing.assert_allclose(fitted[0, 0, 1:], y[0, 1:])
+    np.testing.assert_allclose(ahead[0, 0], pattern)
+
+
+def test_monthly_matrix_fills_missing_months_with_zero():
+    demand = pd.DataFrame({
+        "product_id": [1, 1, 2],
+        "month": ["2024-01-01", "2024-04-01", "2024-02-01"],
+        "quantity_sold": [3, 5, 2],
+    })
+    matrix = forecast.monthly_matrix(demand)
+    assert list(matrix.columns) == list(pd.date_range("2024-01-01", "2024-04-01", freq="MS"))
+    assert matrix.loc[1].tolist() == [3.0, 0.0, 0.0, 5.0]
+    assert matrix.loc[2].tolist() == [0.0, 2.0, 0.0, 0.0]
+
+
+def test_forecast_frame_appends_the_horizon(matrix):
+    frame = forecast.forecast_frame(matrix, *forecast.fit_all(matrix, season_length=None, horizon=3))
+    assert len(frame) == matrix.size + 3 * len(matrix)
+    future = frame[frame["quantity_sold"].isna()]
+    assert future["month"].min() == matrix.columns.max() + pd.offsets.MonthBegin()
+    assert set(future["product_id"]) == set(matrix.index)
+
+
+@pytest.fixture
+def refits(monkeypatch):
+    jobs, executor = {}, ThreadPoolExecutor(max_workers=1)
+    state = {"run": None, "failure": None}
+    monkeypatch.setattr(forecast, "get_refits", lambda: jobs)
+    monkeypatch.setattr(forecast, "get_refit_executor", lambda: executor)
+    monkeypatch.setattr(forecast, "data_version", lambda user_id: "v1")
+    monkeypatch.setattr(forecast, "last_run", lambda user_id, method="smoothing": state["run"])
+    monkeypatch.setattr(forecast, "last_failure", lambda user_id, method="smoothing": state["failure"])
+    monkeypatch.setattr(forecast, "record_failure", lambda user_id, method, version, error: state.update(failure={"data_version": version}))
+    yield state
+    executor.shutdown(wait=True)
+
+
+def test_stale_forecast_is_refit_in_the_background(refits, monkeypatch):
+    release = threading.Event()
+
+    def refresh(user_id):
+        release.wait(5)
+        refits["run"] = {"data_version": "v1"}
+    monkeypatch.setattr(forecast, "refresh_forecasts", refresh)
+
+    job = forecast.ensure_forecasts(1)
+    assert job is not None and not job["future"].done()
+    assert forecast.ensure_forecasts(1) is job
+    release.set()
+    job["future"].result(5)
+    assert forecast.ensure_forecasts(1) is None
+
+
+def test_failed_refit_is_not_retried_for_the_same_history(refits, monkeypatch):
+    def refresh(user_id):
+        raise RuntimeError("no data")
+    monkeypatch.setattr(forecast, "refresh_forecasts", refresh)
+
+    forecast.ensure_forecasts(1)["future"].exception(5)
+    assert forecast.ensure_forecasts(1) is None
+    assert refits["failure"] == {"data_version": "v1"}
+    assert forecast.ensure_forecasts(1) is None
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+pytest.importorskip("mysql.connector")
+
+import grid
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    seen = []
+
+    def read_sql(query, params):
+        seen.append((" ".join(query.split()), params))
+        return pd.DataFrame(columns=["sale_id", "product_id", "sale_date"])
+
+    def cached(user_id, query, params, load, tables=None, namespace="raw"):
+        seen.append(("tables", tables))
+        return load()
+    monkeypatch.setattr(grid, "read_sql", read_sql)
+    monkeypatch.setattr(grid, "cached", cached)
+    return seen
+
+
+def test_search_by_product_name_uses_a_lookup_on_products(queries):
+    grid.fetch_page(
+        "Sales", 7, ["sale_id", "product_id", "sale_date"], "sale_id",
+        search="mug", search_lookups=[("product_id", "Products", "Name")], key_columns=["sale_id", "product_id"],
+    )
+    (_, tables), (query, params) = queries
+    assert "product_id IN (SELECT product_id FROM Products WHERE user_id = %s AND Name LIKE %s)" in query
+    assert "sale_date LIKE" not in query
+    assert params == (7, 7, "%mug%")
+    assert tables == ["Sales", "Products"]
+
+
+def test_numeric_search_also_matches_keys(queries):
+    grid.fetch_page(
+        "Sales", 7, ["sale_id", "product_id"], "sale_id",
+        search="42", search_lookups=[("product_id", "Products", "Name")], key_columns=["sale_id", "product_id"],
+    )
+    query, params = queries[-1]
+    assert "sale_id = %s OR product_id = %s" in query
+    assert params == (7, 7, "%42%", 42, 42)
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("streamlit")
+
+from instrumentation import fingerprint, estimate_bytes
+
+
+@pytest.mark.parametrize("sql, shape", [
+    ("SELECT * FROM Sales WHERE user_id = %s", "SELECT * FROM Sales WHERE user_id = ?"),
+    ("SELECT *\n  FROM   Sales\tWHERE user_id = 42", "SELECT * FROM Sales WHERE user_id = ?"),
+    ("SELECT * FROM t WHERE name = 'O\\'Brien' AND price > 9.99", "SELECT * FROM t WHERE name = ? AND price > ?"),
+    ("SELECT * FROM t WHERE id IN (%s, %s, %s)", "SELECT * FROM t WHERE id IN (?)"),
+    ("SELECT * FROM t WHERE id IN (1,2)", "SELECT * FROM t WHERE id IN (?)"),
+    ("SELECT * FROM sales_daily", "SELECT * FROM sales_daily"),
+])
+def test_fingerprint(sql, shape):
+    assert fingerprint(sql) == shape
+
+
+def test_repeated_statements_share_a_fingerprint():
+    assert fingerprint("SELECT cost FROM Products WHERE product_id = 1") == fingerprint("SELECT cost FROM Products WHERE product_id = 2")
+
+
+def test_estimate_bytes():
+    assert estimate_bytes([]) == 0
+    assert estimate_bytes([{"a": "abcd", "b": None, "c": 1}]) == 4 + 0 + 8
@@ -0,0 +1,50 @@
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+pytest.importorskip("mysql.connector")
+
+from loaders import TABLE_SCHEMAS, apply_schema, where_clause, choice_filter, default_window
+
+
+def test_where_clause_without_filters_scopes_to_the_user():
+    assert where_clause(7, None) == ("user_id = %s", (7,))
+
+
+def test_where_clause_parameterizes_every_filter():
+    clause, params = where_clause(7, [
+        ("sale_date", ">=", date(2025, 1, 1)),
+        ("product_id", "in", [3, 4]),
+        ("shipped", "=", 1),
+    ])
+    assert clause == "user_id = %s AND sale_date >= %s AND product_id IN (%s, %s) AND shipped = %s"
+    assert params == (7, date(2025, 1, 1), 3, 4, 1)
+
+
+def test_empty_in_filter_matches_nothing():
+    assert where_clause(7, [("product_id", "in", [])]) == ("user_id = %s AND 1 = 0", (7,))
+
+
+def test_choice_filter_is_dropped_when_everything_is_selected():
+    assert choice_filter("vendor_name", ["A", "B"], ["A", "B"]) == []
+    assert choice_filter("vendor_name", ["A"], ["A", "B"]) == [("vendor_name", "in", ["A"])]
+
+
+def test_default_window_covers_the_whole_history():
+    assert default_window(date(2023, 5, 1), date(2025, 2, 1)) == (date(2023, 5, 1), date(2025, 2, 1))
+    assert default_window(None, None) == (date.today(), date.today())
+
+
+def test_quantities_keep_full_width():
+    sales = apply_schema(pd.DataFrame({
+        "sale_id": [1, 2], "quantity_sold": [100, 120], "shipped": [0, 1],
+    }), TABLE_SCHEMAS["Sales"])
+    assert sales["quantity_sold"].dtype == "int64"
+    assert (sales["quantity_sold"] * sales["quantity_sold"]).sum() == 100 * 100 + 120 * 120
+    assert sales["sale_id"].dtype.itemsize == 1 and sales["shipped"].dtype.itemsize == 1
@@ -0,0 +1,114 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pd = pytest.importorskip("pandas")
+
+import metrics
+
+# Each metric is checked against the row-by-row formula the Finance page
+# used before it moved into metrics.py, on a small hand-made catalog.
+
+
+@pytest.fixture
+def products():
+    return pd.DataFrame({
+        "product_id": [1, 2, 3],
+        "Name": ["Shirt", "Mug", "Lamp"],
+        "category": ["Clothing", "Home", "Home"],
+        "cost_price": [5.0, 2.5, 12.0],
+    })
+
+
+@pytest.fixture
+def sales():
+    return pd.DataFrame({
+        "product_id": [1, 1, 2, 3, 2],
+        "quantity_sold": [2, 3, 10, 1, 4],
+        "selling_price": [9.0, 8.5, 4.0, 20.0, 4.5],
+        "payment_received": [1, 0, 0, 1, 1],
+    })
+
+
+@pytest.fixture
+def purchases():
+    return pd.DataFrame({
+        "product_id": [1, 2, 3, 2],
+        "vendor_name": ["Acme", "Potter", "Acme", "Potter"],
+        "quantity_purchased": [10, 20, 4, 5],
+        "cost_price": [5.0, 2.5, 12.0, 2.4],
+        "payment_status": ["Pending", "Completed", "PENDING", "Overdue"],
+    })
+
+
+@pytest.fixture
+def stock_levels():
+    return pd.DataFrame({"product_id": [1, 2], "live_stock": [5, 11]})
+
+
+def test_receivables_match_unpaid_sales(sales):
+    unpaid = sales[sales["payment_received"] == 0]
+    assert metrics.receivables(sales) == pytest.approx((unpaid["quantity_sold"] * unpaid["selling_price"]).sum())
+
+
+def test_payables_match_pending_purchases(purchases):
+    pending = purchases[purchases["payment_status"].str.lower() == "pending"]
+    assert metrics.payables(purchases) == pytest.approx((pending["quantity_purchased"] * pending["cost_price"]).sum())
+
+
+def test_supplier_outstanding_drops_vendors_owing_nothing(purchases):
+    outstanding = metrics.supplier_outstanding(purchases).set_index("vendor_name")["outstanding"]
+    assert outstanding.to_dict() == pytest.approx({"Acme": 10 * 5.0 + 4 * 12.0})
+
+
+def test_stock_position_fills_missing_stock_with_zero(products, stock_levels):
+    position = metrics.stock_position(products, stock_levels).set_index("product_id")
+    assert position["live_stock"].tolist() == [5, 11, 0]
+    assert position["holding_cost"].tolist() == pytest.approx([25.0, 27.5, 0.0])
+
+
+def test_days_inventory_outstanding(products, stock_levels):
+    position = metrics.stock_position(products, stock_levels)
+    assert metrics.days_inventory_outstanding(position, 60.0) == pytest.approx(position["live_stock"].mean() / 2.0)
+    assert metrics.days_inventory_outstanding(position, 0) == pytest.approx(position["live_stock"].mean())
+
+
+def test_sales_detail_matches_row_by_row_cogs(sales, products):
+    cogs = 0
+    for _, row in sales.iterrows():
+        cost = products.loc[products["product_id"] == row["product_id"], "cost_price"]
+        if not cost.empty:
+            cogs += row["quantity_sold"] * cost.values[0]
+    detail = metrics.sales_detail(sales, products)
+    assert detail["Cost"].sum() == pytest.approx(cogs)
+    assert detail["Revenue"].sum() == pytest.approx((sales["quantity_sold"] * sales["selling_price"]).sum())
+    assert (detail["Profit"] == detail["Revenue"] - detail["Cost"]).all()
+
+
+def test_category_rollups(sales, products):
+    detail = metrics.sales_detail(sales, products)
+    profit = metrics.category_profit(detail).set_index("category")
+    assert profit.loc["Home", "Revenue"] == pytest.approx(10 * 4.0 + 20.0 + 4 * 4.5)
+    assert profit.loc["Clothing", "Cost"] == pytest.approx(5 * 5.0)
+    assert metrics.category_sales(detail).set_index("category")["total_sales"].sum() == pytest.approx(detail["Revenue"].sum())
+
+
+def test_top_product_sales_orders_by_revenue(sales, products):
+    top = metrics.top_product_sales(metrics.sales_detail(sales, products), 2)
+    assert top["Name"].tolist() == ["Mug", "Shirt"]
+
+
+def test_low_stock_flags_critical_below_safety_stock(products, stock_levels):
+    position = metrics.stock_position(products, stock_levels)
+    plan = pd.DataFrame({
+        "product_id": [1, 2, 3],
+        "safety_stock": [6.0, 4.0, 0.0],
+        "reorder_point": [8.0, 12.0, 0.0],
+        "reorder_qty": [10.0, 5.0, 0.0],
+        "needs_reorder": [True, True, False],
+    })
+    low = metrics.low_stock(position, plan).set_index("product_id")
+    assert low["Status"].to_dict() == {1: "Critical", 2: "Low"}
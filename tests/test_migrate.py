@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("streamlit")
+pytest.importorskip("mysql.connector")
+
+import migrate
+from migrate import split_statements
+
+
+def test_splits_on_semicolons():
+    assert split_statements("CREATE TABLE a (x INT);\nCREATE TABLE b (y INT);") == [
+        "CREATE TABLE a (x INT)", "CREATE TABLE b (y INT)",
+    ]
+
+
+def test_semicolons_inside_quotes_do_not_split():
+    script = "INSERT INTO t VALUES ('a;b', \"c;d\");SELECT `odd;name` FROM t"
+    assert split_statements(script) == ["INSERT INTO t VALUES ('a;b', \"c;d\")", "SELECT `odd;name` FROM t"]
+
+
+def test_escaped_quotes_stay_inside_the_string():
+    assert split_statements("SELECT 'it\\'s; fine';SELECT 2") == ["SELECT 'it\\'s; fine'", "SELECT 2"]
+
+
+def test_comments_are_dropped():
+    script = "-- header; not a statement\nSELECT 1; # trailing; comment\n/* block; comment */ SELECT 2;"
+    assert split_statements(script) == ["SELECT 1", "SELECT 2"]
+
+
+def test_empty_statements_are_skipped():
+    assert split_statements(" ;\n;SELECT 1;;") == ["SELECT 1"]
+
+
+def test_shipped_migrations_parse_and_run_in_order():
+    found = migrate.discover()
+    versions = [version for version, _, _ in found]
+    assert versions == sorted(versions) and len(set(versions)) == len(versions)
+    assert versions[0] == "0000"
+    for _, _, path in found:
+        if path.endswith(".sql"):
+            with open(path, "r") as file:
+                assert split_statements(file.read())
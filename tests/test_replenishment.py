@@ -0,0 +1,75 @@
+import os
+import sys
+import math
+from statistics import NormalDist
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("streamlit")
+pytest.importorskip("mysql.connector")
+
+from replenishment import build_plan, daily_demand_stats, order_gap_stats
+
+# The vectorized plan is checked against the reorder formulas worked out
+# one product at a time.
+
+
+@pytest.fixture
+def stock():
+    return pd.DataFrame({"product_id": [1, 2, 3], "live_stock": [5, 80, -2]})
+
+
+@pytest.fixture
+def demand():
+    return pd.DataFrame({"avg_daily_demand": [2.0, 1.0, 0.5], "demand_std": [1.0, 0.5, 0.0]}, index=[1, 2, 3])
+
+
+@pytest.fixture
+def cycles():
+    return pd.DataFrame({"order_cycle_days": [30.0, 14.0], "order_cycle_std": [3.0, 1.0]}, index=[1, 2])
+
+
+def test_plan_matches_the_reorder_formulas(stock, demand, cycles):
+    level, lead = 0.95, 7
+    plan = build_plan(stock, demand, cycles, level, lead).set_index("product_id")
+    z = NormalDist().inv_cdf(level)
+    for product_id, live in stock.set_index("product_id")["live_stock"].items():
+        d, sd = demand.loc[product_id]
+        cycle = cycles["order_cycle_days"].get(product_id, lead)
+        safety = z * sd * math.sqrt(lead)
+        reorder_point = d * lead + safety
+        row = plan.loc[product_id]
+        assert row["safety_stock"] == math.ceil(safety)
+        assert row["reorder_point"] == math.ceil(reorder_point)
+        assert row["reorder_qty"] == math.ceil(max(reorder_point + d * cycle - live, 0))
+        assert row["needs_reorder"] == (live < 0 or (reorder_point > 0 and live <= reorder_point))
+        assert row["lead_time_days"] == lead
+
+
+def test_products_without_sales_or_orders_do_not_reorder(stock):
+    empty_demand = daily_demand_stats(pd.DataFrame(columns=["product_id", "day", "units"]))
+    empty_cycles = order_gap_stats(pd.DataFrame(columns=["product_id", "day"]))
+    plan = build_plan(stock[stock["live_stock"] >= 0], empty_demand, empty_cycles, 0.95)
+    assert not plan["needs_reorder"].any()
+    assert (plan["reorder_qty"] == 0).all()
+
+
+def test_daily_demand_counts_days_without_sales_as_zero():
+    daily = pd.DataFrame({"product_id": [1, 1], "day": ["2025-01-01", "2025-01-03"], "units": [4, 2]})
+    stats = daily_demand_stats(daily, lookback_days=4)
+    assert stats.loc[1, "avg_daily_demand"] == pytest.approx(6 / 4)
+    assert stats.loc[1, "demand_std"] == pytest.approx(pd.Series([0, 4, 0, 2]).std(ddof=0))
+
+
+def test_order_gaps_are_measured_per_product():
+    orders = pd.DataFrame({
+        "product_id": [1, 1, 1, 2, 2],
+        "day": ["2025-01-01", "2025-01-11", "2025-01-31", "2025-01-05", "2025-01-12"],
+    })
+    stats = order_gap_stats(orders)
+    assert stats.loc[1, "order_cycle_days"] == pytest.approx(15.0)
+    assert stats.loc[2, "order_cycle_days"] == pytest.approx(7.0)
+    assert stats.loc[2, "order_cycle_std"] == 0.0